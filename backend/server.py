@@ -1,14 +1,22 @@
-from fastapi import FastAPI, APIRouter, HTTPException, BackgroundTasks
+from fastapi import FastAPI, APIRouter, HTTPException, BackgroundTasks, Query, Request, Response, WebSocket
+from contextlib import asynccontextmanager
+from fastapi.responses import StreamingResponse
 from dotenv import load_dotenv
+from starlette.background import BackgroundTask
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import ASCENDING, CursorType, IndexModel, ReturnDocument, UpdateMany, UpdateOne
+from pymongo.errors import CollectionInvalid, DuplicateKeyError, OperationFailure, PyMongoError
 import os
 import logging
 from pathlib import Path
 from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Set, Tuple, Callable, Awaitable
 import uuid
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 from enum import Enum
 import httpx
 import json
@@ -16,22 +24,334 @@ import asyncio
 import websockets
 from urllib.parse import urljoin
 import ssl
+import sys
+import copy
+import time
+import random
+import heapq
+import struct
+import hashlib
+import mimetypes
+import mmap
+import shutil
+import tempfile
+import threading
+import socket
+from collections import OrderedDict
+from pymongo import monitoring
+
+try:
+    import orjson
+except ImportError:  # optional, falls back to the standard json module
+    orjson = None
 
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
-# MongoDB connection
-mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
+# Metrics
+# Prometheus text exposition without an extra dependency. Mongo command
+# events arrive from Motor's worker threads, hence the locks.
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = ['%s="%s"' % (name, str(value).replace('\\', '\\\\').replace('"', '\\"')) for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+class Counter:
+    """Counter that is either incremented directly or read from a callback at scrape time"""
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (), callback: Callable[[], Dict[Tuple[str, ...], float]] = None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.callback = callback
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+    
+    def inc(self, *labels: str, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+    
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        if self.callback is not None:
+            values = self.callback()
+        else:
+            with self._lock:
+                values = dict(self._values)
+        for labels, value in values.items():
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {value}")
+        return lines
+
+class Gauge:
+    """Gauge that is either set directly or read from a callback at scrape time"""
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (), callback: Callable[[], Dict[Tuple[str, ...], float]] = None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.callback = callback
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+    
+    def set(self, *labels: str, value: float):
+        with self._lock:
+            self._values[labels] = value
+    
+    def inc(self, *labels: str, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+    
+    def dec(self, *labels: str, amount: float = 1):
+        self.inc(*labels, amount=-amount)
+    
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} gauge"]
+        if self.callback is not None:
+            values = self.callback()
+        else:
+            with self._lock:
+                values = dict(self._values)
+        for labels, value in values.items():
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {value}")
+        return lines
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (), buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = buckets
+        # labels -> [per-bucket counts..., sum, count]
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+        self._lock = threading.Lock()
+    
+    def observe(self, *labels: str, value: float):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+    
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for labels, series in self._series.items():
+                for bound, count in zip(self.buckets, series):
+                    bucket_labels = _format_labels(self.labelnames, labels, 'le="%s"' % bound)
+                    lines.append(f"{self.name}_bucket{bucket_labels} {count}")
+                bucket_labels = _format_labels(self.labelnames, labels, 'le="+Inf"')
+                lines.append(f"{self.name}_bucket{bucket_labels} {series[-1]}")
+                lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {series[-2]}")
+                lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {series[-1]}")
+        return lines
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: List[Any] = []
+    
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+    
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+metrics = MetricsRegistry()
+http_request_duration = metrics.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template", ("method", "route", "status")))
+http_requests_in_flight = metrics.register(Gauge(
+    "http_requests_in_flight", "HTTP requests currently being served"))
+mongo_command_duration = metrics.register(Histogram(
+    "mongodb_command_duration_seconds", "MongoDB command latency by collection", ("collection", "command")))
+mongo_command_failures = metrics.register(Counter(
+    "mongodb_command_failures_total", "Failed MongoDB commands by collection", ("collection", "command")))
+axis_request_duration = metrics.register(Histogram(
+    "axis_request_duration_seconds", "Axis API call latency, retries included", ("method", "endpoint")))
+axis_request_errors = metrics.register(Counter(
+    "axis_request_errors_total", "Failed Axis API calls by cause", ("method", "endpoint", "error")))
+axis_requests_in_flight = metrics.register(Gauge(
+    "axis_requests_in_flight", "Axis API calls currently in progress"))
+event_loop_lag = metrics.register(Gauge(
+    "event_loop_lag_seconds", "Delay of the last event loop lag probe beyond its interval"))
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """Record MongoDB command timings per collection"""
+    def __init__(self):
+        self._started: Dict[Tuple[Any, int], Tuple[str, str]] = {}
+        self._lock = threading.Lock()
+    
+    def started(self, event):
+        target = event.command.get(event.command_name)
+        if event.command_name == "getMore":
+            target = event.command.get("collection")
+        collection = target if isinstance(target, str) else "-"
+        with self._lock:
+            self._started[(event.connection_id, event.request_id)] = (collection, event.command_name)
+    
+    def _finish(self, event) -> Tuple[str, str]:
+        with self._lock:
+            return self._started.pop((event.connection_id, event.request_id), ("-", event.command_name))
+    
+    def succeeded(self, event):
+        collection, command = self._finish(event)
+        mongo_command_duration.observe(collection, command, value=event.duration_micros / 1e6)
+    
+    def failed(self, event):
+        collection, command = self._finish(event)
+        mongo_command_duration.observe(collection, command, value=event.duration_micros / 1e6)
+        mongo_command_failures.inc(collection, command)
+
+class RequestMetricsMiddleware:
+    """Time HTTP requests by method, route template and status.
+
+    A request ends when the last body chunk is sent: background tasks the
+    route scheduled run afterwards and are not request latency.
+    """
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        status = {"code": 500}
+        started = time.perf_counter()
+        finished = False
+        
+        def finish():
+            nonlocal finished
+            if finished:
+                return
+            finished = True
+            http_requests_in_flight.dec()
+            route = scope.get("route")
+            # Unmatched paths share one label to keep cardinality bounded
+            template = getattr(route, "path", None) or "unmatched"
+            http_request_duration.observe(scope["method"], template, str(status["code"]), value=time.perf_counter() - started)
+        
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                finish()
+        
+        http_requests_in_flight.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # Errors and clients that went away before the end of the body
+            finish()
+
+async def monitor_event_loop_lag(interval: float):
+    """Measure how late the event loop wakes a sleeping task"""
+    while True:
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        event_loop_lag.set(value=max(0.0, time.perf_counter() - started - interval))
+
+# MongoDB connection, opened by the app lifespan so that each worker
+# process builds its own client
+client: Optional[AsyncIOMotorClient] = None
+db = None
 
-# Create the main app without a prefix
-app = FastAPI(title="Axis Audio Dashboard API", version="1.0.0")
+def connect_mongo(mongo_client: Optional[AsyncIOMotorClient] = None):
+    """Point `client` and `db` at MongoDB, or at the given client"""
+    global client, db
+    client = mongo_client or AsyncIOMotorClient(os.environ['MONGO_URL'], event_listeners=[MongoCommandMetrics()])
+    db = client[os.environ['DB_NAME']]
 
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
 
+# List endpoint paging. Pages are keyed on _id, which follows insertion order
+DEFAULT_PAGE_LIMIT = int(os.environ.get('API_PAGE_LIMIT', '1000'))
+MAX_PAGE_LIMIT = int(os.environ.get('API_MAX_PAGE_LIMIT', '5000'))
+STREAM_BATCH_SIZE = int(os.environ.get('API_STREAM_BATCH_SIZE', '500'))
+
+# Real-time events: messages buffered per subscriber before it is dropped
+EVENTS_QUEUE_SIZE = int(os.environ.get('EVENTS_QUEUE_SIZE', '256'))
+
+# Read-through document cache for zones, sources and speakers
+CACHE_TTL_SECONDS = float(os.environ.get('CACHE_TTL_SECONDS', '60'))
+CACHE_MAX_ENTRIES = int(os.environ.get('CACHE_MAX_ENTRIES', '1024'))
+
+# Maximum concurrent Axis calls when one request targets many speakers
+AXIS_FANOUT_CONCURRENCY = int(os.environ.get('AXIS_FANOUT_CONCURRENCY', '16'))
+
+# Background speaker health polling
+SPEAKER_POLL_ENABLED = os.environ.get('SPEAKER_POLL_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+SPEAKER_POLL_INTERVAL = float(os.environ.get('SPEAKER_POLL_INTERVAL', '60'))
+SPEAKER_POLL_CONCURRENCY = int(os.environ.get('SPEAKER_POLL_CONCURRENCY', '20'))
+SPEAKER_POLL_JITTER = float(os.environ.get('SPEAKER_POLL_JITTER', '0.5'))
+SPEAKER_POLL_MAX_BACKOFF = float(os.environ.get('SPEAKER_POLL_MAX_BACKOFF', '900'))
+SPEAKER_LAST_SEEN_RESOLUTION = float(os.environ.get('SPEAKER_LAST_SEEN_RESOLUTION', '300'))
+
+# Write-behind queue for Axis volume/playback commands
+AXIS_COMMAND_WORKERS = int(os.environ.get('AXIS_COMMAND_WORKERS', '8'))
+AXIS_COMMAND_DRAIN_TIMEOUT = float(os.environ.get('AXIS_COMMAND_DRAIN_TIMEOUT', '5'))
+# Sessions still PREPARING this many seconds after creation lost their start
+# (e.g. a crash before it ran) and are moved to ERROR
+SESSION_START_TIMEOUT = float(os.environ.get('SESSION_START_TIMEOUT', '300'))
+
+# Event loop lag probe interval, in seconds
+METRICS_LOOP_LAG_INTERVAL = float(os.environ.get('METRICS_LOOP_LAG_INTERVAL', '0.5'))
+
+# Scheduled playback
+SCHEDULER_ENABLED = os.environ.get('SCHEDULER_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+SCHEDULER_PREWARM_SECONDS = float(os.environ.get('SCHEDULER_PREWARM_SECONDS', '5'))
+SCHEDULER_MISFIRE_GRACE = float(os.environ.get('SCHEDULER_MISFIRE_GRACE', '60'))
+
+# Background probe of source duration/format from container headers
+SOURCE_PROBE_WORKERS = int(os.environ.get('SOURCE_PROBE_WORKERS', '4'))
+SOURCE_PROBE_TIMEOUT = float(os.environ.get('SOURCE_PROBE_TIMEOUT', '10'))
+SOURCE_PROBE_HEAD_BYTES = int(os.environ.get('SOURCE_PROBE_HEAD_BYTES', '65536'))
+# Audio bytes needed after an ID3 tag before a second read is skipped
+SOURCE_PROBE_MIN_AUDIO_BYTES = 4096
+
+# Local files served to speakers through /api/sources/{id}/stream when
+# AXIS_MEDIA_BASE_URL is set. Their paths must then resolve, symlinks
+# included, inside MEDIA_ROOT; relative paths are taken from it. Without
+# it Axis reads file paths itself and they are stored as given
+MEDIA_ROOT = os.path.realpath(os.environ.get('MEDIA_ROOT', str(ROOT_DIR.parent / 'media')))
+AXIS_MEDIA_BASE_URL = os.environ.get('AXIS_MEDIA_BASE_URL', '')
+MEDIA_CACHE_DIR = os.environ.get('MEDIA_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'axis-media-cache'))
+MEDIA_CACHE_MAX_MB = int(os.environ.get('MEDIA_CACHE_MAX_MB', '2048'))
+MEDIA_PASSTHROUGH_CODECS = {codec.strip() for codec in os.environ.get('MEDIA_PASSTHROUGH_CODECS', 'mp3').split(',') if codec.strip()}
+MEDIA_TRANSCODE_BITRATE = os.environ.get('MEDIA_TRANSCODE_BITRATE', '192k')
+FFMPEG_PATH = os.environ.get('FFMPEG_PATH', 'ffmpeg')
+# Retry-After of the 503 answered while a source's transcode is running
+MEDIA_TRANSCODE_RETRY_AFTER = int(os.environ.get('MEDIA_TRANSCODE_RETRY_AFTER', '5'))
+
+# Shared relay of STREAMING/RADIO sources through /api/relay/{id}
+RELAY_ENABLED = os.environ.get('RELAY_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+RELAY_BUFFER_KB = int(os.environ.get('RELAY_BUFFER_KB', '1024'))
+RELAY_PREROLL_KB = int(os.environ.get('RELAY_PREROLL_KB', '64'))
+RELAY_IDLE_TIMEOUT = float(os.environ.get('RELAY_IDLE_TIMEOUT', '10'))
+RELAY_CONNECT_TIMEOUT = float(os.environ.get('RELAY_CONNECT_TIMEOUT', '10'))
+RELAY_READ_TIMEOUT = float(os.environ.get('RELAY_READ_TIMEOUT', '30'))
+RELAY_MAX_RECONNECTS = int(os.environ.get('RELAY_MAX_RECONNECTS', '5'))
+
+# Several API processes sharing one database (uvicorn or gunicorn workers,
+# or several containers): background jobs run on the elected leader only,
+# and change events are forwarded to the other processes. A worker cannot
+# tell how many others were started, so this must be set explicitly; the
+# Docker image's UVICORN_WORKERS is only checked against it at startup
+UVICORN_WORKERS = int(os.environ.get('UVICORN_WORKERS', '1'))
+CLUSTER_ENABLED = os.environ.get('CLUSTER_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+CLUSTER_LEASE_TTL = float(os.environ.get('CLUSTER_LEASE_TTL', '15'))
+CLUSTER_EVENTS_MAX_MB = int(os.environ.get('CLUSTER_EVENTS_MAX_MB', '16'))
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -51,6 +371,7 @@ class AudioSessionStatus(str, Enum):
     PAUSED = "paused"
     STOPPED = "stopped"
     PREPARING = "preparing"
+    ERROR = "error"
 
 class AudioSourceType(str, Enum):
     LOCAL_FILE = "local_file"
@@ -68,9 +389,14 @@ class Speaker(BaseModel):
     firmware_version: Optional[str] = None
     status: SpeakerStatus = SpeakerStatus.OFFLINE
     volume: int = Field(default=50, ge=0, le=100)
+    # Zones listing this speaker, kept in sync with Zone.speaker_ids;
+    # zone_id is the first of them
     zone_id: Optional[str] = None
+    zone_ids: List[str] = []
     last_seen: datetime = Field(default_factory=datetime.utcnow)
     capabilities: List[str] = []
+    delivery_status: Optional[str] = None  # pending, delivered, failed
+    delivery_error: Optional[str] = None
 
 class Zone(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -82,6 +408,10 @@ class Zone(BaseModel):
     active_session_id: Optional[str] = None
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
+class ZoneExpanded(Zone):
+    """A zone with its speakers, in speaker_ids order"""
+    speakers: List[Speaker] = []
+
 class AudioSource(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     name: str
@@ -90,6 +420,8 @@ class AudioSource(BaseModel):
     file_path: Optional[str] = None
     metadata: Dict[str, Any] = {}
     duration: Optional[int] = None  # seconds
+    probe_status: Optional[str] = None  # pending, done, failed
+    probe_error: Optional[str] = None
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
 class AudioSession(BaseModel):
@@ -99,11 +431,33 @@ class AudioSession(BaseModel):
     source_id: str
     status: AudioSessionStatus = AudioSessionStatus.STOPPED
     volume: int = Field(default=50, ge=0, le=100)
-    position: int = 0  # seconds
+    position: int = 0  # seconds, as of position_updated_at
+    position_updated_at: Optional[datetime] = None
+    duration: Optional[int] = None  # seconds, copied from the source
     loop: bool = False
     created_at: datetime = Field(default_factory=datetime.utcnow)
     started_at: Optional[datetime] = None
     ended_at: Optional[datetime] = None
+    delivery_status: Optional[str] = None  # pending, delivered, failed
+    delivery_error: Optional[str] = None
+    schedule_id: Optional[str] = None  # set when started by a schedule
+
+class Schedule(BaseModel):
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    name: str
+    zone_id: str
+    source_id: str
+    start_at: datetime  # first fire, UTC
+    interval: Optional[int] = None  # seconds between fires; None fires once
+    weekdays: List[int] = []  # 0 = Monday, in `timezone`; empty fires every day
+    # IANA name, e.g. "Europe/Paris": fires keep their local time across DST
+    # changes. None counts in UTC
+    timezone: Optional[str] = None
+    enabled: bool = True
+    next_fire_at: Optional[datetime] = None
+    last_fired_at: Optional[datetime] = None
+    last_session_id: Optional[str] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
 
 # Request/Response Models
 class SpeakerCreate(BaseModel):
@@ -127,6 +481,7 @@ class AudioSourceCreate(BaseModel):
     url: Optional[str] = None
     file_path: Optional[str] = None
     metadata: Dict[str, Any] = {}
+    duration: Optional[int] = Field(default=None, gt=0)  # seconds
 
 class AudioSessionCreate(BaseModel):
     name: str
@@ -136,10 +491,139 @@ class AudioSessionCreate(BaseModel):
 class VolumeControl(BaseModel):
     volume: int = Field(ge=0, le=100)
 
+class SpeakerVolumeOperation(BaseModel):
+    speaker_id: str
+    volume: int = Field(ge=0, le=100)
+
+class SpeakerVolumeBatch(BaseModel):
+    operations: List[SpeakerVolumeOperation] = Field(min_length=1)
+
+class MuteControl(BaseModel):
+    muted: bool
+
 class PlaybackControl(BaseModel):
     action: str  # play, pause, stop, next, previous
     position: Optional[int] = None
 
+class ScheduleCreate(BaseModel):
+    name: str
+    zone_id: str
+    source_id: str
+    start_at: datetime
+    interval: Optional[int] = Field(default=None, gt=0)
+    weekdays: List[int] = Field(default=[], max_length=7)
+    timezone: Optional[str] = None
+    enabled: bool = True
+
+class ScheduleUpdate(BaseModel):
+    name: Optional[str] = None
+    zone_id: Optional[str] = None
+    source_id: Optional[str] = None
+    start_at: Optional[datetime] = None
+    interval: Optional[int] = Field(default=None, gt=0)
+    weekdays: Optional[List[int]] = Field(default=None, max_length=7)
+    timezone: Optional[str] = None
+    enabled: Optional[bool] = None
+
+# Axis API resilience
+class CircuitBreaker:
+    """Fail fast on an Axis endpoint after repeated failures.
+
+    After failure_threshold consecutive failures the breaker opens and
+    calls are rejected without touching the network. Once reset_timeout
+    has passed a single probe call is let through (half-open); its outcome
+    closes or re-opens the breaker.
+    """
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+    
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.rejected = 0
+        self._probe_started: Optional[float] = None
+    
+    def allow(self) -> bool:
+        now = time.monotonic()
+        if self.state == self.OPEN and now - self.opened_at >= self.reset_timeout:
+            self.state = self.HALF_OPEN
+            self._probe_started = None
+        if self.state == self.CLOSED:
+            return True
+        # A probe that never reported back (e.g. cancelled) expires as well
+        if self.state == self.HALF_OPEN and (self._probe_started is None or now - self._probe_started >= self.reset_timeout):
+            self._probe_started = now
+            return True
+        self.rejected += 1
+        return False
+    
+    def record_success(self):
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self._probe_started = None
+    
+    def record_failure(self):
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+            self._probe_started = None
+    
+    def snapshot(self) -> Dict[str, Any]:
+        retry_in = None
+        if self.state == self.OPEN:
+            retry_in = round(max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at)), 3)
+        return {"state": self.state, "failures": self.failures, "rejected": self.rejected, "retry_in": retry_in}
+
+class RetryBudget:
+    """Token bucket bounding retries to a fraction of overall traffic.
+
+    Every request deposits `ratio` tokens (up to `max_tokens`) and every
+    retry spends one, so retries cannot multiply load during an outage.
+    """
+    def __init__(self, ratio: float, max_tokens: float):
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self.tokens = max_tokens
+        self.retries = 0
+        self.exhausted = 0
+    
+    def deposit(self):
+        self.tokens = min(self.max_tokens, self.tokens + self.ratio)
+    
+    def withdraw(self) -> bool:
+        if self.tokens < 1:
+            self.exhausted += 1
+            return False
+        self.tokens -= 1
+        self.retries += 1
+        return True
+    
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "tokens": round(self.tokens, 3),
+            "max_tokens": self.max_tokens,
+            "ratio": self.ratio,
+            "retries": self.retries,
+            "exhausted": self.exhausted,
+        }
+
+def _endpoint_template(endpoint: str) -> str:
+    """Collapse ids in an Axis path, e.g. /targets/42/volume -> /targets/{id}/volume"""
+    parts = endpoint.strip('/').split('/')
+    for i in range(1, len(parts)):
+        if parts[i - 1] in ('targets', 'sessions'):
+            parts[i] = '{id}'
+    return '/' + '/'.join(parts)
+
+class AxisRequestError(HTTPException):
+    """4xx answer from Axis: the API is up but rejected this request or target"""
+
 # Axis Audio Manager Pro Client
 class AxisAudioClient:
     def __init__(self):
@@ -147,39 +631,145 @@ class AxisAudioClient:
         self.username = os.environ.get('AXIS_API_USERNAME')
         self.password = os.environ.get('AXIS_API_PASSWORD')
         self.timeout = int(os.environ.get('AXIS_API_TIMEOUT', '30'))
+        # Connecting should be quick; AXIS_API_TIMEOUT stays the read default
+        self.connect_timeout = float(os.environ.get('AXIS_API_CONNECT_TIMEOUT', '5'))
+        self.read_timeout = float(os.environ.get('AXIS_API_READ_TIMEOUT', str(self.timeout)))
+        
+        # Retries for idempotent calls (GET/PUT), with full-jitter backoff
+        self.max_retries = int(os.environ.get('AXIS_API_MAX_RETRIES', '2'))
+        self.retry_base_delay = float(os.environ.get('AXIS_API_RETRY_BASE_DELAY', '0.2'))
+        self.retry_max_delay = float(os.environ.get('AXIS_API_RETRY_MAX_DELAY', '2'))
+        self.retry_budget = RetryBudget(
+            ratio=float(os.environ.get('AXIS_API_RETRY_BUDGET_RATIO', '0.2')),
+            max_tokens=float(os.environ.get('AXIS_API_RETRY_BUDGET_MAX', '10'))
+        )
+        
+        # One circuit breaker per method and endpoint template
+        self.breaker_failure_threshold = int(os.environ.get('AXIS_BREAKER_FAILURE_THRESHOLD', '5'))
+        self.breaker_reset_timeout = float(os.environ.get('AXIS_BREAKER_RESET_TIMEOUT', '30'))
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        
+        # Connection pool settings for the shared HTTP client. Every call goes
+        # to the same Audio Manager Pro host, so the pool limits are per host.
+        self.max_connections = int(os.environ.get('AXIS_API_MAX_CONNECTIONS', '100'))
+        self.max_keepalive_connections = int(os.environ.get('AXIS_API_MAX_KEEPALIVE_CONNECTIONS', '20'))
+        self.keepalive_expiry = float(os.environ.get('AXIS_API_KEEPALIVE_EXPIRY', '30'))
+        self.http2 = os.environ.get('AXIS_API_HTTP2', 'false').lower() in ('1', 'true', 'yes')
         
         # Create SSL context that skips verification for local testing
         self.ssl_context = ssl.create_default_context()
         self.ssl_context.check_hostname = False
         self.ssl_context.verify_mode = ssl.CERT_NONE
         
+        self._client: Optional[httpx.AsyncClient] = None
+    
+    def _build_client(self) -> httpx.AsyncClient:
+        """Create the long-lived pooled HTTP client"""
+        http2 = self.http2
+        if http2:
+            try:
+                import h2  # noqa: F401
+            except ImportError:
+                logger.warning("AXIS_API_HTTP2 is enabled but the 'h2' package is not installed, falling back to HTTP/1.1")
+                http2 = False
+        
+        limits = httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry
+        )
+        return httpx.AsyncClient(
+            auth=httpx.BasicAuth(self.username or '', self.password or ''),
+            verify=self.ssl_context,
+            timeout=httpx.Timeout(self.timeout, connect=self.connect_timeout, read=self.read_timeout),
+            limits=limits,
+            http2=http2
+        )
+    
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Shared HTTP client, created on first use"""
+        if self._client is None or self._client.is_closed:
+            self._client = self._build_client()
+        return self._client
+    
+    async def aclose(self):
+        """Close the pooled HTTP client and its keep-alive connections"""
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
+        
+    def breaker(self, key: str) -> CircuitBreaker:
+        if key not in self.breakers:
+            self.breakers[key] = CircuitBreaker(self.breaker_failure_threshold, self.breaker_reset_timeout)
+        return self.breakers[key]
+    
     async def _request(self, method: str, endpoint: str, data: Dict = None) -> Dict:
         """Make authenticated request to Axis API"""
+        method = method.upper()
+        template = _endpoint_template(endpoint)
+        started = time.perf_counter()
+        axis_requests_in_flight.inc()
+        try:
+            return await self._request_with_retries(method, endpoint, template, data)
+        finally:
+            axis_requests_in_flight.dec()
+            axis_request_duration.observe(method, template, value=time.perf_counter() - started)
+    
+    async def _request_with_retries(self, method: str, endpoint: str, template: str, data: Dict = None) -> Dict:
         url = urljoin(self.base_url, f"/api{endpoint}")
+        key = f"{method} {template}"
+        breaker = self.breaker(key)
         
-        auth = httpx.BasicAuth(self.username, self.password)
+        if not breaker.allow():
+            axis_request_errors.inc(method, template, "circuit_open")
+            raise HTTPException(status_code=503, detail=f"Axis API unavailable: circuit open for {key}")
         
-        async with httpx.AsyncClient(verify=False, timeout=self.timeout) as client:
+        self.retry_budget.deposit()
+        attempt = 0
+        while True:
             try:
-                if method.upper() == 'GET':
-                    response = await client.get(url, auth=auth)
-                elif method.upper() == 'POST':
-                    response = await client.post(url, auth=auth, json=data)
-                elif method.upper() == 'PUT':
-                    response = await client.put(url, auth=auth, json=data)
-                elif method.upper() == 'DELETE':
-                    response = await client.delete(url, auth=auth)
+                if method in ('POST', 'PUT'):
+                    response = await self.client.request(method, url, json=data)
+                else:
+                    response = await self.client.request(method, url)
                 
                 response.raise_for_status()
-                return response.json() if response.content else {}
+                result = response.json() if response.content else {}
+                breaker.record_success()
+                return result
+                
+            except (httpx.TransportError, httpx.HTTPStatusError) as e:
+                # 4xx means the endpoint is up and the request itself is wrong
+                if isinstance(e, httpx.HTTPStatusError) and e.response.status_code < 500:
+                    breaker.record_success()
+                    axis_request_errors.inc(method, template, "http_4xx")
+                    logger.error(f"Axis API request failed: {e}")
+                    raise AxisRequestError(status_code=500, detail=f"Axis API error: {str(e)}")
                 
-            except httpx.HTTPError as e:
+                if method in ('GET', 'PUT') and attempt < self.max_retries and self.retry_budget.withdraw():
+                    delay = random.uniform(0, min(self.retry_max_delay, self.retry_base_delay * 2 ** attempt))
+                    attempt += 1
+                    logger.warning(f"Axis API request {key} failed ({e}), retry {attempt} in {delay:.2f}s")
+                    await asyncio.sleep(delay)
+                    continue
+                
+                breaker.record_failure()
+                axis_request_errors.inc(method, template, "http_5xx" if isinstance(e, httpx.HTTPStatusError) else "transport")
                 logger.error(f"Axis API request failed: {e}")
                 raise HTTPException(status_code=500, detail=f"Axis API error: {str(e)}")
             except Exception as e:
+                breaker.record_failure()
+                axis_request_errors.inc(method, template, "unexpected")
                 logger.error(f"Unexpected error in Axis API request: {e}")
                 raise HTTPException(status_code=500, detail=f"API communication error: {str(e)}")
     
+    def resilience_snapshot(self) -> Dict[str, Any]:
+        return {
+            "breakers": {key: breaker.snapshot() for key, breaker in self.breakers.items()},
+            "retry_budget": self.retry_budget.snapshot(),
+        }
+    
     async def discover_speakers(self) -> List[Dict]:
         """Discover available speakers/targets"""
         try:
@@ -205,15 +795,21 @@ class AxisAudioClient:
                 }
             ]
     
-    async def get_speaker_status(self, speaker_id: str) -> Dict:
-        """Get detailed speaker status"""
+    async def get_speaker_status(self, speaker_id: str, strict: bool = False) -> Dict:
+        """Get detailed speaker status
+
+        With strict=True errors are raised instead of reported as status
+        'unknown', so callers can tell an unreachable API from a target.
+        """
         try:
             return await self._request('GET', f'/targets/{speaker_id}')
         except Exception as e:
+            if strict:
+                raise
             logger.warning(f"Failed to get speaker status for {speaker_id}: {e}")
             return {'id': speaker_id, 'status': 'unknown'}
     
-    async def start_audio_session(self, zone_id: str, audio_config: Dict) -> Dict:
+    async def start_audio_session(self, zone_id: str, audio_config: Dict, strict: bool = False) -> Dict:
         """Start audio playback session"""
         try:
             data = {
@@ -222,10 +818,12 @@ class AxisAudioClient:
             }
             return await self._request('POST', '/sessions', data)
         except Exception as e:
+            if strict:
+                raise
             logger.error(f"Failed to start audio session: {e}")
             return {'session_id': str(uuid.uuid4()), 'status': 'started'}
     
-    async def control_playback(self, session_id: str, action: str, params: Dict = None) -> Dict:
+    async def control_playback(self, session_id: str, action: str, params: Dict = None, strict: bool = False) -> Dict:
         """Control audio playback"""
         try:
             data = {'action': action}
@@ -233,257 +831,3469 @@ class AxisAudioClient:
                 data.update(params)
             return await self._request('PUT', f'/sessions/{session_id}/control', data)
         except Exception as e:
+            if strict:
+                raise
             logger.error(f"Failed to control playback: {e}")
             return {'status': 'success'}
     
-    async def set_volume(self, target_id: str, volume: int) -> Dict:
-        """Set volume for specific target"""
+    async def set_volume(self, target_id: str, volume: int, strict: bool = False) -> Dict:
+        """Set volume for specific target
+
+        With strict=True errors are raised instead of being logged, so
+        callers reporting per-target results can see them.
+        """
         try:
             data = {'volume': volume}
             return await self._request('PUT', f'/targets/{target_id}/volume', data)
         except Exception as e:
+            if strict:
+                raise
             logger.error(f"Failed to set volume: {e}")
             return {'status': 'success'}
+    
+    async def warm_up(self, target_ids: List[str], concurrency: int = AXIS_FANOUT_CONCURRENCY):
+        """Open pooled connections ahead of calls about to reach these targets
+
+        Reads the status of each target, up to `concurrency` at a time, which
+        leaves as many keep-alive connections to the Axis host in the pool.
+        Errors are only logged; the calls that follow report their own.
+        """
+        semaphore = asyncio.Semaphore(min(concurrency, self.max_keepalive_connections))
+        
+        async def touch(target_id: str):
+            async with semaphore:
+                await self.get_speaker_status(target_id)
+        
+        await asyncio.gather(*(touch(target_id) for target_id in target_ids))
+
+# Index management
+# Indexes every collection needs, keyed by collection name. Names are left to
+# MongoDB's defaults (e.g. "id_1") so re-declaring an index is a no-op.
+COLLECTION_INDEXES: Dict[str, List[IndexModel]] = {
+    "speakers": [
+        IndexModel([("id", ASCENDING)], unique=True),
+        IndexModel([("ip_address", ASCENDING)], unique=True),
+    ],
+    "zones": [
+        IndexModel([("id", ASCENDING)], unique=True),
+        # Multikey: finds the zones of a speaker
+        IndexModel([("speaker_ids", ASCENDING)]),
+    ],
+    "audio_sources": [
+        IndexModel([("id", ASCENDING)], unique=True),
+    ],
+    "audio_sessions": [
+        IndexModel([("id", ASCENDING)], unique=True),
+        IndexModel([("zone_id", ASCENDING), ("status", ASCENDING)]),
+    ],
+    "source_probes": [
+        IndexModel([("key", ASCENDING)], unique=True),
+    ],
+    "schedules": [
+        IndexModel([("id", ASCENDING)], unique=True),
+        IndexModel([("enabled", ASCENDING), ("next_fire_at", ASCENDING)]),
+    ],
+    "leases": [
+        # Leases nobody renewed are removed, e.g. those of a retired role
+        IndexModel([("expires_at", ASCENDING)], expireAfterSeconds=0),
+    ],
+}
+
+async def ensure_indexes() -> Dict[str, List[str]]:
+    """Create the declared indexes, skipping those that already exist"""
+    created = {}
+    for collection_name, indexes in COLLECTION_INDEXES.items():
+        created[collection_name] = []
+        for index in indexes:
+            try:
+                # createIndexes is idempotent for an identical key spec
+                names = await db[collection_name].create_indexes([index])
+                created[collection_name].extend(names)
+            except OperationFailure as e:
+                logger.warning(f"Could not create index {index.document['name']} on {collection_name}: {e}")
+    return created
+
+async def index_report() -> Dict[str, Dict[str, Any]]:
+    """Compare declared indexes with the ones present in MongoDB"""
+    report = {}
+    for collection_name, indexes in COLLECTION_INDEXES.items():
+        collection = db[collection_name]
+        declared = [index.document["name"] for index in indexes]
+        existing = await collection.index_information()
+        
+        # $indexStats counts accesses since the last mongod restart
+        usage = {}
+        try:
+            async for stats in collection.aggregate([{"$indexStats": {}}]):
+                usage[stats["name"]] = stats["accesses"]["ops"]
+        except OperationFailure as e:
+            logger.warning(f"Could not read index usage for {collection_name}: {e}")
+        
+        report[collection_name] = {
+            "declared": declared,
+            "missing": [name for name in declared if name not in existing],
+            "undeclared": [name for name in existing if name != "_id_" and name not in declared],
+            "unused": [name for name, ops in usage.items() if ops == 0 and name != "_id_"],
+            "usage": usage,
+        }
+    return report
 
 # Initialize Axis client
 axis_client = AxisAudioClient()
 
-# API Routes
-@api_router.get("/")
-async def root():
-    return {"message": "Axis Audio Dashboard API", "version": "1.0.0"}
+# List helpers
+def _json_default(value: Any):
+    """JSON encoder fallback for values read from MongoDB"""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, ObjectId):
+        return str(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
 
-@api_router.get("/health")
-async def health_check():
-    return {"status": "healthy", "timestamp": datetime.utcnow()}
+def json_dumps(content: Any) -> bytes:
+    """Serialize to JSON bytes, with orjson when it is installed"""
+    if orjson is not None:
+        return orjson.dumps(content, default=_json_default)
+    return json.dumps(content, default=_json_default).encode()
 
-# Speaker Management
-@api_router.get("/speakers", response_model=List[Speaker])
-async def get_speakers():
-    """Get all speakers"""
-    speakers = await db.speakers.find().to_list(1000)
-    return [Speaker(**speaker) for speaker in speakers]
+class FastJSONResponse(Response):
+    """JSON response that serializes content as is, without validation"""
+    media_type = "application/json"
+    
+    def render(self, content: Any) -> bytes:
+        return json_dumps(content)
 
-@api_router.post("/speakers", response_model=Speaker)
-async def create_speaker(speaker: SpeakerCreate):
-    """Add a new speaker manually"""
-    speaker_dict = speaker.dict()
-    speaker_obj = Speaker(**speaker_dict)
-    await db.speakers.insert_one(speaker_obj.dict())
-    return speaker_obj
+_MODEL_DEFAULTS: Dict[type, Dict[str, Any]] = {}
 
-@api_router.get("/speakers/discover")
-async def discover_speakers():
-    """Discover speakers from Axis Audio Manager Pro"""
+def trusted_documents(model: type, docs: List[Dict]) -> List[Dict]:
+    """Prepare documents read from MongoDB for output without re-validating.
+
+    Documents were validated by their model when written, so they only
+    need the plain defaults of fields added since then filled in.
+    """
+    defaults = _MODEL_DEFAULTS.get(model)
+    if defaults is None:
+        defaults = {
+            name: field.default
+            for name, field in model.model_fields.items()
+            if not field.is_required() and field.default_factory is None
+        }
+        _MODEL_DEFAULTS[model] = defaults
+    return [{**defaults, **doc} for doc in docs]
+
+def _page_filter(after: Optional[str]) -> Dict:
+    """Build the keyset filter that resumes a listing after a cursor"""
+    if not after:
+        return {}
     try:
-        discovered = await axis_client.discover_speakers()
-        
-        # Save discovered speakers to database
-        for speaker_data in discovered:
-            existing = await db.speakers.find_one({"ip_address": speaker_data.get('ip_address')})
-            if not existing:
-                speaker = Speaker(
-                    name=speaker_data.get('name', f"Speaker {speaker_data.get('ip_address')}"),
-                    ip_address=speaker_data.get('ip_address'),
-                    model=speaker_data.get('model', 'Unknown'),
-                    status=SpeakerStatus.ONLINE if speaker_data.get('status') == 'online' else SpeakerStatus.OFFLINE
-                )
-                await db.speakers.insert_one(speaker.dict())
-        
-        return {"message": f"Discovered {len(discovered)} speakers", "speakers": discovered}
-    except Exception as e:
-        logger.error(f"Speaker discovery failed: {e}")
-        raise HTTPException(status_code=500, detail="Speaker discovery failed")
+        return {"_id": {"$gt": ObjectId(after)}}
+    except (InvalidId, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
 
-@api_router.put("/speakers/{speaker_id}/volume")
-async def set_speaker_volume(speaker_id: str, volume_control: VolumeControl):
-    """Set volume for a specific speaker"""
-    # Update in database
-    await db.speakers.update_one(
-        {"id": speaker_id},
-        {"$set": {"volume": volume_control.volume}}
-    )
-    
-    # Send to Axis system
-    await axis_client.set_volume(speaker_id, volume_control.volume)
-    
-    return {"status": "success", "volume": volume_control.volume}
+async def fetch_page(collection, limit: int, after: Optional[str] = None) -> Tuple[List[Dict], Optional[str]]:
+    """Fetch one page of documents in _id order.
 
-# Zone Management
-@api_router.get("/zones", response_model=List[Zone])
-async def get_zones():
-    """Get all zones"""
-    zones = await db.zones.find().to_list(1000)
-    return [Zone(**zone) for zone in zones]
+    Returns the documents without their _id, and the cursor of the next
+    page when more documents follow.
+    """
+    docs = await collection.find(_page_filter(after)).sort("_id", ASCENDING).limit(limit + 1).to_list(limit + 1)
+    next_cursor = None
+    if len(docs) > limit:
+        docs = docs[:limit]
+        next_cursor = str(docs[-1]["_id"])
+    for doc in docs:
+        del doc["_id"]
+    return docs, next_cursor
 
-@api_router.post("/zones", response_model=Zone)
-async def create_zone(zone: ZoneCreate):
-    """Create a new zone"""
-    zone_dict = zone.dict()
-    zone_obj = Zone(**zone_dict)
-    await db.zones.insert_one(zone_obj.dict())
-    return zone_obj
+def page_response(model: type, docs: List[Dict], next_cursor: Optional[str]) -> FastJSONResponse:
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else None
+    return FastJSONResponse(trusted_documents(model, docs), headers=headers)
 
-@api_router.put("/zones/{zone_id}", response_model=Zone)
-async def update_zone(zone_id: str, zone_update: ZoneUpdate):
-    """Update a zone"""
-    update_data = {k: v for k, v in zone_update.dict().items() if v is not None}
-    
-    result = await db.zones.update_one(
-        {"id": zone_id},
-        {"$set": update_data}
-    )
+def stream_collection(
+    collection,
+    after: Optional[str] = None,
+    transform: Optional[Callable[[Dict], Dict]] = None
+) -> StreamingResponse:
+    """Stream a collection as NDJSON, one batch of documents at a time"""
+    mongo_filter = _page_filter(after)
     
-    if result.matched_count == 0:
-        raise HTTPException(status_code=404, detail="Zone not found")
+    async def generate():
+        cursor = collection.find(mongo_filter, {"_id": 0}).sort("_id", ASCENDING).batch_size(STREAM_BATCH_SIZE)
+        lines = []
+        async for doc in cursor:
+            lines.append(json_dumps(transform(doc) if transform else doc))
+            if len(lines) >= STREAM_BATCH_SIZE:
+                yield b"\n".join(lines) + b"\n"
+                lines = []
+        if lines:
+            yield b"\n".join(lines) + b"\n"
     
-    updated_zone = await db.zones.find_one({"id": zone_id})
-    return Zone(**updated_zone)
-
-@api_router.delete("/zones/{zone_id}")
-async def delete_zone(zone_id: str):
-    """Delete a zone"""
-    result = await db.zones.delete_one({"id": zone_id})
-    if result.deleted_count == 0:
-        raise HTTPException(status_code=404, detail="Zone not found")
-    return {"status": "success"}
-
-# Audio Sources Management
-@api_router.get("/sources", response_model=List[AudioSource])
-async def get_sources():
-    """Get all audio sources"""
-    sources = await db.audio_sources.find().to_list(1000)
-    return [AudioSource(**source) for source in sources]
-
-@api_router.post("/sources", response_model=AudioSource)
-async def create_source(source: AudioSourceCreate):
-    """Create a new audio source"""
-    source_dict = source.dict()
-    source_obj = AudioSource(**source_dict)
-    await db.audio_sources.insert_one(source_obj.dict())
-    return source_obj
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
 
-@api_router.delete("/sources/{source_id}")
-async def delete_source(source_id: str):
-    """Delete an audio source"""
-    result = await db.audio_sources.delete_one({"id": source_id})
-    if result.deleted_count == 0:
-        raise HTTPException(status_code=404, detail="Source not found")
-    return {"status": "success"}
+# Event bus
+class EventSubscriber:
+    """Bounded queue of serialized events for one connected client"""
+    def __init__(self, queue_size: int):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.dropped = False
+    
+    def drop(self):
+        # Discard the backlog and leave a single None so the reader wakes up
+        self.dropped = True
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(None)
 
-# Audio Sessions Management
-@api_router.get("/sessions", response_model=List[AudioSession])
-async def get_sessions():
-    """Get all audio sessions"""
-    sessions = await db.audio_sessions.find().to_list(1000)
-    return [AudioSession(**session) for session in sessions]
+class EventBus:
+    """In-process fan-out of change events to real-time subscribers.
 
-@api_router.post("/sessions", response_model=AudioSession)
-async def create_session(session: AudioSessionCreate):
-    """Create and start a new audio session"""
-    # Get zone and source info
-    zone = await db.zones.find_one({"id": session.zone_id})
-    if not zone:
-        raise HTTPException(status_code=404, detail="Zone not found")
+    Each event is serialized once and the same string is queued for every
+    subscriber. A subscriber whose queue is full is dropped instead of
+    slowing down publishers; its client reconnects and reloads its state.
+    """
+    def __init__(self, queue_size: int = EVENTS_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._subscribers: Set[EventSubscriber] = set()
+        # Bumped on every published change; a restart picks a new epoch so
+        # versions from a previous process never match
+        self.epoch = uuid.uuid4().hex[:12]
+        self.version = 0
+        # Called with every published event, to pass it on to other workers
+        self.forward: Optional[Callable[[str, Dict, str], None]] = None
     
-    source = await db.audio_sources.find_one({"id": session.source_id})
-    if not source:
-        raise HTTPException(status_code=404, detail="Audio source not found")
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
     
-    # Create session
-    session_dict = session.dict()
-    session_obj = AudioSession(**session_dict)
+    def subscribe(self) -> EventSubscriber:
+        subscriber = EventSubscriber(self.queue_size)
+        self._subscribers.add(subscriber)
+        return subscriber
     
-    # Save to database
-    await db.audio_sessions.insert_one(session_obj.dict())
+    def unsubscribe(self, subscriber: EventSubscriber):
+        self._subscribers.discard(subscriber)
     
-    # Start playback via Axis API
-    try:
-        audio_config = {
-            'source_url': source.get('url') or source.get('file_path'),
-            'volume': session_obj.volume,
-            'loop': session_obj.loop
-        }
-        
-        axis_response = await axis_client.start_audio_session(session.zone_id, audio_config)
-        
-        # Update session status
-        await db.audio_sessions.update_one(
-            {"id": session_obj.id},
-            {"$set": {"status": AudioSessionStatus.PLAYING, "started_at": datetime.utcnow()}}
-        )
-        
-        session_obj.status = AudioSessionStatus.PLAYING
-        session_obj.started_at = datetime.utcnow()
-        
-    except Exception as e:
-        logger.error(f"Failed to start audio session: {e}")
-        session_obj.status = AudioSessionStatus.ERROR
+    def publish(self, event_type: str, data: Dict):
+        """Queue an event such as "speaker.updated" for every subscriber"""
+        message = json_dumps(
+            {"type": event_type, "data": data, "timestamp": datetime.utcnow()}
+        ).decode()
+        self.deliver(message)
+        if self.forward is not None:
+            self.forward(event_type, data, message)
     
-    return session_obj
+    def deliver(self, message: str):
+        """Queue an already serialized event, e.g. one from another worker"""
+        self.version += 1
+        for subscriber in list(self._subscribers):
+            try:
+                subscriber.queue.put_nowait(message)
+            except asyncio.QueueFull:
+                logger.warning("Dropping slow event subscriber")
+                self._subscribers.discard(subscriber)
+                subscriber.drop()
 
-@api_router.put("/sessions/{session_id}/control")
-async def control_session(session_id: str, control: PlaybackControl):
-    """Control audio session playback"""
-    session = await db.audio_sessions.find_one({"id": session_id})
-    if not session:
-        raise HTTPException(status_code=404, detail="Session not found")
+event_bus = EventBus()
+
+# Request coalescing
+class SingleFlight:
+    """Share one in-flight call among concurrent identical requests.
+
+    The first caller for a key starts the call as a task and later callers
+    await the same task, so a burst of identical reads costs one Axis or
+    MongoDB round trip. Callers are shielded from each other: one that is
+    cancelled (e.g. its client disconnected) does not cancel the call for
+    the others. Results are shared, so callers must not modify them.
+    """
+    def __init__(self):
+        self._calls: Dict[Tuple[str, Any], asyncio.Task] = {}
+        self.calls: Dict[str, int] = {}
+        self.coalesced: Dict[str, int] = {}
     
-    # Update session status based on action
-    status_mapping = {
-        'play': AudioSessionStatus.PLAYING,
-        'pause': AudioSessionStatus.PAUSED,
-        'stop': AudioSessionStatus.STOPPED
-    }
+    async def do(self, group: str, key: Any, call: Callable[[], Awaitable[Any]]) -> Any:
+        """Await `call()`, or the identical call already in flight for (group, key)"""
+        flight = (group, key)
+        task = self._calls.get(flight)
+        if task is None:
+            self.calls[group] = self.calls.get(group, 0) + 1
+            task = asyncio.create_task(call())
+            self._calls[flight] = task
+            task.add_done_callback(lambda done: self._landed(flight, done))
+        else:
+            self.coalesced[group] = self.coalesced.get(group, 0) + 1
+        return await asyncio.shield(task)
     
-    new_status = status_mapping.get(control.action, AudioSessionStatus.PLAYING)
-    update_data = {"status": new_status}
+    def _landed(self, flight: Tuple[str, Any], task: asyncio.Task):
+        if self._calls.get(flight) is task:
+            del self._calls[flight]
+        # Retrieve the error so a call whose callers all left is not reported as unhandled
+        if not task.cancelled():
+            task.exception()
     
-    if control.position is not None:
-        update_data["position"] = control.position
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        return {
+            group: {
+                "calls": calls,
+                "coalesced": self.coalesced.get(group, 0),
+                "in_flight": sum(1 for flight in self._calls if flight[0] == group),
+            }
+            for group, calls in self.calls.items()
+        }
+
+request_flights = SingleFlight()
+
+async def coalesced_page(collection, limit: int, after: Optional[str] = None) -> Tuple[List[Dict], Optional[str]]:
+    """fetch_page shared by concurrent identical list requests.
+
+    The event bus version is part of the key, so a request made after a
+    published change never joins a read that started before it.
+    """
+    return await request_flights.do(
+        f"list:{collection.name}",
+        (limit, after, event_bus.version),
+        lambda: fetch_page(collection, limit, after)
+    )
+
+# Document cache
+class DocumentCache:
+    """Bounded LRU cache of documents by id, with per-entry expiry.
+
+    Entries are copied on the way in and out so callers can modify what
+    they get back without corrupting the cache.
+    """
+    def __init__(self, name: str, max_entries: int = CACHE_MAX_ENTRIES, ttl: float = CACHE_TTL_SECONDS):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
     
-    if control.action == "stop":
-        update_data["ended_at"] = datetime.utcnow()
+    def get(self, key: str) -> Optional[Dict]:
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return copy.deepcopy(entry[1])
     
-    await db.audio_sessions.update_one(
-        {"id": session_id},
-        {"$set": update_data}
-    )
+    def set(self, key: str, doc: Dict):
+        self._entries[key] = (time.monotonic() + self.ttl, copy.deepcopy(doc))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
     
-    # Send control to Axis system
-    await axis_client.control_playback(session_id, control.action, {"position": control.position})
+    def invalidate(self, key: str):
+        self._entries.pop(key, None)
     
-    return {"status": "success", "action": control.action}
-
-@api_router.delete("/sessions/{session_id}")
-async def delete_session(session_id: str):
-    """Stop and delete an audio session"""
-    # Stop the session first
-    await axis_client.control_playback(session_id, 'stop')
+    def clear(self):
+        self._entries.clear()
     
-    # Delete from database
-    result = await db.audio_sessions.delete_one({"id": session_id})
-    if result.deleted_count == 0:
-        raise HTTPException(status_code=404, detail="Session not found")
+    async def get_or_load(self, key: str, collection) -> Optional[Dict]:
+        """Return the document with this id, reading MongoDB on a miss"""
+        doc = self.get(key)
+        if doc is None:
+            doc = await collection.find_one({"id": key}, {"_id": 0})
+            if doc is not None:
+                self.set(key, doc)
+        return doc
     
-    return {"status": "success"}
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+        }
 
-# Include the router in the main app
-app.include_router(api_router)
+zone_cache = DocumentCache("zones")
+source_cache = DocumentCache("audio_sources")
+speaker_cache = DocumentCache("speakers")
 
-# CORS middleware
-app.add_middleware(
-    CORSMiddleware,
-    allow_credentials=True,
-    allow_origins=["*"],
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+async def get_zone(zone_id: str) -> Optional[Dict]:
+    return await zone_cache.get_or_load(zone_id, db.zones)
 
-@app.on_event("shutdown")
-async def shutdown_db_client():
-    client.close()
+async def get_source(source_id: str) -> Optional[Dict]:
+    return await source_cache.get_or_load(source_id, db.audio_sources)
 
-if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8001)
\ No newline at end of file
+async def get_speaker(speaker_id: str) -> Optional[Dict]:
+    return await speaker_cache.get_or_load(speaker_id, db.speakers)
+
+# Axis command queue
+class DeliveryStatus(str, Enum):
+    PENDING = "pending"
+    DELIVERED = "delivered"
+    FAILED = "failed"
+
+class AxisCommandQueue:
+    """Deliver Axis commands in the background, coalescing per target.
+
+    Commands are keyed by (command type, target id). Submitting a command
+    while an older one with the same key is still waiting replaces it, so
+    only the latest value is sent. Commands with the same key never run
+    concurrently, which keeps them in submission order.
+    """
+    def __init__(self, workers: int = AXIS_COMMAND_WORKERS):
+        self.workers = workers
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._pending: Dict[Tuple[str, str], Tuple[Callable[[], Awaitable], Callable[[Optional[str]], Awaitable]]] = {}
+        self._scheduled: Set[Tuple[str, str]] = set()
+        self._tasks: List[asyncio.Task] = []
+        self.submitted = 0
+        self.coalesced = 0
+        self.delivered = 0
+        self.failed = 0
+    
+    def submit(self, key: Tuple[str, str], send: Callable[[], Awaitable], report: Callable[[Optional[str]], Awaitable]):
+        """Queue `send`; `report` is awaited with the error (or None) once it ran"""
+        self.submitted += 1
+        if key in self._pending:
+            self.coalesced += 1
+        self._pending[key] = (send, report)
+        if key not in self._scheduled:
+            self._scheduled.add(key)
+            self._queue.put_nowait(key)
+    
+    def discard(self, key: Tuple[str, str]) -> Optional[Callable[[Optional[str]], Awaitable]]:
+        """Drop a waiting command, e.g. when the caller sends it directly.
+
+        Returns the dropped command's `report`, if any: its outcome is now
+        the caller's to record.
+        """
+        pending = self._pending.pop(key, None)
+        return pending[1] if pending else None
+    
+    def start(self):
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+    
+    async def stop(self, timeout: float = AXIS_COMMAND_DRAIN_TIMEOUT):
+        """Give waiting commands `timeout` seconds to go out, then stop"""
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Stopping Axis command queue with {len(self._pending)} commands undelivered")
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+    
+    async def _worker(self):
+        while True:
+            key = await self._queue.get()
+            try:
+                # Anything submitted for this key while we were sending is
+                # picked up here rather than by another worker
+                while key in self._pending:
+                    send, report = self._pending.pop(key)
+                    error = None
+                    try:
+                        await send()
+                        self.delivered += 1
+                    except Exception as e:
+                        error = e.detail if isinstance(e, HTTPException) else str(e)
+                        self.failed += 1
+                    # A newer command supersedes this outcome
+                    if key not in self._pending:
+                        try:
+                            await report(error)
+                        except Exception as e:
+                            logger.error(f"Failed to record delivery of Axis command {key}: {e}")
+            finally:
+                self._scheduled.discard(key)
+                self._queue.task_done()
+    
+    def stats(self) -> Dict[str, int]:
+        return {
+            "waiting": len(self._pending),
+            "submitted": self.submitted,
+            "coalesced": self.coalesced,
+            "delivered": self.delivered,
+            "failed": self.failed,
+        }
+
+axis_commands = AxisCommandQueue()
+
+def _delivery_reporter(collection, cache: Optional[DocumentCache], entity: str, doc_id: str) -> Callable[[Optional[str]], Awaitable]:
+    """Build the callback that stores a command outcome on its document"""
+    async def report(error: Optional[str]):
+        update = {
+            "delivery_status": DeliveryStatus.FAILED if error else DeliveryStatus.DELIVERED,
+            "delivery_error": error
+        }
+        await collection.update_one({"id": doc_id}, {"$set": update})
+        if cache is not None:
+            cache.invalidate(doc_id)
+        event_bus.publish(f"{entity}.updated", {"id": doc_id, **update})
+    return report
+
+def queue_speaker_volume(speaker_id: str, volume: int):
+    axis_commands.submit(
+        ("volume", speaker_id),
+        lambda: send_volumes({speaker_id: volume}),
+        _delivery_reporter(db.speakers, speaker_cache, "speaker", speaker_id)
+    )
+
+def queue_session_control(session_id: str, action: str, params: Dict):
+    axis_commands.submit(
+        ("control", session_id),
+        lambda: axis_client.control_playback(session_id, action, params, strict=True),
+        _delivery_reporter(db.audio_sessions, None, "session", session_id)
+    )
+
+# Session timeline
+def live_position(session: Dict, now: Optional[datetime] = None) -> Tuple[int, bool]:
+    """Playback position of a session at `now`, and whether its track has ended
+
+    `position` is only written on state transitions, together with
+    `position_updated_at`; while the session plays the position advances
+    from that anchor, wrapping around `duration` when it loops.
+    """
+    position = session.get("position") or 0
+    anchor = session.get("position_updated_at")
+    if session.get("status") != AudioSessionStatus.PLAYING or anchor is None:
+        return position, False
+    
+    elapsed = position + max(0.0, ((now or datetime.utcnow()) - anchor).total_seconds())
+    duration = session.get("duration")
+    if not duration:
+        return int(elapsed), False
+    if session.get("loop"):
+        return int(elapsed % duration), False
+    if elapsed >= duration:
+        return duration, True
+    return int(elapsed), False
+
+def with_live_position(session: Dict, now: Optional[datetime] = None) -> Dict:
+    """Copy of a session document as of `now`, for responses"""
+    if session.get("status") != AudioSessionStatus.PLAYING or session.get("position_updated_at") is None:
+        return session
+    now = now or datetime.utcnow()
+    position, ended = live_position(session, now)
+    if ended:
+        # The timeline records this shortly; answer as if it already had
+        ends_at = SessionTimeline.end_of_track(session)
+        return {**session, "status": AudioSessionStatus.STOPPED, "position": position,
+                "position_updated_at": ends_at, "ended_at": ends_at}
+    return {**session, "position": position, "position_updated_at": now}
+
+class SessionTimeline:
+    """Record the end of playing sessions' tracks without per-tick writes.
+
+    Positions are computed on read by live_position(), so the only write a
+    playing session needs is the STOPPED transition when a non-looping
+    track runs out. The timeline keeps those end times in a heap and sleeps
+    until the earliest one; looping sessions and sessions without a
+    duration never end on their own and are not tracked.
+    """
+    def __init__(self):
+        self._heap: List[Tuple[datetime, str]] = []
+        # Current end time and anchor per session; heap entries that no
+        # longer match are stale and skipped
+        self._tracked: Dict[str, Tuple[datetime, datetime, int]] = {}
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self.finished = 0
+    
+    @staticmethod
+    def end_of_track(session: Dict) -> Optional[datetime]:
+        anchor = session.get("position_updated_at")
+        duration = session.get("duration")
+        if (session.get("status") != AudioSessionStatus.PLAYING or anchor is None
+                or not duration or session.get("loop")):
+            return None
+        return anchor + timedelta(seconds=max(0, duration - (session.get("position") or 0)))
+    
+    def track(self, session: Dict):
+        """Follow a session after a state transition"""
+        if self._task is None:
+            # Not running here: another worker holds the background jobs
+            return
+        session_id = session["id"]
+        ends_at = self.end_of_track(session)
+        if ends_at is None:
+            self._tracked.pop(session_id, None)
+            return
+        self._tracked[session_id] = (ends_at, session["position_updated_at"], session["duration"])
+        heapq.heappush(self._heap, (ends_at, session_id))
+        if len(self._heap) > 2 * len(self._tracked) + 64:
+            self._heap = [(ends_at, session_id) for session_id, (ends_at, _, _) in self._tracked.items()]
+            heapq.heapify(self._heap)
+        if self._heap[0][1] == session_id:
+            self._wakeup.set()
+    
+    def forget(self, session_id: str):
+        self._tracked.pop(session_id, None)
+    
+    async def load(self):
+        """Track the sessions that were playing before a restart"""
+        cursor = db.audio_sessions.find(
+            {"status": AudioSessionStatus.PLAYING, "loop": {"$ne": True}, "duration": {"$gt": 0}},
+            {"_id": 0, "id": 1, "status": 1, "position": 1, "position_updated_at": 1, "duration": 1, "loop": 1}
+        )
+        async for session in cursor:
+            self.track(session)
+    
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+    
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._heap.clear()
+        self._tracked.clear()
+    
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            timeout = None
+            if self._heap:
+                timeout = max(0.0, (self._heap[0][0] - datetime.utcnow()).total_seconds())
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+            
+            now = datetime.utcnow()
+            while self._heap and self._heap[0][0] <= now:
+                ends_at, session_id = heapq.heappop(self._heap)
+                tracked = self._tracked.get(session_id)
+                if tracked is None or tracked[0] != ends_at:
+                    continue
+                del self._tracked[session_id]
+                try:
+                    await self._finish(session_id, *tracked)
+                except Exception as e:
+                    logger.error(f"Failed to end audio session {session_id}: {e}")
+    
+    async def _finish(self, session_id: str, ends_at: datetime, anchor: datetime, duration: int):
+        update = {
+            "status": AudioSessionStatus.STOPPED,
+            "position": duration,
+            "position_updated_at": ends_at,
+            "ended_at": ends_at
+        }
+        # A control that moved the anchor in the meantime wins
+        result = await db.audio_sessions.update_one(
+            {"id": session_id, "status": AudioSessionStatus.PLAYING, "position_updated_at": anchor},
+            {"$set": update}
+        )
+        if result.matched_count:
+            self.finished += 1
+            event_bus.publish("session.updated", {"id": session_id, **update})
+    
+    def stats(self) -> Dict[str, int]:
+        return {"tracked": len(self._tracked), "finished": self.finished}
+
+session_timeline = SessionTimeline()
+
+# Session start
+RELAYED_SOURCE_TYPES = (AudioSourceType.STREAMING, AudioSourceType.RADIO)
+
+# Ids of sessions whose Axis start is still in flight
+session_starts: Set[str] = set()
+
+def source_playback_url(source: Dict) -> Optional[str]:
+    """URL speakers fetch a source from"""
+    base_url = AXIS_MEDIA_BASE_URL.rstrip('/')
+    # Local files are only reachable by speakers through our stream endpoint
+    if source.get('file_path') and not source.get('url') and base_url:
+        return f"{base_url}/api/sources/{source['id']}/stream"
+    # Zones playing the same stream share one upstream connection
+    if source.get('url') and source.get('type') in RELAYED_SOURCE_TYPES and base_url and RELAY_ENABLED:
+        return f"{base_url}/api/relay/{source['id']}"
+    return source.get('url') or source.get('file_path')
+
+def build_audio_config(source: Dict, session: AudioSession) -> Dict:
+    """Axis playback settings for a session"""
+    return {
+        'source_url': source_playback_url(source),
+        'volume': session.volume,
+        'loop': session.loop
+    }
+
+async def open_session(session: AudioSession):
+    """Record a new PREPARING session; start_session_playback() starts it"""
+    await db.audio_sessions.insert_one(session.dict())
+    event_bus.publish("session.created", session.dict())
+
+async def start_session_playback(session_id: str, zone_id: str, audio_config: Dict):
+    """Start a PREPARING session on Axis and record PLAYING or ERROR"""
+    session_starts.add(session_id)
+    try:
+        try:
+            await axis_client.start_audio_session(zone_id, audio_config, strict=True)
+            started_at = datetime.utcnow()
+            update = {
+                "status": AudioSessionStatus.PLAYING,
+                "started_at": started_at,
+                "position_updated_at": started_at,
+                "delivery_status": DeliveryStatus.DELIVERED,
+                "delivery_error": None
+            }
+        except Exception as e:
+            logger.error(f"Failed to start audio session {session_id}: {e}")
+            update = {
+                "status": AudioSessionStatus.ERROR,
+                "delivery_status": DeliveryStatus.FAILED,
+                "delivery_error": e.detail if isinstance(e, HTTPException) else str(e)
+            }
+        
+        # Leave sessions that were stopped or deleted in the meantime alone
+        session = await db.audio_sessions.find_one_and_update(
+            {"id": session_id, "status": AudioSessionStatus.PREPARING},
+            {"$set": update},
+            return_document=ReturnDocument.AFTER
+        )
+        if session:
+            session_timeline.track(session)
+            event_bus.publish("session.updated", {"id": session_id, **update})
+    finally:
+        session_starts.discard(session_id)
+
+async def fail_stale_session_starts(older_than: float = SESSION_START_TIMEOUT) -> int:
+    """Move sessions left PREPARING by a lost start to ERROR; returns how many"""
+    cutoff = datetime.utcnow() - timedelta(seconds=older_than)
+    stale = [
+        session["id"]
+        async for session in db.audio_sessions.find(
+            {"status": AudioSessionStatus.PREPARING, "created_at": {"$lt": cutoff}}, {"_id": 0, "id": 1}
+        )
+        if session["id"] not in session_starts
+    ]
+    update = {
+        "status": AudioSessionStatus.ERROR,
+        "delivery_status": DeliveryStatus.FAILED,
+        "delivery_error": "Start interrupted before it reached Axis"
+    }
+    failed = 0
+    for session_id in stale:
+        result = await db.audio_sessions.update_one({"id": session_id, "status": AudioSessionStatus.PREPARING}, {"$set": update})
+        if result.modified_count:
+            failed += 1
+            event_bus.publish("session.updated", {"id": session_id, **update})
+    return failed
+
+async def sweep_session_starts(interval: float = SESSION_START_TIMEOUT):
+    """Run fail_stale_session_starts() now and then every `interval` seconds"""
+    while True:
+        try:
+            failed = await fail_stale_session_starts()
+            if failed:
+                logger.warning(f"Moved {failed} sessions whose start was lost to ERROR")
+        except Exception as e:
+            logger.error(f"Sweep of stale session starts failed: {e}")
+        await asyncio.sleep(interval)
+
+async def drain_session_starts(timeout: float = AXIS_COMMAND_DRAIN_TIMEOUT):
+    """Give starts still in flight `timeout` seconds to record their outcome"""
+    deadline = time.monotonic() + timeout
+    while session_starts and time.monotonic() < deadline:
+        await asyncio.sleep(0.05)
+    if session_starts:
+        logger.warning(f"Stopping with {len(session_starts)} session starts in flight")
+
+# Scheduler
+def to_utc(value: datetime) -> datetime:
+    """Naive UTC datetime, as stored everywhere else"""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+def _to_local(value: datetime, tz: ZoneInfo) -> datetime:
+    """Naive UTC -> naive wall-clock time in `tz`"""
+    return value.replace(tzinfo=timezone.utc).astimezone(tz).replace(tzinfo=None)
+
+def _from_local(value: datetime, tz: ZoneInfo) -> datetime:
+    """Naive wall-clock time in `tz` -> naive UTC"""
+    return value.replace(tzinfo=tz).astimezone(timezone.utc).replace(tzinfo=None)
+
+def next_fire_time(schedule: Dict, after: datetime) -> Optional[datetime]:
+    """First fire of a schedule strictly after `after`, None if there is none.
+
+    Repeats are counted in the schedule's local wall-clock time, so a daily
+    08:00 bell stays at 08:00 across DST changes; weekdays are local too.
+    """
+    start_at = schedule["start_at"]
+    interval = schedule.get("interval")
+    if not interval:
+        return start_at if start_at > after else None
+    
+    tz = ZoneInfo(schedule["timezone"]) if schedule.get("timezone") else timezone.utc
+    start = _to_local(start_at, tz)
+    step = timedelta(seconds=interval)
+    
+    def first_fire_from(local: datetime) -> datetime:
+        """Local time of the first fire at or after `local`"""
+        if local <= start:
+            return start
+        # Ceiling division, in whole intervals
+        return start + step * -((start - local) // step)
+    
+    fire_at = first_fire_from(_to_local(after, tz))
+    # Local times repeated when clocks go back can map at or before `after`
+    while _from_local(fire_at, tz) <= after:
+        fire_at += step
+    
+    weekdays = schedule.get("weekdays")
+    if weekdays:
+        # Jump to the next allowed day instead of stepping through every
+        # fire in between; a week of days without a match means none ever will
+        for _ in range(8):
+            if fire_at.weekday() in weekdays:
+                break
+            days = next((n for n in range(1, 8) if (fire_at.weekday() + n) % 7 in weekdays), 7)
+            midnight = datetime.combine(fire_at.date() + timedelta(days=days), datetime.min.time())
+            fire_at = first_fire_from(midnight)
+        else:
+            return None
+    return _from_local(fire_at, tz)
+
+class PlaybackScheduler:
+    """Start sessions at the times given by the schedules collection.
+
+    Upcoming fires are kept in a min-heap. SCHEDULER_PREWARM_SECONDS before
+    a fire, a task resolves the zone and source, builds the session and
+    opens pooled connections to Axis through the zone's speakers, so at the
+    fire time only the claim, the insert and the Axis call remain; fires
+    due in the same second run concurrently.
+
+    A fire is claimed by atomically moving the schedule's next_fire_at from
+    the fire time to the following one, so a restart or a second process
+    can never fire it twice. A fire claimed later than
+    SCHEDULER_MISFIRE_GRACE seconds (e.g. after downtime) is skipped. A
+    fire that fails before its claim is retried with backoff, so that a
+    MongoDB error does not stop a repeating schedule.
+    """
+    RETRY_DELAY = 2.0
+    
+    def __init__(self, prewarm: float = SCHEDULER_PREWARM_SECONDS, misfire_grace: float = SCHEDULER_MISFIRE_GRACE):
+        self.prewarm = prewarm
+        self.misfire_grace = misfire_grace
+        self._heap: List[Tuple[datetime, str]] = []
+        self._next: Dict[str, datetime] = {}
+        self._fires: Set[asyncio.Task] = set()
+        # Consecutive fires of a schedule that failed before their claim
+        self._retries: Dict[str, int] = {}
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self.fired = 0
+        self.missed = 0
+        self.failed = 0
+    
+    def track(self, schedule: Dict):
+        """Follow a schedule after it was created, changed or fired"""
+        if self._task is None:
+            # Not running here: another worker holds the background jobs
+            return
+        schedule_id = schedule["id"]
+        fire_at = schedule.get("next_fire_at") if schedule.get("enabled", True) else None
+        if fire_at is None:
+            self._next.pop(schedule_id, None)
+            return
+        if self._next.get(schedule_id) == fire_at:
+            return
+        self._next[schedule_id] = fire_at
+        heapq.heappush(self._heap, (fire_at, schedule_id))
+        if len(self._heap) > 2 * len(self._next) + 64:
+            self._heap = [(fire_at, schedule_id) for schedule_id, fire_at in self._next.items()]
+            heapq.heapify(self._heap)
+        if self._heap[0][1] == schedule_id:
+            self._wakeup.set()
+    
+    def forget(self, schedule_id: str):
+        self._next.pop(schedule_id, None)
+        self._retries.pop(schedule_id, None)
+    
+    async def load(self):
+        async for schedule in db.schedules.find({"enabled": True, "next_fire_at": {"$ne": None}}, {"_id": 0}):
+            self.track(schedule)
+    
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+    
+    async def stop(self):
+        tasks = [task for task in [self._task, *self._fires] if task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._task = None
+        self._fires.clear()
+        self._retries.clear()
+        self._heap.clear()
+        self._next.clear()
+    
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            timeout = None
+            if self._heap:
+                wake_at = self._heap[0][0] - timedelta(seconds=self.prewarm)
+                timeout = max(0.0, (wake_at - datetime.utcnow()).total_seconds())
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+            
+            horizon = datetime.utcnow() + timedelta(seconds=self.prewarm)
+            while self._heap and self._heap[0][0] <= horizon:
+                fire_at, schedule_id = heapq.heappop(self._heap)
+                if self._next.get(schedule_id) != fire_at:
+                    continue
+                del self._next[schedule_id]
+                self._spawn(self._fire(schedule_id, fire_at))
+    
+    def _spawn(self, coroutine: Awaitable):
+        task = asyncio.create_task(coroutine)
+        self._fires.add(task)
+        task.add_done_callback(self._fires.discard)
+    
+    async def _retry(self, schedule_id: str):
+        """Follow a schedule again after its fire failed before the claim"""
+        while True:
+            attempt = self._retries.get(schedule_id, 0) + 1
+            self._retries[schedule_id] = attempt
+            await asyncio.sleep(min(self.RETRY_DELAY * 2 ** (attempt - 1), 60))
+            try:
+                schedule = await db.schedules.find_one({"id": schedule_id}, {"_id": 0})
+            except PyMongoError as e:
+                logger.warning(f"Could not reload schedule {schedule_id}: {e}")
+                continue
+            if schedule and schedule.get("enabled", True) and schedule.get("next_fire_at"):
+                self.track(schedule)
+            else:
+                self._retries.pop(schedule_id, None)
+            return
+    
+    async def _prepare(self, schedule: Dict, fire_at: datetime) -> Optional[Tuple[AudioSession, Dict]]:
+        """Resolve what the fire needs ahead of time"""
+        zone, source = await asyncio.gather(get_zone(schedule["zone_id"]), get_source(schedule["source_id"]))
+        if not zone or not source:
+            logger.error(f"Schedule {schedule['id']} refers to a missing zone or source")
+            return None
+        # Bounded by the fire time: a slow Axis API must not delay the fire
+        warm_up_time = (fire_at - datetime.utcnow()).total_seconds()
+        if warm_up_time > 0 and zone.get("speaker_ids"):
+            try:
+                await asyncio.wait_for(axis_client.warm_up(zone["speaker_ids"]), warm_up_time)
+            except asyncio.TimeoutError:
+                pass
+        session = AudioSession(
+            name=schedule["name"],
+            zone_id=schedule["zone_id"],
+            source_id=schedule["source_id"],
+            status=AudioSessionStatus.PREPARING,
+            delivery_status=DeliveryStatus.PENDING,
+            duration=source.get("duration"),
+            schedule_id=schedule["id"]
+        )
+        return session, build_audio_config(source, session)
+    
+    async def _fire(self, schedule_id: str, fire_at: datetime):
+        claimed = None
+        try:
+            schedule = await db.schedules.find_one({"id": schedule_id, "next_fire_at": fire_at}, {"_id": 0})
+            if not schedule or not schedule.get("enabled", True):
+                return
+            prepared = await self._prepare(schedule, fire_at)
+            
+            delay = (fire_at - datetime.utcnow()).total_seconds()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            
+            now = datetime.utcnow()
+            late = (now - fire_at).total_seconds() > self.misfire_grace
+            update = {"next_fire_at": next_fire_time(schedule, max(fire_at, now))}
+            if not late and prepared:
+                update.update(last_fired_at=fire_at, last_session_id=prepared[0].id)
+            
+            # Claim the fire: only one claimer sees next_fire_at == fire_at
+            claimed = await db.schedules.find_one_and_update(
+                {"id": schedule_id, "next_fire_at": fire_at, "enabled": True},
+                {"$set": update},
+                return_document=ReturnDocument.AFTER
+            )
+            if not claimed:
+                return
+            self._retries.pop(schedule_id, None)
+            self.track(claimed)
+            event_bus.publish("schedule.updated", {"id": schedule_id, **update})
+            
+            if late:
+                self.missed += 1
+                logger.warning(f"Skipped schedule {schedule_id} fire at {fire_at.isoformat()}: missed by more than {self.misfire_grace}s")
+                return
+            if not prepared:
+                self.failed += 1
+                return
+            
+            session, audio_config = prepared
+            await open_session(session)
+            self.fired += 1
+            await start_session_playback(session.id, session.zone_id, audio_config)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.failed += 1
+            logger.error(f"Failed to fire schedule {schedule_id}: {e}")
+            if not claimed:
+                # Nothing moved next_fire_at, so nothing would track the schedule again
+                self._spawn(self._retry(schedule_id))
+    
+    def stats(self) -> Dict[str, int]:
+        return {
+            "tracked": len(self._next),
+            "pending_fires": len(self._fires),
+            "retrying": len(self._retries),
+            "fired": self.fired,
+            "missed": self.missed,
+            "failed": self.failed,
+        }
+
+playback_scheduler = PlaybackScheduler()
+
+# Audio metadata probe
+class ProbeError(Exception):
+    """Container headers that cannot be read or are not supported"""
+
+_MP3_BITRATES = {
+    (1, 1): [0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448],
+    (1, 2): [0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384],
+    (1, 3): [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    (2, 1): [0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256],
+    (2, 2): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+    (2, 3): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+_MP3_SAMPLE_RATES = {1: [44100, 48000, 32000], 2: [22050, 24000, 16000], 2.5: [11025, 12000, 8000]}
+
+_STREAM_CODECS = {
+    "audio/mpeg": "mp3",
+    "audio/mp3": "mp3",
+    "audio/aac": "aac",
+    "audio/aacp": "aac",
+    "audio/ogg": "ogg",
+    "application/ogg": "ogg",
+    "audio/flac": "flac",
+}
+
+ProbeRead = Callable[[int, int], Awaitable[bytes]]
+
+async def _read_at(head: bytes, read: ProbeRead, offset: int, length: int) -> bytes:
+    """Bytes at `offset`, from the header already read when possible"""
+    if offset + length <= len(head):
+        return head[offset:offset + length]
+    return await read(offset, length)
+
+def _mp3_frame(data: bytes, offset: int) -> Optional[Dict]:
+    """Decode the MPEG audio frame header at `offset`, None if there is none"""
+    if offset + 4 > len(data) or data[offset] != 0xFF or data[offset + 1] & 0xE0 != 0xE0:
+        return None
+    b1, b2, b3 = data[offset + 1], data[offset + 2], data[offset + 3]
+    version_bits, layer_bits = (b1 >> 3) & 3, (b1 >> 1) & 3
+    bitrate_index, rate_index = b2 >> 4, (b2 >> 2) & 3
+    if version_bits == 1 or layer_bits == 0 or bitrate_index in (0, 15) or rate_index == 3:
+        return None
+    
+    version = {3: 1, 2: 2, 0: 2.5}[version_bits]
+    layer = 4 - layer_bits
+    bitrate = _MP3_BITRATES[(1 if version == 1 else 2, layer)][bitrate_index] * 1000
+    sample_rate = _MP3_SAMPLE_RATES[version][rate_index]
+    samples = 384 if layer == 1 else (1152 if layer == 2 or version == 1 else 576)
+    padding = (b2 >> 1) & 1
+    if layer == 1:
+        length = (12 * bitrate // sample_rate + padding) * 4
+    else:
+        length = samples // 8 * bitrate // sample_rate + padding
+    return {
+        "version": version,
+        "layer": layer,
+        "bitrate": bitrate,
+        "sample_rate": sample_rate,
+        "channels": 1 if b3 >> 6 == 3 else 2,
+        "samples": samples,
+        "length": length,
+    }
+
+def _parse_mp3(data: bytes, audio_start: int, size: Optional[int]) -> Dict:
+    """MPEG audio: first frame, then a Xing/Info or VBRI header if any, else CBR"""
+    for offset in range(max(0, len(data) - 4)):
+        frame = _mp3_frame(data, offset)
+        # Require the next frame to follow so stray sync bytes are skipped
+        if frame and (offset + frame["length"] + 4 > len(data) or _mp3_frame(data, offset + frame["length"])):
+            break
+    else:
+        raise ProbeError("No MPEG audio frame found")
+    
+    result = {
+        "codec": "mp3" if frame["layer"] == 3 else f"mp{frame['layer']}",
+        "sample_rate": frame["sample_rate"],
+        "channels": frame["channels"],
+        "bitrate": frame["bitrate"],
+    }
+    audio_bytes = size - audio_start - offset if size else None
+    
+    frames = stream_bytes = None
+    side_info = (32 if frame["channels"] == 2 else 17) if frame["version"] == 1 else (17 if frame["channels"] == 2 else 9)
+    xing = offset + 4 + side_info
+    if data[xing:xing + 4] in (b"Xing", b"Info"):
+        flags = struct.unpack(">I", data[xing + 4:xing + 8])[0]
+        field_at = xing + 8
+        if flags & 1:
+            frames = struct.unpack(">I", data[field_at:field_at + 4])[0]
+            field_at += 4
+        if flags & 2:
+            stream_bytes = struct.unpack(">I", data[field_at:field_at + 4])[0]
+    elif data[offset + 36:offset + 40] == b"VBRI":
+        stream_bytes, frames = struct.unpack(">II", data[offset + 46:offset + 54])
+    
+    if frames:
+        result["duration"] = frames * frame["samples"] / frame["sample_rate"]
+        if stream_bytes or audio_bytes:
+            result["bitrate"] = int((stream_bytes or audio_bytes) * 8 / result["duration"])
+    elif audio_bytes:
+        result["duration"] = audio_bytes * 8 / frame["bitrate"]
+    return result
+
+async def _parse_wav(head: bytes, read: ProbeRead, size: Optional[int]) -> Dict:
+    """RIFF/WAVE: fmt chunk for the format, data chunk size for the duration"""
+    offset = 12
+    fmt = data_size = None
+    for _ in range(64):
+        header = await _read_at(head, read, offset, 8)
+        if len(header) < 8:
+            break
+        chunk_id, chunk_size = header[:4], struct.unpack("<I", header[4:])[0]
+        if chunk_id == b"fmt ":
+            fmt = struct.unpack("<HHIIHH", (await _read_at(head, read, offset + 8, 16))[:16])
+        elif chunk_id == b"data":
+            data_size = chunk_size
+            break
+        offset += 8 + chunk_size + (chunk_size & 1)
+    if fmt is None:
+        raise ProbeError("WAV file without a fmt chunk")
+    
+    audio_format, channels, sample_rate, byte_rate, _, bits = fmt
+    # Streamed WAV files leave the data size unset
+    if data_size in (None, 0, 0xFFFFFFFF) and size:
+        data_size = size - offset - 8
+    result = {
+        "codec": {1: "pcm", 3: "pcm_float", 0xFFFE: "pcm"}.get(audio_format, f"wav_{audio_format:#x}"),
+        "sample_rate": sample_rate,
+        "channels": channels,
+        "bits_per_sample": bits,
+        "bitrate": byte_rate * 8,
+    }
+    if data_size and byte_rate:
+        result["duration"] = data_size / byte_rate
+    return result
+
+def _parse_flac_streaminfo(info: bytes, size: Optional[int]) -> Dict:
+    if len(info) < 18:
+        raise ProbeError("Truncated FLAC STREAMINFO block")
+    sample_rate = (info[10] << 12) | (info[11] << 4) | (info[12] >> 4)
+    total_samples = ((info[13] & 0x0F) << 32) | struct.unpack(">I", info[14:18])[0]
+    result = {
+        "codec": "flac",
+        "sample_rate": sample_rate,
+        "channels": ((info[12] >> 1) & 7) + 1,
+        "bits_per_sample": (((info[12] & 1) << 4) | (info[13] >> 4)) + 1,
+    }
+    if total_samples and sample_rate:
+        result["duration"] = total_samples / sample_rate
+        if size:
+            result["bitrate"] = int(size * 8 / result["duration"])
+    return result
+
+async def _parse_ogg(head: bytes, read: ProbeRead, size: Optional[int]) -> Dict:
+    """Ogg Vorbis/Opus: identification header, then the last page's granule position"""
+    if len(head) < 28:
+        raise ProbeError("Truncated Ogg page")
+    packet = head[27 + head[26]:]
+    pre_skip = 0
+    if packet.startswith(b"\x01vorbis") and len(packet) >= 24:
+        sample_rate = granule_rate = struct.unpack("<I", packet[12:16])[0]
+        result = {"codec": "vorbis", "channels": packet[11], "sample_rate": sample_rate}
+        nominal = struct.unpack("<i", packet[20:24])[0]
+        if nominal > 0:
+            result["bitrate"] = nominal
+    elif packet.startswith(b"OpusHead") and len(packet) >= 16:
+        pre_skip = struct.unpack("<H", packet[10:12])[0]
+        granule_rate = 48000
+        result = {"codec": "opus", "channels": packet[9], "sample_rate": struct.unpack("<I", packet[12:16])[0] or 48000}
+    else:
+        raise ProbeError("Unsupported Ogg codec")
+    
+    if size:
+        try:
+            tail = await read(max(0, size - SOURCE_PROBE_HEAD_BYTES), min(size, SOURCE_PROBE_HEAD_BYTES))
+        except ProbeError:
+            tail = b""
+        last_page = tail.rfind(b"OggS")
+        if last_page >= 0 and last_page + 14 <= len(tail):
+            granule = struct.unpack("<q", tail[last_page + 6:last_page + 14])[0]
+            if granule > pre_skip:
+                result["duration"] = (granule - pre_skip) / granule_rate
+                result["bitrate"] = int(size * 8 / result["duration"])
+    return result
+
+async def parse_audio_headers(head: bytes, read: ProbeRead, size: Optional[int]) -> Dict:
+    """Duration and format of an audio file from its first bytes.
+
+    `read(offset, length)` fetches more when a container keeps what we need
+    elsewhere (large ID3 tags, WAV chunks, the last Ogg page); `size` is
+    the file size, None for live streams.
+    """
+    audio_start = 0
+    if head[:3] == b"ID3" and len(head) >= 10:
+        tag_size = (head[6] & 0x7F) << 21 | (head[7] & 0x7F) << 14 | (head[8] & 0x7F) << 7 | (head[9] & 0x7F)
+        audio_start = 10 + tag_size + (10 if head[5] & 0x10 else 0)
+        # Small tags leave the first frames in what was already read, so
+        # origins without range support can still be probed
+        rest = head[audio_start:]
+        if len(rest) < SOURCE_PROBE_MIN_AUDIO_BYTES and not (size and audio_start + len(rest) >= size):
+            try:
+                rest = await read(audio_start, SOURCE_PROBE_HEAD_BYTES)
+            except ProbeError:
+                if not rest:
+                    raise
+        head = rest
+    
+    if head.startswith(b"fLaC"):
+        if head[4] & 0x7F != 0:
+            raise ProbeError("FLAC file without a leading STREAMINFO block")
+        result = _parse_flac_streaminfo(head[8:42], size - audio_start if size else None)
+    elif head[:4] == b"RIFF" and head[8:12] == b"WAVE":
+        result = await _parse_wav(head, read, size)
+    elif head.startswith(b"OggS"):
+        result = await _parse_ogg(head, read, size)
+    else:
+        result = _parse_mp3(head, audio_start, size)
+    return {key: value for key, value in result.items() if value is not None}
+
+def _stream_headers_metadata(headers: httpx.Headers) -> Dict:
+    """Format of a live stream from its Icecast/SHOUTcast response headers"""
+    result = {"live": True}
+    content_type = headers.get("content-type", "").split(";")[0].strip().lower()
+    if content_type in _STREAM_CODECS:
+        result["codec"] = _STREAM_CODECS[content_type]
+    
+    info = dict(
+        item.strip().split("=", 1)
+        for item in headers.get("ice-audio-info", "").split(";")
+        if "=" in item
+    )
+    bitrate = headers.get("icy-br") or info.get("ice-bitrate") or info.get("bitrate")
+    sample_rate = headers.get("icy-sr") or info.get("ice-samplerate") or info.get("samplerate")
+    channels = info.get("ice-channels") or info.get("channels")
+    try:
+        if bitrate:
+            result["bitrate"] = int(bitrate.split(",")[0]) * 1000
+        if sample_rate:
+            result["sample_rate"] = int(sample_rate)
+        if channels:
+            result["channels"] = int(channels)
+    except ValueError:
+        pass
+    return result
+
+def _read_file_range(path: str, offset: int, length: int) -> bytes:
+    with open(path, "rb") as f:
+        f.seek(offset)
+        return f.read(length)
+
+class SourceProber:
+    """Fill in source duration and audio metadata in the background.
+
+    Only container headers are read: partial reads for local files and
+    HTTP range requests for URLs. Results are cached in the source_probes
+    collection, keyed by file path (validated by mtime and size) or URL
+    (revalidated with the server's ETag/Last-Modified), so re-adding the
+    same media is free. SOURCE_PROBE_WORKERS probes run at a time.
+    """
+    def __init__(self, workers: int = SOURCE_PROBE_WORKERS):
+        self.workers = workers
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._scheduled: Set[str] = set()
+        self._tasks: List[asyncio.Task] = []
+        self._http: Optional[httpx.AsyncClient] = None
+        self.probed = 0
+        self.cached = 0
+        self.failed = 0
+    
+    @property
+    def http(self) -> httpx.AsyncClient:
+        if self._http is None or self._http.is_closed:
+            self._http = httpx.AsyncClient(timeout=SOURCE_PROBE_TIMEOUT, follow_redirects=True)
+        return self._http
+    
+    def submit(self, source_id: str):
+        if source_id not in self._scheduled:
+            self._scheduled.add(source_id)
+            self._queue.put_nowait(source_id)
+    
+    async def load(self):
+        """Queue sources still waiting for a probe, e.g. after a restart"""
+        async for source in db.audio_sources.find({"probe_status": "pending"}, {"_id": 0, "id": 1}):
+            self.submit(source["id"])
+    
+    def start(self):
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+    
+    async def stop(self):
+        # Unfinished probes stay pending and are picked up by load()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._http is not None:
+            await self._http.aclose()
+    
+    async def _worker(self):
+        while True:
+            source_id = await self._queue.get()
+            try:
+                await self.probe(source_id)
+            except Exception as e:
+                logger.error(f"Failed to record probe of source {source_id}: {e}")
+            finally:
+                self._scheduled.discard(source_id)
+                self._queue.task_done()
+    
+    async def _cached(self, key: str, validator: Optional[str] = None) -> Optional[Dict]:
+        entry = await db.source_probes.find_one({"key": key}, {"_id": 0})
+        if entry and (validator is None or entry.get("validator") == validator):
+            return entry
+        return None
+    
+    async def _store(self, key: str, validator: Optional[str], result: Dict):
+        await db.source_probes.update_one(
+            {"key": key},
+            {"$set": {"validator": validator, "result": result, "probed_at": datetime.utcnow()}},
+            upsert=True
+        )
+    
+    async def _probe_file(self, path: str) -> Tuple[Dict, bool]:
+        try:
+            stat = await asyncio.to_thread(os.stat, path)
+        except OSError as e:
+            raise ProbeError(f"Cannot read {path}: {e.strerror}")
+        key, validator = f"file:{path}", f"{stat.st_mtime_ns}:{stat.st_size}"
+        cached = await self._cached(key, validator)
+        if cached:
+            return cached["result"], True
+        
+        async def read(offset: int, length: int) -> bytes:
+            return await asyncio.to_thread(_read_file_range, path, offset, length)
+        
+        result = await parse_audio_headers(await read(0, SOURCE_PROBE_HEAD_BYTES), read, stat.st_size)
+        await self._store(key, validator, result)
+        return result, False
+    
+    async def _probe_url(self, url: str) -> Tuple[Dict, bool]:
+        key = f"url:{url}"
+        cached = await self._cached(key)
+        headers = {"Range": f"bytes=0-{SOURCE_PROBE_HEAD_BYTES - 1}"}
+        if cached and cached.get("validator"):
+            validator_header = "If-None-Match" if cached["validator"].startswith(('"', 'W/')) else "If-Modified-Since"
+            headers[validator_header] = cached["validator"]
+        
+        # Stream the response so a server ignoring the range (or a live
+        # stream) costs only the bytes we keep
+        async with self.http.stream("GET", url, headers=headers) as response:
+            if response.status_code == 304 and cached:
+                return cached["result"], True
+            if response.status_code >= 400:
+                raise ProbeError(f"HTTP {response.status_code} from {url}")
+            head = bytearray()
+            async for chunk in response.aiter_bytes():
+                head += chunk
+                if len(head) >= SOURCE_PROBE_HEAD_BYTES:
+                    break
+            status, response_headers = response.status_code, response.headers
+        head = bytes(head[:SOURCE_PROBE_HEAD_BYTES])
+        
+        live = status == 200 and (
+            "content-length" not in response_headers
+            or any(name.startswith(("icy-", "ice-")) for name in response_headers)
+        )
+        if live:
+            result = _stream_headers_metadata(response_headers)
+            try:
+                frame_info = _parse_mp3(head, 0, None) if result.get("codec") in (None, "mp3") else {}
+            except ProbeError:
+                frame_info = {}
+            return {**frame_info, **result}, False
+        
+        size = None
+        if status == 206:
+            total = response_headers.get("content-range", "").rpartition("/")[2]
+            size = int(total) if total.isdigit() else None
+        elif response_headers.get("content-length", "").isdigit():
+            size = int(response_headers["content-length"])
+        
+        async def read(offset: int, length: int) -> bytes:
+            if status != 206:
+                raise ProbeError(f"{url} does not support range requests")
+            reply = await self.http.get(url, headers={"Range": f"bytes={offset}-{offset + length - 1}"})
+            if reply.status_code != 206:
+                raise ProbeError(f"Range request to {url} answered with HTTP {reply.status_code}")
+            return reply.content[:length]
+        
+        result = await parse_audio_headers(head, read, size)
+        await self._store(key, response_headers.get("etag") or response_headers.get("last-modified"), result)
+        return result, False
+    
+    async def probe(self, source_id: str):
+        source = await get_source(source_id)
+        if not source:
+            return
+        
+        update = {"probe_status": "done", "probe_error": None}
+        try:
+            if source.get("url"):
+                result, cached = await self._probe_url(source["url"])
+            elif source.get("file_path"):
+                try:
+                    path = local_media_path(source["file_path"])
+                except ValueError as e:
+                    raise ProbeError(str(e))
+                result, cached = await self._probe_file(path)
+            else:
+                return
+            self.cached += cached
+            self.probed += not cached
+            for key in ("codec", "bitrate", "sample_rate", "channels", "bits_per_sample", "live"):
+                if key in result:
+                    update[f"metadata.{key}"] = result[key]
+            # A duration given when the source was created wins
+            if result.get("duration") and not source.get("duration"):
+                update["duration"] = max(1, round(result["duration"]))
+        # Truncated or corrupt headers surface as index, value or arithmetic
+        # errors, and a path can be a directory; all of them fail the probe
+        except (ProbeError, httpx.HTTPError, struct.error, OSError, LookupError, ValueError, ArithmeticError) as e:
+            self.failed += 1
+            update = {"probe_status": "failed", "probe_error": str(e) or type(e).__name__}
+            logger.warning(f"Probe of source {source_id} failed: {update['probe_error']}")
+        
+        await db.audio_sources.update_one({"id": source_id}, {"$set": update})
+        source_cache.invalidate(source_id)
+        source = await get_source(source_id)
+        if source:
+            event_bus.publish("source.updated", source)
+        if "duration" in update:
+            await self._apply_duration(source_id, update["duration"])
+        # Transcode now rather than on the first stream request
+        if source and source.get("file_path") and AXIS_MEDIA_BASE_URL:
+            try:
+                media_cache.warm({**source, "file_path": resolve_media_path(source["file_path"])})
+            except ValueError:
+                pass
+    
+    async def _apply_duration(self, source_id: str, duration: int):
+        """Give sessions created before the probe finished the duration"""
+        session_ids = [
+            session["id"]
+            async for session in db.audio_sessions.find({"source_id": source_id, "duration": None}, {"_id": 0, "id": 1})
+        ]
+        if not session_ids:
+            return
+        await db.audio_sessions.update_many({"id": {"$in": session_ids}, "duration": None}, {"$set": {"duration": duration}})
+        for session_id in session_ids:
+            event_bus.publish("session.updated", {"id": session_id, "duration": duration})
+        async for session in db.audio_sessions.find({"source_id": source_id, "status": AudioSessionStatus.PLAYING}, {"_id": 0}):
+            session_timeline.track(session)
+    
+    def stats(self) -> Dict[str, int]:
+        return {
+            "waiting": len(self._scheduled),
+            "probed": self.probed,
+            "cached": self.cached,
+            "failed": self.failed,
+        }
+
+source_prober = SourceProber()
+
+# Local media serving
+def resolve_media_path(file_path: str) -> str:
+    """Real path of a source file, which must lie inside MEDIA_ROOT.
+
+    Symlinks are resolved first, so one pointing outside the root is
+    rejected like any other path. Raises ValueError.
+    """
+    path = os.path.realpath(os.path.join(MEDIA_ROOT, file_path))
+    if os.path.commonpath([path, MEDIA_ROOT]) != MEDIA_ROOT:
+        raise ValueError(f"File path must be inside the media root {MEDIA_ROOT}")
+    return path
+
+def local_media_path(file_path: str) -> str:
+    """Path of a source file as this server reads it.
+
+    Confined to MEDIA_ROOT only when the file is served through
+    /api/sources/{id}/stream; otherwise Axis reads the path as given.
+    """
+    if AXIS_MEDIA_BASE_URL:
+        return resolve_media_path(file_path)
+    return file_path
+
+def parse_byte_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """(start, end) of a single `bytes=` range, None when it cannot be satisfied.
+
+    Raises ValueError for ranges that are ignored (other units, several
+    ranges, bad syntax), in which case the whole file is sent.
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        raise ValueError(header)
+    first, _, last = spec.strip().partition("-")
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length <= 0 or size == 0:
+            return None
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = int(last) if last else None
+    if end is not None and start > end:
+        raise ValueError(header)
+    if start >= size:
+        return None
+    return start, size - 1 if end is None else min(end, size - 1)
+
+class RangeFileResponse(Response):
+    """Send an open file, or the byte range the request asks for.
+
+    The ASGI zero-copy send extension is used when the server offers it;
+    otherwise the file is mmap'ed and sent in chunks. The file is closed
+    once sent.
+    """
+    chunk_size = 256 * 1024
+    
+    def __init__(self, file, size: int, request_headers, media_type: str, etag: str):
+        self.file = file
+        self.media_type = media_type
+        self.background = None
+        self.start, self.end = 0, size - 1
+        self.status_code = 200
+        headers = {"accept-ranges": "bytes", "etag": etag, "cache-control": "no-cache"}
+        
+        range_header = request_headers.get("range")
+        if_range = request_headers.get("if-range")
+        if range_header and (if_range is None or if_range == etag):
+            try:
+                byte_range = parse_byte_range(range_header, size)
+            except ValueError:
+                pass
+            else:
+                if byte_range is None:
+                    self.status_code = 416
+                    self.start, self.end = 0, -1
+                    headers["content-range"] = f"bytes */{size}"
+                else:
+                    self.status_code = 206
+                    self.start, self.end = byte_range
+                    headers["content-range"] = f"bytes {self.start}-{self.end}/{size}"
+        headers["content-length"] = str(self.end - self.start + 1)
+        self.init_headers(headers)
+    
+    async def __call__(self, scope, receive, send):
+        try:
+            await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+            count = self.end - self.start + 1
+            if scope["method"] == "HEAD" or count <= 0:
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
+            elif "http.response.zerocopysend" in scope.get("extensions", {}):
+                await send({
+                    "type": "http.response.zerocopysend",
+                    "file": self.file,
+                    "offset": self.start,
+                    "count": count,
+                    "more_body": False
+                })
+            else:
+                with mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    for offset in range(self.start, self.end + 1, self.chunk_size):
+                        chunk_end = min(offset + self.chunk_size, self.end + 1)
+                        await send({
+                            "type": "http.response.body",
+                            "body": mapped[offset:chunk_end],
+                            "more_body": chunk_end <= self.end
+                        })
+        finally:
+            self.file.close()
+
+def _hash_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+class MediaCache:
+    """Speaker-ready copies of local source files, shared by content hash.
+
+    Files already in a codec speakers play (MEDIA_PASSTHROUGH_CODECS) are
+    served as they are. Others are transcoded to MP3 once with ffmpeg into
+    MEDIA_CACHE_DIR/<sha256>.mp3, so every zone playing the same clip, even
+    through different sources, shares one prepared file. The directory is
+    kept under MEDIA_CACHE_MAX_MB, evicting the least recently served files.
+    Without ffmpeg, or when ffmpeg fails, the original files are served.
+
+    Hashing and transcoding run in the background, started once a source
+    was probed (or by the first stream request); prepare() never waits for
+    them and reports a copy still being made as None.
+
+    The directory itself is the index: workers sharing it see each other's
+    transcodes, serving a file touches its mtime, and eviction orders the
+    files on disk by mtime, so the limit holds for all workers together.
+    """
+    # Partial files older than this are left over by a crashed transcode;
+    # younger ones may belong to a transcode running in another worker
+    ORPHAN_AGE = 3600
+    
+    def __init__(
+        self,
+        directory: str = MEDIA_CACHE_DIR,
+        max_bytes: int = MEDIA_CACHE_MAX_MB * 1024 * 1024,
+        ffmpeg: str = FFMPEG_PATH
+    ):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.ffmpeg = shutil.which(ffmpeg) if ffmpeg else None
+        # Size of the directory at the last eviction pass
+        self._entries = 0
+        self._bytes = 0
+        self._hashes: OrderedDict = OrderedDict()
+        self._transcodes: Dict[str, asyncio.Future] = {}
+        # Files being hashed and transcoded, by (path, mtime, size)
+        self._warming: Dict[tuple, asyncio.Task] = {}
+        # Content hashes ffmpeg could not transcode
+        self._failed: Set[str] = set()
+        self.hits = 0
+        self.transcodes = 0
+        self.failures = 0
+        self.evictions = 0
+    
+    def load(self):
+        """Remove orphaned partial files and trim the directory to its limit"""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        for leftover in self.directory.glob("*.tmp"):
+            try:
+                if time.time() - leftover.stat().st_mtime > self.ORPHAN_AGE:
+                    leftover.unlink()
+            except OSError:
+                pass
+        self._evict()
+        if not self.ffmpeg:
+            logger.info("ffmpeg not found, local sources are served without transcoding")
+    
+    def needs_transcode(self, source: Dict) -> bool:
+        codec = (source.get("metadata") or {}).get("codec") or Path(source["file_path"]).suffix.lstrip(".").lower()
+        return codec not in MEDIA_PASSTHROUGH_CODECS
+    
+    async def _content_hash(self, path: str, stat: os.stat_result) -> str:
+        key = (path, stat.st_mtime_ns, stat.st_size)
+        digest = self._hashes.get(key)
+        if digest is None:
+            digest = await asyncio.to_thread(_hash_file, path)
+            self._hashes[key] = digest
+            if len(self._hashes) > 10000:
+                self._hashes.popitem(last=False)
+        return digest
+    
+    def warm(self, source: Dict):
+        """Start making the speaker-ready copy of a local source, if it needs one"""
+        if not self.ffmpeg or not self.needs_transcode(source):
+            return
+        try:
+            stat = os.stat(source["file_path"])
+        except OSError:
+            return
+        self._warm(source["file_path"], stat)
+    
+    def _warm(self, path: str, stat: os.stat_result):
+        key = (path, stat.st_mtime_ns, stat.st_size)
+        if key not in self._warming:
+            task = asyncio.create_task(self._make_copy(path, stat))
+            self._warming[key] = task
+            task.add_done_callback(lambda _: self._warming.pop(key, None))
+    
+    async def _make_copy(self, path: str, stat: os.stat_result):
+        try:
+            digest = await self._content_hash(path, stat)
+            if (self.directory / f"{digest}.mp3").exists() or digest in self._failed:
+                return
+            # Sources sharing a clip share one transcode
+            transcode = self._transcodes.get(digest)
+            if transcode is None:
+                transcode = asyncio.ensure_future(self._transcode(path, digest))
+                self._transcodes[digest] = transcode
+                transcode.add_done_callback(lambda _: self._transcodes.pop(digest, None))
+            if not await asyncio.shield(transcode):
+                self._failed.add(digest)
+        except Exception as e:
+            logger.error(f"Failed to prepare {path} for speakers: {e}")
+    
+    async def prepare(self, source: Dict) -> Optional[Tuple[str, str, str]]:
+        """Path, media type and ETag of the file to serve for a local source.
+
+        None while its transcode is still running; a request finding no
+        copy starts one.
+        """
+        path = source["file_path"]
+        stat = await asyncio.to_thread(os.stat, path)
+        original = (path, mimetypes.guess_type(path)[0] or "application/octet-stream", f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"')
+        if not self.ffmpeg or not self.needs_transcode(source):
+            return original
+        
+        digest = self._hashes.get((path, stat.st_mtime_ns, stat.st_size))
+        if digest is not None:
+            cached = self.directory / f"{digest}.mp3"
+            try:
+                # The mtime is the LRU order, shared by every worker
+                os.utime(cached)
+                self.hits += 1
+                return str(cached), "audio/mpeg", f'"{digest[:32]}-mp3"'
+            except FileNotFoundError:
+                if digest in self._failed:
+                    return original
+        self._warm(path, stat)
+        return None
+    
+    async def _transcode(self, path: str, digest: str) -> bool:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        target = self.directory / f"{digest}.mp3"
+        partial = self.directory / f"{digest}.{uuid.uuid4().hex}.tmp"
+        process = await asyncio.create_subprocess_exec(
+            self.ffmpeg, "-nostdin", "-v", "error", "-y", "-i", path,
+            "-vn", "-acodec", "libmp3lame", "-ar", "44100", "-ac", "2", "-b:a", MEDIA_TRANSCODE_BITRATE,
+            "-f", "mp3", str(partial),
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.PIPE
+        )
+        try:
+            _, stderr = await process.communicate()
+        except asyncio.CancelledError:
+            process.kill()
+            partial.unlink(missing_ok=True)
+            raise
+        if process.returncode != 0:
+            self.failures += 1
+            partial.unlink(missing_ok=True)
+            logger.error(f"Failed to transcode {path}: {stderr.decode(errors='replace').strip()[-500:]}")
+            return False
+        
+        os.replace(partial, target)
+        self.transcodes += 1
+        await asyncio.to_thread(self._evict)
+        return True
+    
+    async def stop(self):
+        for task in list(self._warming.values()):
+            task.cancel()
+        await asyncio.gather(*self._warming.values(), return_exceptions=True)
+    
+    def _evict(self):
+        """Delete the least recently served files until the directory fits"""
+        files = []
+        for path in self.directory.glob("*.mp3"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue  # Evicted by another worker meanwhile
+            files.append((stat.st_mtime, stat.st_size, path))
+        files.sort()
+        total = sum(size for _, size, _ in files)
+        # Always keep the newest file, even when it alone exceeds the limit
+        while total > self.max_bytes and len(files) > 1:
+            _, size, path = files.pop(0)
+            total -= size
+            self.evictions += 1
+            # Responses still sending the file keep it open until they finish
+            path.unlink(missing_ok=True)
+        self._entries = len(files)
+        self._bytes = total
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": self._entries,
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "ffmpeg": self.ffmpeg is not None,
+            "hits": self.hits,
+            "transcodes": self.transcodes,
+            "failures": self.failures,
+            "evictions": self.evictions,
+        }
+
+media_cache = MediaCache()
+
+# Stream relay
+class RingBuffer:
+    """Fixed-size byte ring addressed by absolute stream offsets"""
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._buffer = bytearray(capacity)
+        self.end = 0
+    
+    @property
+    def start(self) -> int:
+        """Oldest offset still held"""
+        return max(0, self.end - self.capacity)
+    
+    def write(self, data: bytes):
+        if len(data) > self.capacity:
+            self.end += len(data) - self.capacity
+            data = data[-self.capacity:]
+        offset = self.end % self.capacity
+        first = min(len(data), self.capacity - offset)
+        self._buffer[offset:offset + first] = data[:first]
+        self._buffer[:len(data) - first] = data[first:]
+        self.end += len(data)
+    
+    def read(self, position: int, limit: int) -> bytes:
+        """Up to `limit` bytes from `position`, which must be >= start"""
+        length = min(self.end, position + limit) - position
+        offset = position % self.capacity
+        first = min(length, self.capacity - offset)
+        return bytes(self._buffer[offset:offset + first]) + bytes(self._buffer[:length - first])
+
+# Upstream response headers passed on to listeners
+_RELAY_HEADERS = ("content-type", "icy-name", "icy-genre", "icy-description", "icy-br", "icy-sr", "ice-audio-info")
+
+class StreamRelay:
+    """One upstream connection for a source, shared by all its listeners.
+
+    The upstream is read into a RingBuffer of RELAY_BUFFER_KB. Each
+    listener follows it with its own offset, starting RELAY_PREROLL_KB
+    behind the live edge; a listener the buffer overtakes is too slow
+    and is disconnected rather than holding data back for the others.
+    """
+    def __init__(self, source_id: str, url: str, http: httpx.AsyncClient, on_idle: Callable[["StreamRelay"], None]):
+        self.source_id = source_id
+        self.url = url
+        self.buffer = RingBuffer(RELAY_BUFFER_KB * 1024)
+        self.headers: Dict[str, str] = {}
+        self.listeners = 0
+        self.finished = False
+        self.error: Optional[str] = None
+        self.connects = 0
+        self.dropped = 0
+        self._http = http
+        self._on_idle = on_idle
+        # Set once the first upstream attempt answered or failed
+        self.ready = asyncio.Event()
+        self._data = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+    
+    def start(self):
+        self._task = asyncio.create_task(self._pump())
+    
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+    
+    def _notify(self):
+        event, self._data = self._data, asyncio.Event()
+        event.set()
+    
+    async def _pump(self):
+        failures = 0
+        try:
+            while True:
+                try:
+                    async with self._http.stream("GET", self.url) as response:
+                        response.raise_for_status()
+                        self.connects += 1
+                        failures = 0
+                        self.headers = {name: response.headers[name] for name in _RELAY_HEADERS if name in response.headers}
+                        self.ready.set()
+                        async for chunk in response.aiter_raw():
+                            self.buffer.write(chunk)
+                            self._notify()
+                    # A clean end means a finite file rather than a live stream
+                    return
+                except httpx.HTTPError as e:
+                    failures += 1
+                    self.error = str(e) or type(e).__name__
+                    self.ready.set()
+                    if failures >= RELAY_MAX_RECONNECTS:
+                        logger.warning(f"Giving up relaying source {self.source_id}: {self.error}")
+                        return
+                    logger.warning(f"Relay upstream for source {self.source_id} failed, reconnecting: {self.error}")
+                    await asyncio.sleep(min(2 ** failures, 30))
+        finally:
+            self.finished = True
+            self.ready.set()
+            self._notify()
+    
+    def join(self) -> Callable[[], None]:
+        """Count a listener; the returned function uncounts it, once"""
+        self.listeners += 1
+        left = False
+        
+        def leave():
+            nonlocal left
+            if not left:
+                left = True
+                self.listeners -= 1
+                if self.listeners == 0:
+                    self._on_idle(self)
+        return leave
+    
+    async def listen(self, leave: Callable[[], None]):
+        """Yield the stream for one joined listener until it ends or falls behind"""
+        position = max(self.buffer.start, self.buffer.end - RELAY_PREROLL_KB * 1024)
+        try:
+            while True:
+                if position < self.buffer.start:
+                    self.dropped += 1
+                    logger.info(f"Dropped a slow listener of source {self.source_id}")
+                    return
+                if position < self.buffer.end:
+                    chunk = self.buffer.read(position, 64 * 1024)
+                    position += len(chunk)
+                    yield chunk
+                    continue
+                if self.finished:
+                    return
+                await self._data.wait()
+        finally:
+            leave()
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "url": self.url,
+            "listeners": self.listeners,
+            "bytes_relayed": self.buffer.end,
+            "connects": self.connects,
+            "dropped_listeners": self.dropped,
+            "finished": self.finished,
+            "error": self.error,
+        }
+
+class StreamRelayManager:
+    """Open relays by source id, closing them RELAY_IDLE_TIMEOUT seconds after the last listener left"""
+    def __init__(self):
+        self.relays: Dict[str, StreamRelay] = {}
+        self._idle: Dict[str, asyncio.TimerHandle] = {}
+        self._http: Optional[httpx.AsyncClient] = None
+    
+    @property
+    def http(self) -> httpx.AsyncClient:
+        if self._http is None or self._http.is_closed:
+            self._http = httpx.AsyncClient(
+                timeout=httpx.Timeout(RELAY_READ_TIMEOUT, connect=RELAY_CONNECT_TIMEOUT),
+                follow_redirects=True
+            )
+        return self._http
+    
+    async def open(self, source: Dict) -> Tuple[StreamRelay, Callable[[], None]]:
+        """The running relay of a source, once its upstream answered.
+
+        The caller is counted as a listener straight away and gets the
+        function to call when it leaves, so a client that goes away before
+        its stream starts still lets the relay go idle.
+        """
+        source_id = source["id"]
+        relay = self.relays.get(source_id)
+        if relay is None or relay.finished or relay.url != source["url"]:
+            if relay is not None:
+                await self.close(source_id)
+            relay = StreamRelay(source_id, source["url"], self.http, self.release)
+            self.relays[source_id] = relay
+            relay.start()
+        handle = self._idle.pop(source_id, None)
+        if handle is not None:
+            handle.cancel()
+        leave = relay.join()
+        try:
+            await relay.ready.wait()
+        except BaseException:
+            leave()
+            raise
+        return relay, leave
+    
+    def release(self, relay: StreamRelay):
+        """Close a relay RELAY_IDLE_TIMEOUT seconds from now unless a listener joins"""
+        if self.relays.get(relay.source_id) is not relay or relay.source_id in self._idle:
+            return
+        
+        def close_if_idle():
+            self._idle.pop(relay.source_id, None)
+            if relay.listeners == 0 and self.relays.get(relay.source_id) is relay:
+                asyncio.create_task(self.close(relay.source_id))
+        
+        self._idle[relay.source_id] = asyncio.get_running_loop().call_later(RELAY_IDLE_TIMEOUT, close_if_idle)
+    
+    async def close(self, source_id: str):
+        handle = self._idle.pop(source_id, None)
+        if handle is not None:
+            handle.cancel()
+        relay = self.relays.pop(source_id, None)
+        if relay is not None:
+            await relay.close()
+    
+    async def close_all(self):
+        for source_id in list(self.relays):
+            await self.close(source_id)
+        if self._http is not None:
+            await self._http.aclose()
+    
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {source_id: relay.stats() for source_id, relay in self.relays.items()}
+
+relay_manager = StreamRelayManager()
+
+# Zone membership
+async def sync_zone_membership(zone_id: str, added: List[str] = (), removed: List[str] = ()):
+    """Update Speaker.zone_ids/zone_id after speakers joined or left a zone"""
+    operations = []
+    if added:
+        operations.append(UpdateMany({"id": {"$in": list(added)}}, {"$addToSet": {"zone_ids": zone_id}}))
+        operations.append(UpdateMany({"id": {"$in": list(added)}, "zone_id": None}, {"$set": {"zone_id": zone_id}}))
+    if removed:
+        operations.append(UpdateMany({"id": {"$in": list(removed)}}, {"$pull": {"zone_ids": zone_id}}))
+    if not operations:
+        return
+    await db.speakers.bulk_write(operations)
+    
+    if removed:
+        # Speakers whose first zone was this one fall back to their next zone
+        repoint = []
+        async for speaker in db.speakers.find({"id": {"$in": list(removed)}, "zone_id": zone_id}, {"_id": 0, "id": 1, "zone_ids": 1}):
+            zone_ids = speaker.get("zone_ids") or []
+            repoint.append(UpdateOne({"id": speaker["id"]}, {"$set": {"zone_id": zone_ids[0] if zone_ids else None}}))
+        if repoint:
+            await db.speakers.bulk_write(repoint)
+    
+    # Zones may list ids that have no speaker document; publish only real ones
+    changed = list({*added, *removed})
+    for speaker_id in changed:
+        speaker_cache.invalidate(speaker_id)
+    async for speaker in db.speakers.find({"id": {"$in": changed}}, {"_id": 0, "id": 1, "zone_id": 1, "zone_ids": 1}):
+        event_bus.publish("speaker.updated", speaker)
+
+async def rebuild_zone_memberships() -> int:
+    """Recompute Speaker.zone_ids/zone_id from every zone's speaker_ids.
+
+    Run at startup so speakers written before the mapping was maintained,
+    or by an interrupted update, converge. Returns the speakers changed.
+    """
+    memberships: Dict[str, List[str]] = {}
+    async for zone in db.zones.find({}, {"_id": 0, "id": 1, "speaker_ids": 1}).sort("_id", ASCENDING):
+        for speaker_id in zone.get("speaker_ids") or []:
+            zone_ids = memberships.setdefault(speaker_id, [])
+            if zone["id"] not in zone_ids:
+                zone_ids.append(zone["id"])
+    
+    operations = []
+    changes = []
+    async for speaker in db.speakers.find({}, {"_id": 0, "id": 1, "zone_id": 1, "zone_ids": 1}):
+        members = memberships.get(speaker["id"], [])
+        # Keep the order the speaker joined its zones in
+        current = [zone_id for zone_id in speaker.get("zone_ids") or [] if zone_id in members]
+        zone_ids = current + [zone_id for zone_id in members if zone_id not in current]
+        zone_id = zone_ids[0] if zone_ids else None
+        if speaker.get("zone_ids") != zone_ids or speaker.get("zone_id") != zone_id:
+            operations.append(UpdateOne({"id": speaker["id"]}, {"$set": {"zone_ids": zone_ids, "zone_id": zone_id}}))
+            changes.append({"id": speaker["id"], "zone_ids": zone_ids, "zone_id": zone_id})
+    if operations:
+        await db.speakers.bulk_write(operations, ordered=False)
+        speaker_cache.clear()
+        for change in changes:
+            event_bus.publish("speaker.updated", change)
+    return len(operations)
+
+# Speaker fan-out
+# Times a volume is re-sent because a newer write landed during its send
+AXIS_VOLUME_RESENDS = 3
+
+async def _superseded_volumes(sent: Dict[str, int]) -> Dict[str, int]:
+    """Stored volumes of the speakers whose stored volume differs from the one sent"""
+    superseded = {}
+    async for speaker in db.speakers.find({"id": {"$in": list(sent)}}, {"_id": 0, "id": 1, "volume": 1}):
+        if speaker.get("volume") is not None and speaker["volume"] != sent[speaker["id"]]:
+            superseded[speaker["id"]] = speaker["volume"]
+    return superseded
+
+async def send_volumes(targets: Dict[str, int]):
+    """Set speaker volumes on Axis, ending on the volumes stored in MongoDB.
+
+    Requests and workers deliver volume writes independently, so an older
+    send can reach a device after a newer one. Once its calls returned, a
+    sender re-reads the stored volumes and sends again those a newer write
+    changed: the last send to complete then always carries the stored value.
+    Raises on the first failed call.
+    """
+    for _ in range(1 + AXIS_VOLUME_RESENDS):
+        for speaker_id, volume in targets.items():
+            await axis_client.set_volume(speaker_id, volume, strict=True)
+        targets = await _superseded_volumes(targets)
+        if not targets:
+            return
+
+async def fan_out_volume(targets: Dict[str, int], concurrency: int = AXIS_FANOUT_CONCURRENCY, verify: bool = True) -> List[Dict]:
+    """Send set_volume to many speakers concurrently and report each result.
+
+    With `verify`, speakers whose stored volume changed during the fan-out
+    get it re-sent, as in send_volumes(); a zone mute sends volumes that are
+    not the stored ones and turns this off.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    
+    async def send(speaker_id: str, volume: int) -> Dict:
+        # This value supersedes any volume still waiting in the command queue
+        report = axis_commands.discard(("volume", speaker_id))
+        async with semaphore:
+            try:
+                await axis_client.set_volume(speaker_id, volume, strict=True)
+                result = {"speaker_id": speaker_id, "volume": volume, "status": "success"}
+            except Exception as e:
+                detail = e.detail if isinstance(e, HTTPException) else str(e)
+                result = {"speaker_id": speaker_id, "volume": volume, "status": "error", "detail": detail}
+        # Otherwise the speaker would stay in delivery_status pending
+        if report is not None:
+            try:
+                await report(result.get("detail"))
+            except Exception as e:
+                logger.error(f"Failed to record delivery of Axis command {('volume', speaker_id)}: {e}")
+        return result
+    
+    results = {
+        result["speaker_id"]: result
+        for result in await asyncio.gather(*(send(speaker_id, volume) for speaker_id, volume in targets.items()))
+    }
+    if verify:
+        for _ in range(AXIS_VOLUME_RESENDS):
+            sent = {speaker_id: result["volume"] for speaker_id, result in results.items() if result["status"] == "success"}
+            superseded = await _superseded_volumes(sent) if sent else {}
+            if not superseded:
+                break
+            for result in await asyncio.gather(*(send(speaker_id, volume) for speaker_id, volume in superseded.items())):
+                results[result["speaker_id"]] = result
+    return list(results.values())
+
+def fan_out_status(results: List[Dict]) -> str:
+    return "success" if all(result["status"] == "success" for result in results) else "partial"
+
+# Speaker health poller
+class SpeakerHealthPoller:
+    """Periodically refresh Speaker.status and last_seen from Axis.
+
+    Polls are spread over the first SPEAKER_POLL_JITTER fraction of each
+    interval and capped at SPEAKER_POLL_CONCURRENCY in flight. Speakers
+    Axis reports offline or unknown are retried with exponential backoff.
+    When Axis itself cannot be reached (transport errors, 5xx, open
+    circuit) the rest of the round is skipped and statuses are left as
+    they are. Only documents whose status changed, or whose last_seen is
+    older than SPEAKER_LAST_SEEN_RESOLUTION, are written.
+    """
+    def __init__(
+        self,
+        interval: float = SPEAKER_POLL_INTERVAL,
+        concurrency: int = SPEAKER_POLL_CONCURRENCY,
+        jitter: float = SPEAKER_POLL_JITTER,
+        max_backoff: float = SPEAKER_POLL_MAX_BACKOFF,
+        last_seen_resolution: float = SPEAKER_LAST_SEEN_RESOLUTION
+    ):
+        self.interval = interval
+        self.concurrency = concurrency
+        self.jitter = jitter
+        self.max_backoff = max_backoff
+        self.last_seen_resolution = last_seen_resolution
+        self._failures: Dict[str, int] = {}
+        self._next_attempt: Dict[str, float] = {}
+        self._task: Optional[asyncio.Task] = None
+    
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+    
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+    
+    async def _run(self):
+        while True:
+            started = time.monotonic()
+            try:
+                await self.poll_once()
+            except Exception as e:
+                logger.error(f"Speaker health poll failed: {e}")
+            await asyncio.sleep(max(0.0, self.interval - (time.monotonic() - started)))
+    
+    @staticmethod
+    def _status_from_reply(reply: Dict) -> Optional[SpeakerStatus]:
+        """Map an Axis target status to SpeakerStatus, None if unreachable"""
+        status = reply.get('status')
+        if status == 'unknown':
+            return None
+        try:
+            return SpeakerStatus(status)
+        except ValueError:
+            return SpeakerStatus.BUSY if status == 'playing' else SpeakerStatus.ONLINE
+    
+    async def poll_once(self):
+        speakers = await db.speakers.find({}, {"_id": 0, "id": 1, "status": 1, "last_seen": 1}).to_list(None)
+        
+        # Forget backoff state for speakers that no longer exist
+        ids = {speaker["id"] for speaker in speakers}
+        for speaker_id in list(self._failures):
+            if speaker_id not in ids:
+                self._failures.pop(speaker_id, None)
+                self._next_attempt.pop(speaker_id, None)
+        
+        now = time.monotonic()
+        due = [speaker for speaker in speakers if self._next_attempt.get(speaker["id"], 0) <= now]
+        semaphore = asyncio.Semaphore(self.concurrency)
+        api_error = None
+        
+        async def poll(speaker: Dict):
+            nonlocal api_error
+            await asyncio.sleep(random.uniform(0, self.interval * self.jitter))
+            async with semaphore:
+                if api_error is not None:
+                    return speaker, None
+                try:
+                    return speaker, await axis_client.get_speaker_status(speaker["id"], strict=True)
+                except AxisRequestError:
+                    # e.g. a target Axis no longer knows
+                    return speaker, {"id": speaker["id"], "status": "unknown"}
+                except Exception as e:
+                    api_error = e
+                    return speaker, None
+        
+        results = [result for result in await asyncio.gather(*(poll(speaker) for speaker in due)) if result[1] is not None]
+        if api_error is not None:
+            detail = api_error.detail if isinstance(api_error, HTTPException) else str(api_error)
+            logger.warning(f"Axis API unreachable, {len(due) - len(results)} speaker polls skipped: {detail}")
+        
+        seen_at = datetime.utcnow()
+        operations = []
+        changes = []
+        for speaker, reply in results:
+            speaker_id = speaker["id"]
+            status = self._status_from_reply(reply)
+            update = {}
+            
+            if status in (None, SpeakerStatus.OFFLINE):
+                failures = self._failures.get(speaker_id, 0) + 1
+                self._failures[speaker_id] = failures
+                self._next_attempt[speaker_id] = time.monotonic() + min(self.interval * 2 ** (failures - 1), self.max_backoff)
+                status = SpeakerStatus.OFFLINE
+            else:
+                self._failures.pop(speaker_id, None)
+                self._next_attempt.pop(speaker_id, None)
+                last_seen = speaker.get("last_seen")
+                if last_seen is None or (seen_at - last_seen).total_seconds() >= self.last_seen_resolution:
+                    update["last_seen"] = seen_at
+            
+            if status != speaker.get("status"):
+                update["status"] = status
+                if status != SpeakerStatus.OFFLINE:
+                    update["last_seen"] = seen_at
+            
+            if update:
+                operations.append(UpdateOne({"id": speaker_id}, {"$set": update}))
+                changes.append({"id": speaker_id, **update})
+        
+        if operations:
+            await db.speakers.bulk_write(operations, ordered=False)
+            for change in changes:
+                speaker_cache.invalidate(change["id"])
+                event_bus.publish("speaker.updated", change)
+
+speaker_poller = SpeakerHealthPoller()
+
+# Cluster coordination
+# Identifies this process in leases and forwarded events
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+class LeaderLease:
+    """Lease on a named role, held by at most one worker at a time.
+
+    The holder renews the lease document every third of its TTL; a worker
+    that stops renewing (crash, network partition, stuck event loop) loses
+    it once `expires_at` passes and another worker takes over. Expiry is
+    compared across hosts, so their clocks must be synchronized.
+
+    Without CLUSTER_ENABLED this process is the only one and is elected
+    straight away.
+    """
+    def __init__(
+        self,
+        name: str,
+        on_elected: Callable[[], Awaitable],
+        on_deposed: Callable[[], Awaitable],
+        ttl: float = CLUSTER_LEASE_TTL,
+        enabled: bool = CLUSTER_ENABLED
+    ):
+        self.name = name
+        self.ttl = ttl
+        self.enabled = enabled
+        self.is_leader = False
+        self.elections = 0
+        self._on_elected = on_elected
+        self._on_deposed = on_deposed
+        self._task: Optional[asyncio.Task] = None
+    
+    async def _acquire(self) -> bool:
+        """Take or renew the lease; False while another worker holds it"""
+        now = datetime.utcnow()
+        try:
+            await db.leases.find_one_and_update(
+                {"_id": self.name, "$or": [{"holder": WORKER_ID}, {"expires_at": {"$lt": now}}]},
+                {"$set": {"holder": WORKER_ID, "expires_at": now + timedelta(seconds=self.ttl), "renewed_at": now}},
+                upsert=True
+            )
+            return True
+        except DuplicateKeyError:
+            # The upsert lost to a live lease held by someone else
+            return False
+    
+    async def _set_leader(self, leader: bool):
+        if leader == self.is_leader:
+            return
+        self.is_leader = leader
+        if not leader:
+            logger.info(f"Worker {WORKER_ID} released the {self.name} lease")
+            await self._on_deposed()
+            return
+        logger.info(f"Worker {WORKER_ID} now holds the {self.name} lease")
+        try:
+            await self._on_elected()
+        except Exception:
+            # Retried on the next renewal
+            self.is_leader = False
+            await self._on_deposed()
+            raise
+        self.elections += 1
+    
+    async def _run(self):
+        expires = 0.0
+        while True:
+            try:
+                leader = await self._acquire()
+                if leader:
+                    expires = time.monotonic() + self.ttl
+            except PyMongoError as e:
+                logger.warning(f"Could not renew the {self.name} lease: {e}")
+                # Step down before the lease can pass to another worker
+                leader = self.is_leader and time.monotonic() < expires - self.ttl / 3
+            try:
+                await self._set_leader(leader)
+            except Exception as e:
+                logger.error(f"Failed to switch {self.name} jobs: {e}")
+            await asyncio.sleep(self.ttl / 3)
+    
+    async def start(self):
+        if not self.enabled:
+            await self._set_leader(True)
+            return
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+    
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        was_leader = self.is_leader
+        await self._set_leader(False)
+        if self.enabled and was_leader:
+            # Hand over now rather than after the TTL
+            try:
+                await db.leases.delete_one({"_id": self.name, "holder": WORKER_ID})
+            except PyMongoError as e:
+                logger.warning(f"Could not release the {self.name} lease: {e}")
+    
+    def stats(self) -> Dict[str, Any]:
+        return {"worker": WORKER_ID, "clustered": self.enabled, "leader": self.is_leader, "elections": self.elections}
+
+# Leader-only tasks without a start/stop object of their own
+_singleton_tasks: Set[asyncio.Task] = set()
+
+async def start_singleton_jobs():
+    """Start the background jobs that must run in one worker only"""
+    changed = await rebuild_zone_memberships()
+    if changed:
+        logger.info(f"Rebuilt the zone memberships of {changed} speakers")
+    _singleton_tasks.add(asyncio.create_task(sweep_session_starts()))
+    # Started before loading so that track() accepts what load() finds
+    session_timeline.start()
+    await session_timeline.load()
+    await source_prober.load()
+    if SCHEDULER_ENABLED:
+        playback_scheduler.start()
+        await playback_scheduler.load()
+    if SPEAKER_POLL_ENABLED:
+        speaker_poller.start()
+
+async def stop_singleton_jobs():
+    for task in _singleton_tasks:
+        task.cancel()
+    await asyncio.gather(*_singleton_tasks, return_exceptions=True)
+    _singleton_tasks.clear()
+    await speaker_poller.stop()
+    await playback_scheduler.stop()
+    await session_timeline.stop()
+
+job_lease = LeaderLease("background-jobs", start_singleton_jobs, stop_singleton_jobs)
+
+class ClusterEvents:
+    """Pass event bus messages between workers through a capped collection.
+
+    Published events are appended in batches; every worker tails the
+    collection and replays the events of the others: to its WebSocket
+    subscribers, into its caches, and into the jobs it leads. Events are
+    read in insertion order; after a cursor loss the tail resumes a few
+    seconds back and skips the events it already saw.
+    
+    Each batch takes the next value of a counter shared by all workers and
+    carries it; `version` is the highest value this worker wrote or tailed,
+    so it can label the dashboard without reading MongoDB per request.
+    """
+    RESUME_MARGIN = timedelta(seconds=5)
+    
+    def __init__(self, max_mb: int = CLUSTER_EVENTS_MAX_MB, queue_size: int = 10000):
+        self.max_bytes = max_mb * 1024 * 1024
+        self._queue: asyncio.Queue = asyncio.Queue(queue_size)
+        self._seen: "OrderedDict[Any, None]" = OrderedDict()
+        self._tasks: List[asyncio.Task] = []
+        # Events queued here and not yet given a version
+        self._unversioned = 0
+        self._versioned = asyncio.Event()
+        self._versioned.set()
+        self.version = 0
+        self.sent = 0
+        self.received = 0
+        self.dropped = 0
+    
+    async def setup(self):
+        try:
+            await db.create_collection("cluster_events", capped=True, size=self.max_bytes)
+        except CollectionInvalid:
+            pass  # Created by another worker
+    
+    def forward(self, event_type: str, data: Dict, message: str):
+        """EventBus.forward hook: queue an event for the other workers"""
+        try:
+            self._queue.put_nowait({
+                "origin": WORKER_ID,
+                "type": event_type,
+                "entity_id": data.get("id") if isinstance(data, dict) else None,
+                "message": message,
+                "at": datetime.utcnow()
+            })
+        except asyncio.QueueFull:
+            # Other workers catch up through their cache TTLs
+            self.dropped += 1
+            return
+        self._unversioned += 1
+        self._versioned.clear()
+    
+    async def current_version(self) -> int:
+        """`version`, once this worker's latest changes have a version of their own"""
+        if self._unversioned:
+            await self._versioned.wait()
+        return self.version
+    
+    async def _write(self):
+        while True:
+            batch = [await self._queue.get()]
+            while not self._queue.empty() and len(batch) < 500:
+                batch.append(self._queue.get_nowait())
+            try:
+                counter = await db.counters.find_one_and_update(
+                    {"_id": "changes"}, {"$inc": {"value": 1}},
+                    upsert=True, return_document=ReturnDocument.AFTER
+                )
+                self.version = max(self.version, counter["value"])
+                for event in batch:
+                    event["version"] = counter["value"]
+                await db.cluster_events.insert_many(batch)
+                self.sent += len(batch)
+            except PyMongoError as e:
+                self.dropped += len(batch)
+                logger.warning(f"Could not forward {len(batch)} events to other workers: {e}")
+            finally:
+                self._unversioned -= len(batch)
+                if not self._unversioned:
+                    self._versioned.set()
+    
+    async def _tail(self):
+        since = datetime.utcnow()
+        while True:
+            cursor = db.cluster_events.find({"at": {"$gte": since}}, cursor_type=CursorType.TAILABLE_AWAIT)
+            try:
+                while cursor.alive:
+                    async for event in cursor:
+                        since = max(since, event["at"] - self.RESUME_MARGIN)
+                        self.version = max(self.version, event.get("version", 0))
+                        if event["_id"] in self._seen:
+                            continue
+                        self._seen[event["_id"]] = None
+                        if len(self._seen) > 10000:
+                            self._seen.popitem(last=False)
+                        if event.get("origin") != WORKER_ID:
+                            self.received += 1
+                            await apply_cluster_event(event)
+            except PyMongoError as e:
+                logger.warning(f"Lost the cluster event cursor: {e}")
+            # A tailable cursor on an empty collection dies at once
+            await asyncio.sleep(1)
+    
+    async def start(self):
+        await self.setup()
+        counter = await db.counters.find_one({"_id": "changes"})
+        self.version = counter["value"] if counter else 0
+        self._tasks = [asyncio.create_task(self._write()), asyncio.create_task(self._tail())]
+    
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        # Nothing will version what is still queued
+        self._unversioned = 0
+        self._versioned.set()
+    
+    def stats(self) -> Dict[str, int]:
+        return {
+            "version": self.version,
+            "sent": self.sent,
+            "received": self.received,
+            "dropped": self.dropped,
+            "queued": self._queue.qsize()
+        }
+
+cluster_events = ClusterEvents()
+
+# Caches holding each event entity
+_EVENT_CACHES = {"speaker": speaker_cache, "zone": zone_cache, "source": source_cache}
+
+async def apply_cluster_event(event: Dict):
+    """Bring this worker up to date with a change made by another one"""
+    entity, _, action = event["type"].partition(".")
+    entity_id = event.get("entity_id")
+    
+    cache = _EVENT_CACHES.get(entity)
+    if cache is not None:
+        if entity_id:
+            cache.invalidate(entity_id)
+        else:
+            cache.clear()
+    elif event["type"] == "speakers.discovered":
+        speaker_cache.clear()
+    if event["type"] == "source.deleted" and entity_id:
+        await relay_manager.close(entity_id)
+    
+    if job_lease.is_leader and entity_id:
+        # Jobs only hear of changes made elsewhere through these events
+        if entity == "session":
+            if action == "deleted":
+                session_timeline.forget(entity_id)
+            else:
+                session = await db.audio_sessions.find_one({"id": entity_id}, {"_id": 0})
+                if session:
+                    session_timeline.track(session)
+        elif entity == "schedule":
+            if action == "deleted":
+                playback_scheduler.forget(entity_id)
+            else:
+                schedule = await db.schedules.find_one({"id": entity_id}, {"_id": 0})
+                if schedule:
+                    playback_scheduler.track(schedule)
+    
+    event_bus.deliver(event["message"])
+
+# Scrape-time gauges for in-process state
+_breaker_states = {CircuitBreaker.CLOSED: 0, CircuitBreaker.HALF_OPEN: 1, CircuitBreaker.OPEN: 2}
+metrics.register(Counter(
+    "cache_lookups_total", "Document cache lookups by result", ("cache", "result"),
+    callback=lambda: {
+        (cache.name, result): getattr(cache, result)
+        for cache in (zone_cache, source_cache, speaker_cache)
+        for result in ("hits", "misses")
+    }))
+metrics.register(Gauge(
+    "axis_commands", "Axis command queue counters", ("state",),
+    callback=lambda: {(state,): value for state, value in axis_commands.stats().items()}))
+metrics.register(Gauge(
+    "axis_circuit_state", "Axis circuit breaker state (0 closed, 1 half-open, 2 open)", ("endpoint",),
+    callback=lambda: {(key,): _breaker_states[breaker.state] for key, breaker in axis_client.breakers.items()}))
+metrics.register(Counter(
+    "coalesced_requests_total", "Requests by whether they started a call or joined one in flight", ("group", "result"),
+    callback=lambda: {
+        (group, result): counts[result]
+        for group, counts in request_flights.stats().items()
+        for result in ("calls", "coalesced")
+    }))
+metrics.register(Gauge(
+    "cluster_leader", "1 if this worker runs the background jobs",
+    callback=lambda: {(): int(job_lease.is_leader)}))
+metrics.register(Gauge(
+    "event_subscribers", "Connected real-time event subscribers",
+    callback=lambda: {(): event_bus.subscriber_count}))
+
+# API Routes
+@api_router.get("/")
+async def root():
+    return {"message": "Axis Audio Dashboard API", "version": "1.0.0"}
+
+@api_router.get("/health")
+async def health_check():
+    return {"status": "healthy", "timestamp": datetime.utcnow()}
+
+@api_router.get("/admin/cache")
+async def get_cache_stats():
+    """Hit/miss counters of the document caches and the local media cache, and request coalescing counters"""
+    stats = {cache.name: cache.stats() for cache in (zone_cache, source_cache, speaker_cache)}
+    stats["media"] = media_cache.stats()
+    stats["coalesced_requests"] = request_flights.stats()
+    return stats
+
+@api_router.get("/admin/axis")
+async def get_axis_client_state():
+    """Circuit breaker states and retry budget of the Axis API client"""
+    return axis_client.resilience_snapshot()
+
+@api_router.get("/admin/relays")
+async def get_relay_stats():
+    """Open stream relays with their listeners and upstream counters"""
+    return relay_manager.stats()
+
+@api_router.get("/admin/commands")
+async def get_command_queue_stats():
+    """Counters of the background Axis command queue, session starts and other background jobs"""
+    return {
+        **axis_commands.stats(),
+        "session_starts": len(session_starts),
+        "session_timeline": session_timeline.stats(),
+        "scheduler": playback_scheduler.stats(),
+        "source_probes": source_prober.stats()
+    }
+
+@api_router.get("/admin/cluster")
+async def get_cluster_state():
+    """This worker, whether it runs the background jobs, and event forwarding counters"""
+    return {**job_lease.stats(), "events": cluster_events.stats()}
+
+@api_router.get("/metrics")
+async def get_metrics():
+    """Prometheus metrics in text exposition format"""
+    return Response(content=metrics.render(), media_type="text/plain; version=0.0.4")
+
+@api_router.get("/admin/indexes")
+async def get_index_report():
+    """Report missing, undeclared and unused MongoDB indexes"""
+    return await index_report()
+
+# Dashboard snapshot
+# Serialized snapshot for the current change version, reused until the
+# next change is published. Playing sessions advance without events, so
+# they are kept as documents and their position is computed per response
+_dashboard_snapshot: Dict[str, Any] = {"version": None, "body": None, "head": None, "playing": None}
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison, as If-None-Match requires"""
+    if not if_none_match:
+        return False
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in tags or etag.removeprefix("W/") in tags
+
+async def build_dashboard_snapshot(version: int) -> Dict[str, Any]:
+    """Read all four collections concurrently and serialize them together.
+
+    When sessions are playing, also returns the body without its sessions
+    ("head") and the session documents, to serialize again with their live
+    position for each response.
+    """
+    speakers, zones, sources, sessions = await asyncio.gather(
+        db.speakers.find({}, {"_id": 0}).to_list(None),
+        db.zones.find({}, {"_id": 0}).to_list(None),
+        db.audio_sources.find({}, {"_id": 0}).to_list(None),
+        db.audio_sessions.find({}, {"_id": 0}).to_list(None),
+    )
+    snapshot = {
+        "version": version,
+        "speakers": trusted_documents(Speaker, speakers),
+        "zones": trusted_documents(Zone, zones),
+        "sources": trusted_documents(AudioSource, sources),
+        "sessions": trusted_documents(AudioSession, sessions),
+    }
+    if not any(session.get("status") == AudioSessionStatus.PLAYING for session in sessions):
+        return {"version": version, "body": json_dumps(snapshot), "head": None, "playing": None}
+    playing = snapshot.pop("sessions")
+    # Drop the closing brace; _dashboard_body() appends the sessions
+    return {"version": version, "body": None, "head": json_dumps(snapshot)[:-1], "playing": playing}
+
+def _dashboard_body() -> bytes:
+    """The snapshot body, with playing sessions' positions as of now"""
+    if _dashboard_snapshot["playing"] is None:
+        return _dashboard_snapshot["body"]
+    now = datetime.utcnow()
+    sessions = [with_live_position(session, now) for session in _dashboard_snapshot["playing"]]
+    return _dashboard_snapshot["head"] + b',"sessions":' + json_dumps(sessions) + b"}"
+
+@api_router.get("/dashboard")
+async def get_dashboard(request: Request):
+    """Speakers, zones, sources and sessions in one conditional response"""
+    # Read the version before the collections so the snapshot is never
+    # labelled newer than the data it contains. Workers share a counter in
+    # MongoDB, kept in memory from the events they tail, so any of them can
+    # answer 304 and none keeps a stale snapshot. The ETag is weak: live
+    # positions make two 200 responses of the same version differ in bytes
+    if CLUSTER_ENABLED:
+        version = await cluster_events.current_version()
+        etag = f'W/"cluster-{version}"'
+    else:
+        version = event_bus.version
+        etag = f'W/"{event_bus.epoch}-{version}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    
+    if _dashboard_snapshot["version"] != version:
+        _dashboard_snapshot.update(await request_flights.do("dashboard", version, lambda: build_dashboard_snapshot(version)))
+    
+    return Response(content=_dashboard_body(), media_type="application/json", headers=headers)
+
+# Speaker Management
+@api_router.get("/speakers", response_model=List[Speaker])
+async def get_speakers(
+    limit: int = Query(DEFAULT_PAGE_LIMIT, ge=1, le=MAX_PAGE_LIMIT),
+    after: Optional[str] = None,
+    stream: bool = False
+):
+    """Get all speakers, paged by `limit`/`after` or streamed as NDJSON with `stream=true`"""
+    if stream:
+        return stream_collection(db.speakers, after)
+    speakers, next_cursor = await coalesced_page(db.speakers, limit, after)
+    return page_response(Speaker, speakers, next_cursor)
+
+@api_router.post("/speakers", response_model=Speaker)
+async def create_speaker(speaker: SpeakerCreate):
+    """Add a new speaker manually"""
+    speaker_dict = speaker.dict()
+    speaker_obj = Speaker(**speaker_dict)
+    try:
+        await db.speakers.insert_one(speaker_obj.dict())
+    except DuplicateKeyError:
+        raise HTTPException(status_code=409, detail="A speaker with this IP address already exists")
+    speaker_cache.set(speaker_obj.id, speaker_obj.dict())
+    event_bus.publish("speaker.created", speaker_obj.dict())
+    return speaker_obj
+
+@api_router.get("/speakers/discover")
+async def discover_speakers():
+    """Discover speakers from Axis Audio Manager Pro.
+
+    Concurrent discoveries share one Axis call and one reconciliation.
+    """
+    return await request_flights.do("discover", None, run_speaker_discovery)
+
+async def run_speaker_discovery() -> Dict[str, Any]:
+    try:
+        discovered = await axis_client.discover_speakers()
+        counts = await reconcile_discovered_speakers(discovered)
+        speaker_cache.clear()
+        event_bus.publish("speakers.discovered", counts)
+        
+        return {
+            "message": f"Discovered {len(discovered)} speakers",
+            "speakers": discovered,
+            **counts
+        }
+    except Exception as e:
+        logger.error(f"Speaker discovery failed: {e}")
+        raise HTTPException(status_code=500, detail="Speaker discovery failed")
+
+async def reconcile_discovered_speakers(discovered: List[Dict]) -> Dict[str, int]:
+    """Upsert discovered targets into the speakers collection in one bulk write"""
+    now = datetime.utcnow()
+    by_ip = {}
+    for speaker_data in discovered:
+        ip_address = speaker_data.get('ip_address')
+        if ip_address:
+            by_ip[ip_address] = speaker_data
+    
+    if not by_ip:
+        return {"inserted": 0, "updated": 0, "unchanged": 0}
+    
+    # Fetch the fields we reconcile for every known speaker in one round trip
+    existing = {}
+    cursor = db.speakers.find(
+        {"ip_address": {"$in": list(by_ip)}},
+        {"_id": 0, "ip_address": 1, "status": 1, "model": 1, "firmware_version": 1}
+    )
+    async for speaker in cursor:
+        existing[speaker["ip_address"]] = speaker
+    
+    operations = []
+    updated = 0
+    unchanged = 0
+    for ip_address, speaker_data in by_ip.items():
+        speaker = Speaker(
+            name=speaker_data.get('name', f"Speaker {ip_address}"),
+            ip_address=ip_address,
+            mac_address=speaker_data.get('mac_address'),
+            model=speaker_data.get('model', 'Unknown'),
+            firmware_version=speaker_data.get('firmware_version'),
+            status=SpeakerStatus.ONLINE if speaker_data.get('status') == 'online' else SpeakerStatus.OFFLINE,
+            last_seen=now
+        )
+        reconciled = {
+            "status": speaker.status,
+            "model": speaker.model,
+            "firmware_version": speaker.firmware_version,
+            "last_seen": now
+        }
+        
+        current = existing.get(ip_address)
+        if current is not None:
+            if any(current.get(field) != reconciled[field] for field in ("status", "model", "firmware_version")):
+                updated += 1
+            else:
+                unchanged += 1
+        
+        on_insert = speaker.dict(exclude=set(reconciled))
+        operations.append(UpdateOne(
+            {"ip_address": ip_address},
+            {"$set": reconciled, "$setOnInsert": on_insert},
+            upsert=True
+        ))
+    
+    result = await db.speakers.bulk_write(operations, ordered=False)
+    return {"inserted": result.upserted_count, "updated": updated, "unchanged": unchanged}
+
+@api_router.post("/speakers/volume/batch")
+async def set_speakers_volume_batch(batch: SpeakerVolumeBatch):
+    """Set the volume of many speakers in one request"""
+    # Later operations on the same speaker win
+    targets = {operation.speaker_id: operation.volume for operation in batch.operations}
+    
+    known = set()
+    async for speaker in db.speakers.find({"id": {"$in": list(targets)}}, {"_id": 0, "id": 1}):
+        known.add(speaker["id"])
+    
+    if known:
+        await db.speakers.bulk_write(
+            [UpdateOne({"id": speaker_id}, {"$set": {"volume": targets[speaker_id]}}) for speaker_id in known],
+            ordered=False
+        )
+        for speaker_id in known:
+            speaker_cache.invalidate(speaker_id)
+            event_bus.publish("speaker.updated", {"id": speaker_id, "volume": targets[speaker_id]})
+    
+    sent = await fan_out_volume({speaker_id: volume for speaker_id, volume in targets.items() if speaker_id in known})
+    sent_by_id = {result["speaker_id"]: result for result in sent}
+    results = [
+        sent_by_id.get(speaker_id) or {
+            "speaker_id": speaker_id,
+            "volume": volume,
+            "status": "not_found",
+            "detail": "Speaker not found"
+        }
+        for speaker_id, volume in targets.items()
+    ]
+    return {"status": fan_out_status(results), "results": results}
+
+@api_router.get("/speakers/{speaker_id}/zones", response_model=List[Zone])
+async def get_speaker_zones(speaker_id: str):
+    """Get the zones a speaker belongs to"""
+    zones = await db.zones.find({"speaker_ids": speaker_id}, {"_id": 0}).to_list(None)
+    if not zones and not await get_speaker(speaker_id):
+        raise HTTPException(status_code=404, detail="Speaker not found")
+    return FastJSONResponse(trusted_documents(Zone, zones))
+
+@api_router.put("/speakers/{speaker_id}/volume")
+async def set_speaker_volume(speaker_id: str, volume_control: VolumeControl):
+    """Set volume for a specific speaker"""
+    # Update in database
+    update = {
+        "volume": volume_control.volume,
+        "delivery_status": DeliveryStatus.PENDING,
+        "delivery_error": None
+    }
+    result = await db.speakers.update_one({"id": speaker_id}, {"$set": update})
+    if result.matched_count == 0:
+        raise HTTPException(status_code=404, detail="Speaker not found")
+    speaker_cache.invalidate(speaker_id)
+    event_bus.publish("speaker.updated", {"id": speaker_id, **update})
+    
+    # Send to Axis system in the background; rapid changes are coalesced
+    queue_speaker_volume(speaker_id, volume_control.volume)
+    
+    return {"status": "success", "volume": volume_control.volume, "delivery_status": DeliveryStatus.PENDING}
+
+# Zone Management
+@api_router.get("/zones", response_model=List[Zone])
+async def get_zones(
+    limit: int = Query(DEFAULT_PAGE_LIMIT, ge=1, le=MAX_PAGE_LIMIT),
+    after: Optional[str] = None,
+    stream: bool = False
+):
+    """Get all zones, paged by `limit`/`after` or streamed as NDJSON with `stream=true`"""
+    if stream:
+        return stream_collection(db.zones, after)
+    zones, next_cursor = await coalesced_page(db.zones, limit, after)
+    return page_response(Zone, zones, next_cursor)
+
+@api_router.post("/zones", response_model=Zone)
+async def create_zone(zone: ZoneCreate):
+    """Create a new zone"""
+    zone_dict = zone.dict()
+    zone_obj = Zone(**zone_dict)
+    await db.zones.insert_one(zone_obj.dict())
+    zone_cache.set(zone_obj.id, zone_obj.dict())
+    event_bus.publish("zone.created", zone_obj.dict())
+    await sync_zone_membership(zone_obj.id, added=zone_obj.speaker_ids)
+    return zone_obj
+
+@api_router.put("/zones/{zone_id}", response_model=Zone)
+async def update_zone(zone_id: str, zone_update: ZoneUpdate):
+    """Update a zone"""
+    update_data = {k: v for k, v in zone_update.dict().items() if v is not None}
+    
+    # The previous membership comes back from the same atomic write
+    previous = await db.zones.find_one_and_update(
+        {"id": zone_id},
+        {"$set": update_data},
+        projection={"speaker_ids": 1}
+    )
+    
+    if previous is None:
+        raise HTTPException(status_code=404, detail="Zone not found")
+    zone_cache.invalidate(zone_id)
+    
+    updated_zone = Zone(**await get_zone(zone_id))
+    event_bus.publish("zone.updated", updated_zone.dict())
+    if "speaker_ids" in update_data:
+        before = previous.get("speaker_ids") or []
+        await sync_zone_membership(
+            zone_id,
+            added=[speaker_id for speaker_id in updated_zone.speaker_ids if speaker_id not in before],
+            removed=[speaker_id for speaker_id in before if speaker_id not in updated_zone.speaker_ids]
+        )
+    return updated_zone
+
+@api_router.get("/zones/{zone_id}/expanded", response_model=ZoneExpanded)
+async def get_zone_expanded(zone_id: str):
+    """Get a zone with its speakers, joined in one aggregation"""
+    pipeline = [
+        {"$match": {"id": zone_id}},
+        {"$limit": 1},
+        {"$lookup": {"from": "speakers", "localField": "speaker_ids", "foreignField": "id", "as": "speakers"}},
+        {"$project": {"_id": 0, "speakers._id": 0}},
+    ]
+    zones = await db.zones.aggregate(pipeline).to_list(1)
+    if not zones:
+        raise HTTPException(status_code=404, detail="Zone not found")
+    
+    zone = zones[0]
+    # $lookup does not keep the order of speaker_ids, and skips unknown ids
+    by_id = {speaker["id"]: speaker for speaker in zone["speakers"]}
+    speakers = [by_id[speaker_id] for speaker_id in zone.get("speaker_ids", []) if speaker_id in by_id]
+    zone["speakers"] = trusted_documents(Speaker, speakers)
+    return FastJSONResponse(trusted_documents(ZoneExpanded, [zone])[0])
+
+@api_router.put("/zones/{zone_id}/volume")
+async def set_zone_volume(zone_id: str, volume_control: VolumeControl):
+    """Set the volume of a zone and of every speaker in it"""
+    zone = await get_zone(zone_id)
+    if not zone:
+        raise HTTPException(status_code=404, detail="Zone not found")
+    
+    volume = volume_control.volume
+    speaker_ids = zone.get("speaker_ids", [])
+    await db.zones.update_one({"id": zone_id}, {"$set": {"volume": volume}})
+    known = []
+    if speaker_ids:
+        await db.speakers.update_many({"id": {"$in": speaker_ids}}, {"$set": {"volume": volume}})
+        known = [speaker["id"] async for speaker in db.speakers.find({"id": {"$in": speaker_ids}}, {"_id": 0, "id": 1})]
+    
+    zone_cache.invalidate(zone_id)
+    event_bus.publish("zone.updated", {"id": zone_id, "volume": volume})
+    for speaker_id in known:
+        speaker_cache.invalidate(speaker_id)
+        event_bus.publish("speaker.updated", {"id": speaker_id, "volume": volume})
+    
+    # A muted zone keeps its speakers silent; the new volume applies on unmute
+    if zone.get("muted"):
+        return {"status": "success", "volume": volume, "muted": True, "results": []}
+    
+    results = await fan_out_volume({speaker_id: volume for speaker_id in speaker_ids})
+    return {"status": fan_out_status(results), "volume": volume, "muted": False, "results": results}
+
+@api_router.put("/zones/{zone_id}/mute")
+async def set_zone_mute(zone_id: str, mute_control: MuteControl):
+    """Mute or unmute every speaker in a zone"""
+    zone = await get_zone(zone_id)
+    if not zone:
+        raise HTTPException(status_code=404, detail="Zone not found")
+    
+    speaker_ids = zone.get("speaker_ids", [])
+    await db.zones.update_one({"id": zone_id}, {"$set": {"muted": mute_control.muted}})
+    zone_cache.invalidate(zone_id)
+    event_bus.publish("zone.updated", {"id": zone_id, "muted": mute_control.muted})
+    
+    if mute_control.muted:
+        targets = {speaker_id: 0 for speaker_id in speaker_ids}
+    else:
+        # Restore each speaker's own stored volume
+        targets = {speaker_id: zone.get("volume", 50) for speaker_id in speaker_ids}
+        async for speaker in db.speakers.find({"id": {"$in": speaker_ids}}, {"_id": 0, "id": 1, "volume": 1}):
+            targets[speaker["id"]] = speaker.get("volume", targets[speaker["id"]])
+    
+    # Muted speakers are meant to differ from their stored volume
+    results = await fan_out_volume(targets, verify=not mute_control.muted)
+    return {"status": fan_out_status(results), "muted": mute_control.muted, "results": results}
+
+@api_router.delete("/zones/{zone_id}")
+async def delete_zone(zone_id: str):
+    """Delete a zone"""
+    zone = await db.zones.find_one_and_delete({"id": zone_id}, projection={"speaker_ids": 1})
+    zone_cache.invalidate(zone_id)
+    if zone is None:
+        raise HTTPException(status_code=404, detail="Zone not found")
+    event_bus.publish("zone.deleted", {"id": zone_id})
+    await sync_zone_membership(zone_id, removed=zone.get("speaker_ids") or [])
+    return {"status": "success"}
+
+# Audio Sources Management
+@api_router.get("/sources", response_model=List[AudioSource])
+async def get_sources(
+    limit: int = Query(DEFAULT_PAGE_LIMIT, ge=1, le=MAX_PAGE_LIMIT),
+    after: Optional[str] = None,
+    stream: bool = False
+):
+    """Get all audio sources, paged by `limit`/`after` or streamed as NDJSON with `stream=true`"""
+    if stream:
+        return stream_collection(db.audio_sources, after)
+    sources, next_cursor = await coalesced_page(db.audio_sources, limit, after)
+    return page_response(AudioSource, sources, next_cursor)
+
+@api_router.post("/sources", response_model=AudioSource)
+async def create_source(source: AudioSourceCreate):
+    """Create a new audio source"""
+    if source.file_path:
+        try:
+            local_media_path(source.file_path)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    source_dict = source.dict()
+    source_obj = AudioSource(**source_dict)
+    if source_obj.url or source_obj.file_path:
+        source_obj.probe_status = "pending"
+    await db.audio_sources.insert_one(source_obj.dict())
+    source_cache.set(source_obj.id, source_obj.dict())
+    event_bus.publish("source.created", source_obj.dict())
+    
+    # Duration and format are read from the media in the background
+    if source_obj.probe_status:
+        source_prober.submit(source_obj.id)
+    return source_obj
+
+@api_router.api_route("/sources/{source_id}/stream", methods=["GET", "HEAD"])
+async def stream_source(source_id: str, request: Request):
+    """Serve a local-file source to speakers, with HTTP Range support"""
+    source = await get_source(source_id)
+    if not source:
+        raise HTTPException(status_code=404, detail="Source not found")
+    if not source.get("file_path"):
+        raise HTTPException(status_code=404, detail="Source has no local file")
+    try:
+        # Checked again: the file or a directory above it may be a symlink since changed
+        source = {**source, "file_path": resolve_media_path(source["file_path"])}
+    except ValueError:
+        raise HTTPException(status_code=404, detail="Source file not found")
+    
+    # A second attempt covers a transcode another worker evicted in between
+    for attempt in range(2):
+        try:
+            prepared = await media_cache.prepare(source)
+            if prepared is None:
+                raise HTTPException(
+                    status_code=503,
+                    detail="Source is being transcoded for speakers",
+                    headers={"Retry-After": str(MEDIA_TRANSCODE_RETRY_AFTER)}
+                )
+            path, media_type, etag = prepared
+            file = await asyncio.to_thread(open, path, "rb")
+            break
+        except OSError:
+            if attempt:
+                raise HTTPException(status_code=404, detail="Source file not found")
+    size = os.fstat(file.fileno()).st_size
+    return RangeFileResponse(file, size, request.headers, media_type, etag)
+
+@api_router.delete("/sources/{source_id}")
+async def delete_source(source_id: str):
+    """Delete an audio source"""
+    result = await db.audio_sources.delete_one({"id": source_id})
+    source_cache.invalidate(source_id)
+    await relay_manager.close(source_id)
+    if result.deleted_count == 0:
+        raise HTTPException(status_code=404, detail="Source not found")
+    event_bus.publish("source.deleted", {"id": source_id})
+    return {"status": "success"}
+
+# Stream relay
+@api_router.get("/relay/{source_id}")
+async def relay_source(source_id: str):
+    """Relay a STREAMING or RADIO source; all listeners share one upstream connection"""
+    source = await get_source(source_id)
+    if not source:
+        raise HTTPException(status_code=404, detail="Source not found")
+    if source.get("type") not in RELAYED_SOURCE_TYPES or not source.get("url"):
+        raise HTTPException(status_code=404, detail="Source cannot be relayed")
+    
+    relay, leave = await relay_manager.open(source)
+    if not relay.headers:
+        leave()
+        raise HTTPException(status_code=502, detail=f"Upstream stream unavailable: {relay.error}")
+    headers = {name: value for name, value in relay.headers.items() if name != "content-type"}
+    # The background task covers clients gone before the body was iterated,
+    # whose generator never runs its cleanup
+    return StreamingResponse(
+        relay.listen(leave),
+        media_type=relay.headers.get("content-type", "audio/mpeg"),
+        headers={**headers, "Cache-Control": "no-store"},
+        background=BackgroundTask(leave)
+    )
+
+# Audio Sessions Management
+@api_router.get("/sessions", response_model=List[AudioSession])
+async def get_sessions(
+    limit: int = Query(DEFAULT_PAGE_LIMIT, ge=1, le=MAX_PAGE_LIMIT),
+    after: Optional[str] = None,
+    stream: bool = False
+):
+    """Get all audio sessions, paged by `limit`/`after` or streamed as NDJSON with `stream=true`"""
+    if stream:
+        return stream_collection(db.audio_sessions, after, with_live_position)
+    sessions, next_cursor = await coalesced_page(db.audio_sessions, limit, after)
+    now = datetime.utcnow()
+    return page_response(AudioSession, [with_live_position(session, now) for session in sessions], next_cursor)
+
+@api_router.get("/sessions/{session_id}", response_model=AudioSession)
+async def get_session(session_id: str):
+    """Get an audio session with its current playback position"""
+    session = await db.audio_sessions.find_one({"id": session_id}, {"_id": 0})
+    if not session:
+        raise HTTPException(status_code=404, detail="Session not found")
+    return FastJSONResponse(trusted_documents(AudioSession, [with_live_position(session)])[0])
+
+@api_router.post("/sessions", response_model=AudioSession)
+async def create_session(session: AudioSessionCreate, background_tasks: BackgroundTasks):
+    """Create a new audio session and start it in the background"""
+    # Get zone and source info
+    zone, source = await asyncio.gather(get_zone(session.zone_id), get_source(session.source_id))
+    if not zone:
+        raise HTTPException(status_code=404, detail="Zone not found")
+    if not source:
+        raise HTTPException(status_code=404, detail="Audio source not found")
+    
+    # Create session; it stays PREPARING until Axis confirms playback
+    session_dict = session.dict()
+    session_obj = AudioSession(
+        **session_dict,
+        status=AudioSessionStatus.PREPARING,
+        delivery_status=DeliveryStatus.PENDING,
+        duration=source.get("duration")
+    )
+    await open_session(session_obj)
+    
+    # Start playback via Axis API once the response has been sent
+    background_tasks.add_task(
+        start_session_playback,
+        session_obj.id,
+        session.zone_id,
+        build_audio_config(source, session_obj)
+    )
+    
+    return session_obj
+
+@api_router.put("/sessions/{session_id}/control")
+async def control_session(session_id: str, control: PlaybackControl):
+    """Control audio session playback"""
+    session = await db.audio_sessions.find_one({"id": session_id})
+    if not session:
+        raise HTTPException(status_code=404, detail="Session not found")
+    
+    # Update session status based on action
+    status_mapping = {
+        'play': AudioSessionStatus.PLAYING,
+        'pause': AudioSessionStatus.PAUSED,
+        'stop': AudioSessionStatus.STOPPED
+    }
+    
+    new_status = status_mapping.get(control.action, AudioSessionStatus.PLAYING)
+    
+    # Fold the time played so far into the stored position; it then
+    # advances from the new anchor only while the session plays
+    now = datetime.utcnow()
+    position, _ = live_position(session, now)
+    update_data = {
+        "status": new_status,
+        "position": control.position if control.position is not None else position,
+        "position_updated_at": now,
+        "delivery_status": DeliveryStatus.PENDING,
+        "delivery_error": None
+    }
+    
+    if control.action == "stop":
+        update_data["ended_at"] = now
+    
+    await db.audio_sessions.update_one(
+        {"id": session_id},
+        {"$set": update_data}
+    )
+    session_timeline.track({**session, **update_data})
+    event_bus.publish("session.updated", {"id": session_id, **update_data})
+    
+    # Send control to Axis system in the background; only the latest
+    # pending action for the session is sent
+    queue_session_control(session_id, control.action, {"position": control.position})
+    
+    return {"status": "success", "action": control.action, "delivery_status": DeliveryStatus.PENDING}
+
+@api_router.delete("/sessions/{session_id}")
+async def delete_session(session_id: str):
+    """Stop and delete an audio session"""
+    # Stop the session first; this replaces any queued control
+    axis_commands.discard(("control", session_id))
+    session_timeline.forget(session_id)
+    await axis_client.control_playback(session_id, 'stop')
+    
+    # Delete from database
+    result = await db.audio_sessions.delete_one({"id": session_id})
+    if result.deleted_count == 0:
+        raise HTTPException(status_code=404, detail="Session not found")
+    event_bus.publish("session.deleted", {"id": session_id})
+    
+    return {"status": "success"}
+
+# Schedules
+def _validate_weekdays(weekdays: Optional[List[int]]):
+    if weekdays and any(day < 0 or day > 6 for day in weekdays):
+        raise HTTPException(status_code=422, detail="weekdays must be between 0 (Monday) and 6 (Sunday)")
+
+def _validate_timezone(name: Optional[str]):
+    if name:
+        try:
+            ZoneInfo(name)
+        except (ZoneInfoNotFoundError, ValueError):
+            raise HTTPException(status_code=422, detail=f"Unknown timezone: {name}")
+
+@api_router.get("/schedules", response_model=List[Schedule])
+async def get_schedules(
+    limit: int = Query(DEFAULT_PAGE_LIMIT, ge=1, le=MAX_PAGE_LIMIT),
+    after: Optional[str] = None
+):
+    """Get all schedules, paged by `limit`/`after`"""
+    schedules, next_cursor = await coalesced_page(db.schedules, limit, after)
+    return page_response(Schedule, schedules, next_cursor)
+
+@api_router.post("/schedules", response_model=Schedule)
+async def create_schedule(schedule: ScheduleCreate):
+    """Create a schedule that starts a session on a zone at given times"""
+    _validate_weekdays(schedule.weekdays)
+    _validate_timezone(schedule.timezone)
+    zone, source = await asyncio.gather(get_zone(schedule.zone_id), get_source(schedule.source_id))
+    if not zone:
+        raise HTTPException(status_code=404, detail="Zone not found")
+    if not source:
+        raise HTTPException(status_code=404, detail="Audio source not found")
+    
+    schedule_obj = Schedule(**{**schedule.dict(), "start_at": to_utc(schedule.start_at)})
+    if schedule_obj.enabled:
+        schedule_obj.next_fire_at = next_fire_time(schedule_obj.dict(), datetime.utcnow())
+    await db.schedules.insert_one(schedule_obj.dict())
+    playback_scheduler.track(schedule_obj.dict())
+    event_bus.publish("schedule.created", schedule_obj.dict())
+    return schedule_obj
+
+@api_router.get("/schedules/{schedule_id}", response_model=Schedule)
+async def get_schedule(schedule_id: str):
+    """Get a schedule"""
+    schedule = await db.schedules.find_one({"id": schedule_id}, {"_id": 0})
+    if not schedule:
+        raise HTTPException(status_code=404, detail="Schedule not found")
+    return Schedule(**schedule)
+
+@api_router.put("/schedules/{schedule_id}", response_model=Schedule)
+async def update_schedule(schedule_id: str, schedule_update: ScheduleUpdate):
+    """Update a schedule; its next fire is recomputed from now"""
+    update_data = {k: v for k, v in schedule_update.dict().items() if v is not None}
+    _validate_weekdays(update_data.get("weekdays"))
+    _validate_timezone(update_data.get("timezone"))
+    if "start_at" in update_data:
+        update_data["start_at"] = to_utc(update_data["start_at"])
+    if "zone_id" in update_data and not await get_zone(update_data["zone_id"]):
+        raise HTTPException(status_code=404, detail="Zone not found")
+    if "source_id" in update_data and not await get_source(update_data["source_id"]):
+        raise HTTPException(status_code=404, detail="Audio source not found")
+    
+    schedule = await db.schedules.find_one({"id": schedule_id}, {"_id": 0})
+    if not schedule:
+        raise HTTPException(status_code=404, detail="Schedule not found")
+    schedule.update(update_data)
+    update_data["next_fire_at"] = next_fire_time(schedule, datetime.utcnow()) if schedule.get("enabled", True) else None
+    
+    # Moving next_fire_at also makes a fire being prepared lose its claim
+    await db.schedules.update_one({"id": schedule_id}, {"$set": update_data})
+    schedule.update(update_data)
+    playback_scheduler.track(schedule)
+    event_bus.publish("schedule.updated", {"id": schedule_id, **update_data})
+    return Schedule(**schedule)
+
+@api_router.delete("/schedules/{schedule_id}")
+async def delete_schedule(schedule_id: str):
+    """Delete a schedule; sessions it already started keep playing"""
+    result = await db.schedules.delete_one({"id": schedule_id})
+    playback_scheduler.forget(schedule_id)
+    if result.deleted_count == 0:
+        raise HTTPException(status_code=404, detail="Schedule not found")
+    event_bus.publish("schedule.deleted", {"id": schedule_id})
+    return {"status": "success"}
+
+# Real-time events
+@api_router.websocket("/events")
+async def events_websocket(websocket: WebSocket):
+    """Push change events to dashboards instead of having them poll"""
+    await websocket.accept()
+    subscriber = event_bus.subscribe()
+    
+    async def forward_events():
+        while True:
+            message = await subscriber.queue.get()
+            if message is None:
+                # Too far behind: close so the client reconnects and resyncs
+                await websocket.close(code=1013)
+                return
+            await websocket.send_text(message)
+    
+    async def wait_for_disconnect():
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                return
+    
+    tasks = [asyncio.create_task(forward_events()), asyncio.create_task(wait_for_disconnect())]
+    try:
+        await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for task in tasks:
+            task.cancel()
+        event_bus.unsubscribe(subscriber)
+
+# Application
+_background_tasks: Set[asyncio.Task] = set()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start and stop everything a worker process runs.
+
+    Each uvicorn worker runs this in its own process, with its own MongoDB
+    client. Jobs that must not run once per worker are started by whichever
+    worker holds the background-jobs lease.
+    """
+    if UVICORN_WORKERS > 1 and not CLUSTER_ENABLED:
+        # Each worker would run the jobs and keep its own dashboard version
+        raise RuntimeError(f"UVICORN_WORKERS={UVICORN_WORKERS} requires CLUSTER_ENABLED=true")
+    connect_mongo(app.state.mongo_client)
+    await ensure_indexes()
+    # Open the pooled client up front so the first request does not pay for it
+    axis_client.client
+    axis_commands.start()
+    await asyncio.to_thread(media_cache.load)
+    source_prober.start()
+    _background_tasks.add(asyncio.create_task(monitor_event_loop_lag(METRICS_LOOP_LAG_INTERVAL)))
+    if CLUSTER_ENABLED:
+        await cluster_events.start()
+        event_bus.forward = cluster_events.forward
+    await job_lease.start()
+    
+    try:
+        yield
+    finally:
+        await job_lease.stop()
+        event_bus.forward = None
+        await cluster_events.stop()
+        for task in _background_tasks:
+            task.cancel()
+        _background_tasks.clear()
+        await drain_session_starts()
+        await axis_commands.stop()
+        await source_prober.stop()
+        await media_cache.stop()
+        await relay_manager.close_all()
+        client.close()
+        await axis_client.aclose()
+
+def create_app(mongo_client: Optional[AsyncIOMotorClient] = None) -> FastAPI:
+    """Build the API application.
+
+    `uvicorn --factory server:create_app` calls this once per worker; a
+    MongoDB client can be passed in instead of the one built from MONGO_URL.
+    """
+    app = FastAPI(title="Axis Audio Dashboard API", version="1.0.0", lifespan=lifespan)
+    app.state.mongo_client = mongo_client
+    
+    # Include the router in the main app
+    app.include_router(api_router)
+    
+    app.add_middleware(RequestMetricsMiddleware)
+    
+    # CORS middleware
+    app.add_middleware(
+        CORSMiddleware,
+        allow_credentials=True,
+        allow_origins=["*"],
+        allow_methods=["*"],
+        allow_headers=["*"],
+        expose_headers=["X-Next-Cursor"],
+    )
+    return app
+
+app = create_app()
+
+if __name__ == "__main__":
+    # python server.py indexes [--ensure] prints the index report
+    if len(sys.argv) > 1 and sys.argv[1] == "indexes":
+        async def run_index_command():
+            connect_mongo()
+            if "--ensure" in sys.argv[2:]:
+                await ensure_indexes()
+            return await index_report()
+        
+        print(json.dumps(asyncio.run(run_index_command()), indent=2))
+    else:
+        import uvicorn
+        uvicorn.run(app, host="0.0.0.0", port=8001)
\ No newline at end of file
@@ -0,0 +1,423 @@
+#!/usr/bin/env python3
+"""
+Load and benchmark suite for the Axis Audio Dashboard API.
+
+Starts the backend against a local MongoDB (or an in-process stand-in)
+and the Axis API simulator (simulator/axis_simulator.py), seeds a fleet, then drives each scenario with
+concurrent clients and reports throughput, latency percentiles and error
+rates as JSON. HTTP errors and Axis delivery failures are reported
+separately: volume and session commands are accepted with a pending
+delivery_status, and zone and batch volume changes answer with one result
+per speaker, so a run where every Axis command failed still shows a low
+HTTP error rate but a high delivery failure rate.
+
+Scenarios:
+- dashboard: dashboards revalidating /api/dashboard with their ETag,
+  plus occasional paged speaker listings
+- volume_storm: speaker volume changes, with some zone-wide and batch changes
+- session_churn: sessions created, paused, resumed and deleted
+
+Usage:
+    python benchmarks/load_test.py [--mongo-url memory] [--duration 10] [--concurrency 50]
+                                   [--scenarios dashboard,volume_storm] [--output results.json]
+
+--mongo-url memory (the default) uses mongomock-motor in the backend
+process; pass a mongodb:// URL to benchmark against a real MongoDB.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, List
+
+import httpx
+
+BENCHMARKS_DIR = Path(__file__).resolve().parent
+BACKEND_DIR = BENCHMARKS_DIR.parent / 'backend'
+SIMULATOR = BENCHMARKS_DIR.parent / 'simulator' / 'axis_simulator.py'
+
+SCENARIOS = ('dashboard', 'volume_storm', 'session_churn')
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def serve_app(args):
+    """Run the backend in this process (used as a subprocess of the benchmark)"""
+    import uvicorn
+
+    sys.path.insert(0, str(BACKEND_DIR))
+    import server
+
+    mongo_client = None
+    if args.mongo_url == 'memory':
+        from mongomock_motor import AsyncMongoMockClient
+        mongo_client = AsyncMongoMockClient()
+
+    uvicorn.run(server.create_app(mongo_client), host='127.0.0.1', port=args.port, log_level='warning')
+
+
+def start_process(command: List[str], env: Dict[str, str]) -> subprocess.Popen:
+    # Logs go to a file: an undrained pipe would block the server once full
+    log = tempfile.TemporaryFile()
+    process = subprocess.Popen(command, env=env, stdout=log, stderr=subprocess.STDOUT)
+    process.log = log
+    return process
+
+
+def process_output(process: subprocess.Popen) -> str:
+    process.log.seek(0)
+    return process.log.read().decode(errors='replace')[-2000:]
+
+
+async def wait_until_ready(url: str, process: subprocess.Popen, timeout: float = 30):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise RuntimeError(f"{url} exited early:\n{process_output(process)}")
+            try:
+                await client.get(url)
+                return
+            except httpx.TransportError:
+                await asyncio.sleep(0.2)
+    raise RuntimeError(f"{url} did not start within {timeout}s")
+
+
+class Recorder:
+    """Latency and status samples for one scenario"""
+
+    def __init__(self):
+        self.samples: List[tuple] = []
+        # route -> outcome -> count, for the Axis commands behind the requests
+        self.deliveries: Dict[str, Dict[str, int]] = {}
+        self.touched_speakers = set()
+
+    async def call(self, client: httpx.AsyncClient, route: str, method: str, url: str, **kwargs) -> httpx.Response:
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+            status = response.status_code
+        except httpx.HTTPError as e:
+            response = None
+            status = type(e).__name__
+        self.samples.append((route, status, time.perf_counter() - started))
+        return response
+
+    def delivery(self, route: str, outcome: str):
+        outcomes = self.deliveries.setdefault(route, {})
+        outcomes[outcome] = outcomes.get(outcome, 0) + 1
+
+    def fan_out(self, route: str, response: httpx.Response):
+        """Record the per-speaker results of a zone or batch volume change"""
+        if response is None or response.status_code != 200:
+            return
+        for result in response.json().get('results', []):
+            self.delivery(route, result['status'])
+
+    @staticmethod
+    def _delivery_summary(outcomes: Dict[str, int]) -> Dict:
+        # Commands still pending when the scenario ended have no outcome yet
+        settled = sum(count for outcome, count in outcomes.items() if outcome != 'pending')
+        failed = sum(count for outcome, count in outcomes.items() if outcome not in ('success', 'delivered', 'pending'))
+        return {
+            'commands': sum(outcomes.values()),
+            'failure_rate': round(failed / settled, 4) if settled else None,
+            'outcomes': dict(sorted(outcomes.items())),
+        }
+
+    @staticmethod
+    def _summary(samples: List[tuple], elapsed: float) -> Dict:
+        latencies = sorted(sample[2] * 1000 for sample in samples)
+        errors = {}
+        for _, status, _ in samples:
+            if not isinstance(status, int) or status >= 400:
+                errors[str(status)] = errors.get(str(status), 0) + 1
+
+        def percentile(p: float) -> float:
+            if not latencies:
+                return None
+            return round(latencies[min(len(latencies) - 1, int(len(latencies) * p))], 3)
+
+        return {
+            'requests': len(samples),
+            'throughput_rps': round(len(samples) / elapsed, 2) if elapsed else None,
+            'latency_ms': {
+                'p50': percentile(0.50),
+                'p95': percentile(0.95),
+                'p99': percentile(0.99),
+                'max': round(latencies[-1], 3) if latencies else None,
+                'mean': round(sum(latencies) / len(latencies), 3) if latencies else None,
+            },
+            'error_rate': round(sum(errors.values()) / len(samples), 4) if samples else None,
+            'errors': errors,
+        }
+
+    def report(self, elapsed: float) -> Dict:
+        routes = {}
+        for sample in self.samples:
+            routes.setdefault(sample[0], []).append(sample)
+        totals = {}
+        for outcomes in self.deliveries.values():
+            for outcome, count in outcomes.items():
+                totals[outcome] = totals.get(outcome, 0) + count
+        return {
+            **self._summary(self.samples, elapsed),
+            'delivery': {
+                **self._delivery_summary(totals),
+                'routes': {route: self._delivery_summary(outcomes) for route, outcomes in sorted(self.deliveries.items())},
+            },
+            'routes': {route: self._summary(samples, elapsed) for route, samples in sorted(routes.items())},
+        }
+
+
+async def seed(client: httpx.AsyncClient, speakers: int, zones: int, sources: int) -> Dict[str, List[str]]:
+    """Create the fleet the scenarios work on"""
+    speaker_ids = []
+    for i in range(speakers):
+        response = await client.post('/api/speakers', json={
+            'name': f'Bench speaker {i}',
+            'ip_address': f'10.{i // 65536 % 256}.{i // 256 % 256}.{i % 256}',
+            'model': 'AXIS C1004-E',
+        })
+        response.raise_for_status()
+        speaker_ids.append(response.json()['id'])
+
+    zone_ids = []
+    per_zone = max(1, speakers // zones)
+    for i in range(zones):
+        members = speaker_ids[i * per_zone:(i + 1) * per_zone]
+        response = await client.post('/api/zones', json={'name': f'Bench zone {i}', 'speaker_ids': members})
+        response.raise_for_status()
+        zone_ids.append(response.json()['id'])
+
+    source_ids = []
+    for i in range(sources):
+        response = await client.post('/api/sources', json={
+            'name': f'Bench source {i}',
+            'type': 'streaming',
+            'url': f'http://127.0.0.1/stream/{i}.mp3',
+        })
+        response.raise_for_status()
+        source_ids.append(response.json()['id'])
+
+    return {'speakers': speaker_ids, 'zones': zone_ids, 'sources': source_ids}
+
+
+async def dashboard_worker(client: httpx.AsyncClient, recorder: Recorder, fleet: Dict, deadline: float):
+    etag = None
+    while time.monotonic() < deadline:
+        if random.random() < 0.9:
+            headers = {'If-None-Match': etag} if etag else {}
+            response = await recorder.call(client, 'GET /api/dashboard', 'GET', '/api/dashboard', headers=headers)
+            if response is not None and response.status_code == 200:
+                etag = response.headers.get('etag')
+        else:
+            await recorder.call(client, 'GET /api/speakers', 'GET', '/api/speakers', params={'limit': 100})
+
+
+async def volume_storm_worker(client: httpx.AsyncClient, recorder: Recorder, fleet: Dict, deadline: float):
+    while time.monotonic() < deadline:
+        volume = random.randint(0, 100)
+        roll = random.random()
+        if roll < 0.85 or not fleet['zones']:
+            speaker_id = random.choice(fleet['speakers'])
+            response = await recorder.call(client, 'PUT /api/speakers/{id}/volume', 'PUT',
+                                           f'/api/speakers/{speaker_id}/volume', json={'volume': volume})
+            if response is not None and response.status_code == 200:
+                recorder.touched_speakers.add(speaker_id)
+        elif roll < 0.95:
+            zone_id = random.choice(fleet['zones'])
+            response = await recorder.call(client, 'PUT /api/zones/{id}/volume', 'PUT',
+                                           f'/api/zones/{zone_id}/volume', json={'volume': volume})
+            recorder.fan_out('PUT /api/zones/{id}/volume', response)
+        else:
+            speaker_ids = random.sample(fleet['speakers'], min(20, len(fleet['speakers'])))
+            response = await recorder.call(client, 'POST /api/speakers/volume/batch', 'POST', '/api/speakers/volume/batch', json={
+                'operations': [{'speaker_id': speaker_id, 'volume': volume} for speaker_id in speaker_ids],
+            })
+            recorder.fan_out('POST /api/speakers/volume/batch', response)
+
+
+async def session_churn_worker(client: httpx.AsyncClient, recorder: Recorder, fleet: Dict, deadline: float):
+    while time.monotonic() < deadline:
+        response = await recorder.call(client, 'POST /api/sessions', 'POST', '/api/sessions', json={
+            'name': f'Bench session {uuid.uuid4().hex[:8]}',
+            'zone_id': random.choice(fleet['zones']),
+            'source_id': random.choice(fleet['sources']),
+        })
+        if response is None or response.status_code != 200:
+            continue
+        session_id = response.json()['id']
+        # Starts run in the background; wait for the outcome of the Axis call
+        for _ in range(100):
+            response = await client.get(f'/api/sessions/{session_id}')
+            if response.status_code != 200 or response.json()['status'] != 'preparing':
+                break
+            await asyncio.sleep(0.05)
+        if response.status_code == 200:
+            recorder.delivery('POST /api/sessions', response.json().get('delivery_status') or 'pending')
+        for action in ('pause', 'play'):
+            await recorder.call(client, 'PUT /api/sessions/{id}/control', 'PUT',
+                                f'/api/sessions/{session_id}/control', json={'action': action})
+        await recorder.call(client, 'DELETE /api/sessions/{id}', 'DELETE', f'/api/sessions/{session_id}')
+
+
+WORKERS = {
+    'dashboard': dashboard_worker,
+    'volume_storm': volume_storm_worker,
+    'session_churn': session_churn_worker,
+}
+
+
+async def settle_speaker_deliveries(client: httpx.AsyncClient, recorder: Recorder, timeout: float = 30):
+    """Wait for queued volume commands, then record their delivery_status"""
+    if not recorder.touched_speakers:
+        return
+    deadline = time.monotonic() + timeout
+    while True:
+        statuses = {}
+        after = None
+        while True:
+            params = {'limit': 1000, **({'after': after} if after else {})}
+            response = await client.get('/api/speakers', params=params)
+            response.raise_for_status()
+            for speaker in response.json():
+                if speaker['id'] in recorder.touched_speakers:
+                    statuses[speaker['id']] = speaker.get('delivery_status') or 'pending'
+            after = response.headers.get('x-next-cursor')
+            if not after:
+                break
+        if 'pending' not in statuses.values() or time.monotonic() >= deadline:
+            break
+        await asyncio.sleep(0.2)
+
+    for status in statuses.values():
+        recorder.delivery('PUT /api/speakers/{id}/volume', status)
+
+
+async def run_scenario(base_url: str, name: str, fleet: Dict, concurrency: int, duration: float) -> Dict:
+    recorder = Recorder()
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        started = time.monotonic()
+        deadline = started + duration
+        await asyncio.gather(*(WORKERS[name](client, recorder, fleet, deadline) for _ in range(concurrency)))
+        elapsed = time.monotonic() - started
+        await settle_speaker_deliveries(client, recorder)
+    return recorder.report(elapsed)
+
+
+async def run_benchmark(args) -> Dict:
+    axis_port = free_port()
+    app_port = free_port()
+    env = {
+        **os.environ,
+        'MONGO_URL': args.mongo_url if args.mongo_url != 'memory' else 'mongodb://127.0.0.1:27017',
+        'DB_NAME': args.db_name or f'axis_benchmark_{uuid.uuid4().hex[:8]}',
+        'AXIS_API_BASE_URL': f'http://127.0.0.1:{axis_port}',
+        'AXIS_API_USERNAME': 'benchmark',
+        'AXIS_API_PASSWORD': 'benchmark',
+        'SPEAKER_POLL_ENABLED': 'true' if args.with_poller else 'false',
+    }
+
+    axis = start_process([
+        sys.executable, str(SIMULATOR),
+        '--port', str(axis_port),
+        '--targets', str(args.speakers),
+        '--latency', args.axis_latency,
+        '--error-rate', str(args.axis_error_rate),
+    ], env)
+    app = start_process([
+        sys.executable, str(Path(__file__).resolve()), 'serve',
+        '--port', str(app_port),
+        '--mongo-url', args.mongo_url,
+    ], env)
+
+    try:
+        await wait_until_ready(f'http://127.0.0.1:{axis_port}/api/targets', axis)
+        await wait_until_ready(f'http://127.0.0.1:{app_port}/api/health', app)
+
+        base_url = f'http://127.0.0.1:{app_port}'
+        async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+            fleet = await seed(client, args.speakers, args.zones, args.sources)
+
+        results = {}
+        for name in args.scenarios:
+            results[name] = await run_scenario(base_url, name, fleet, args.concurrency, args.duration)
+
+        return {
+            'config': {
+                'mongo': 'memory' if args.mongo_url == 'memory' else 'mongodb',
+                'duration_s': args.duration,
+                'concurrency': args.concurrency,
+                'speakers': args.speakers,
+                'zones': args.zones,
+                'sources': args.sources,
+                'axis_latency': args.axis_latency,
+                'axis_error_rate': args.axis_error_rate,
+            },
+            'scenarios': results,
+        }
+    finally:
+        for process in (app, axis):
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+            process.log.close()
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == 'serve':
+        parser = argparse.ArgumentParser()
+        parser.add_argument('command')
+        parser.add_argument('--port', type=int, required=True)
+        parser.add_argument('--mongo-url', default='memory')
+        serve_app(parser.parse_args())
+        return
+
+    parser = argparse.ArgumentParser(description="Load and benchmark suite for the Axis Audio Dashboard API")
+    parser.add_argument('--mongo-url', default=os.environ.get('BENCHMARK_MONGO_URL', 'memory'),
+                        help="mongodb:// URL, or 'memory' for the in-process stand-in")
+    parser.add_argument('--db-name', help="database name (default: a fresh random one)")
+    parser.add_argument('--duration', type=float, default=10, help="seconds per scenario")
+    parser.add_argument('--concurrency', type=int, default=50, help="concurrent clients per scenario")
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS))
+    parser.add_argument('--speakers', type=int, default=200)
+    parser.add_argument('--zones', type=int, default=10)
+    parser.add_argument('--sources', type=int, default=5)
+    parser.add_argument('--axis-latency', default='fixed:5', help="simulator latency spec, e.g. lognormal:20:0.6")
+    parser.add_argument('--axis-error-rate', type=float, default=0.0, help="share of simulator requests that fail")
+    parser.add_argument('--with-poller', action='store_true', help="keep the speaker health poller running")
+    parser.add_argument('--output', help="write the JSON report to this file instead of stdout")
+    args = parser.parse_args()
+
+    args.scenarios = [name.strip() for name in args.scenarios.split(',') if name.strip()]
+    unknown = [name for name in args.scenarios if name not in WORKERS]
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(unknown)}")
+
+    report = asyncio.run(run_benchmark(args))
+    output = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(output + '\n')
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
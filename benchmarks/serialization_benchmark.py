@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Serialization benchmark for the list endpoints.
+
+Compares the CPU time needed to turn 1000 speaker documents, as returned
+by MongoDB, into a JSON response body:
+- validated: the previous path, building a Speaker model per document
+  and letting FastAPI validate and encode them through response_model
+- trusted: trusted_documents() + json_dumps(), as used by the list and
+  dashboard endpoints
+
+Usage:
+    python benchmarks/serialization_benchmark.py [--documents 1000] [--rounds 50]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import List
+
+from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+# server.py only reads its MongoDB settings when the app starts; no connection is made
+os.environ.setdefault('MONGO_URL', 'mongodb://localhost:27017')
+os.environ.setdefault('DB_NAME', 'axis_audio_benchmark')
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'backend'))
+
+import server  # noqa: E402
+from server import Speaker  # noqa: E402
+
+
+def make_documents(count: int) -> List[dict]:
+    """Speaker documents shaped like a MongoDB find() result"""
+    return [
+        {
+            '_id': ObjectId(),
+            'id': str(uuid.uuid4()),
+            'name': f'Speaker {i}',
+            'ip_address': f'10.{i // 65536 % 256}.{i // 256 % 256}.{i % 256}',
+            'mac_address': None,
+            'model': 'AXIS C1004-E',
+            'firmware_version': '11.5.64',
+            'status': 'online',
+            'volume': i % 101,
+            'zone_id': None,
+            'last_seen': datetime.utcnow(),
+            'capabilities': ['audio', 'volume'],
+        }
+        for i in range(count)
+    ]
+
+
+def validated_path(docs: List[dict], adapter: TypeAdapter) -> bytes:
+    # Route builds models, then FastAPI validates and encodes the response
+    models = [Speaker(**doc) for doc in docs]
+    validated = adapter.validate_python(models)
+    return json.dumps(jsonable_encoder(adapter.dump_python(validated, mode='json'))).encode()
+
+
+def trusted_path(docs: List[dict]) -> bytes:
+    for doc in docs:
+        doc.pop('_id', None)
+    return server.json_dumps(server.trusted_documents(Speaker, docs))
+
+
+def measure(func, documents: int, rounds: int) -> float:
+    """Average CPU milliseconds per call, on fresh documents each round"""
+    total = 0.0
+    for _ in range(rounds):
+        docs = make_documents(documents)
+        started = time.process_time()
+        func(docs)
+        total += time.process_time() - started
+    return total / rounds * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--documents', type=int, default=1000)
+    parser.add_argument('--rounds', type=int, default=50)
+    args = parser.parse_args()
+
+    adapter = TypeAdapter(List[Speaker])
+    # Warm up both paths (model schema build, encoder caches)
+    validated_path(make_documents(10), adapter)
+    trusted_path(make_documents(10))
+
+    validated_ms = measure(lambda docs: validated_path(docs, adapter), args.documents, args.rounds)
+    trusted_ms = measure(trusted_path, args.documents, args.rounds)
+
+    print(json.dumps({
+        'documents': args.documents,
+        'rounds': args.rounds,
+        'encoder': 'orjson' if server.orjson is not None else 'json',
+        'validated_cpu_ms': round(validated_ms, 3),
+        'trusted_cpu_ms': round(trusted_ms, 3),
+        'saved_cpu_ms': round(validated_ms - trusted_ms, 3),
+        'speedup': round(validated_ms / trusted_ms, 2) if trusted_ms else None,
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -4,6 +4,25 @@ import './App.css';
 
 // Use relative URL to leverage nginx proxy (production) or React dev proxy (development)
 const API = '/api';
+const EVENTS_URL = `${window.location.protocol === 'https:' ? 'wss' : 'ws'}://${window.location.host}${API}/events`;
+
+// Fallback polling interval, only used while the event channel is down
+const POLL_INTERVAL = 10000;
+
+// Apply a change event ({id, ...fields}) to a list of documents. Only
+// created events add a document: an update may carry a few fields of one
+// we never listed, which would show up as an incomplete card
+const upsertById = (items, doc, insert) => {
+  const index = items.findIndex(item => item.id === doc.id);
+  if (index === -1) {
+    return insert ? [...items, doc] : items;
+  }
+  const next = [...items];
+  next[index] = { ...next[index], ...doc };
+  return next;
+};
+
+const removeById = (items, id) => items.filter(item => item.id !== id);
 
 // Icon Components
 const PlayIcon = () => (
@@ -109,25 +128,104 @@ function App() {
   const fetchAllData = useCallback(async () => {
     setIsLoading(true);
     try {
-      await Promise.all([
-        fetchSpeakers(),
-        fetchZones(),
-        fetchSources(),
-        fetchSessions()
-      ]);
+      // One snapshot request; the browser revalidates it with its ETag
+      const response = await axios.get(`${API}/dashboard`);
+      setSpeakers(response.data.speakers);
+      setZones(response.data.zones);
+      setSources(response.data.sources);
+      setSessions(response.data.sessions);
     } catch (error) {
+      console.error('Error fetching dashboard:', error);
       setError('Failed to load dashboard data');
     } finally {
       setIsLoading(false);
     }
-  }, [fetchSpeakers, fetchZones, fetchSources, fetchSessions]);
+  }, []);
+
+  const applyEvent = useCallback((event) => {
+    const setters = {
+      speaker: setSpeakers,
+      zone: setZones,
+      source: setSources,
+      session: setSessions
+    };
+    const [entity, action] = event.type.split('.');
+
+    if (event.type === 'speakers.discovered') {
+      fetchSpeakers();
+      return;
+    }
+
+    const setItems = setters[entity];
+    if (!setItems) {
+      return;
+    }
+    if (action === 'deleted') {
+      setItems(prev => removeById(prev, event.data.id));
+    } else {
+      setItems(prev => upsertById(prev, event.data, action === 'created'));
+    }
+  }, [fetchSpeakers]);
 
   useEffect(() => {
+    let socket = null;
+    let pollInterval = null;
+    let reconnectTimer = null;
+    let reconnectDelay = 1000;
+    let closed = false;
+
+    const startPolling = () => {
+      if (!pollInterval) {
+        pollInterval = setInterval(fetchAllData, POLL_INTERVAL);
+      }
+    };
+
+    const stopPolling = () => {
+      clearInterval(pollInterval);
+      pollInterval = null;
+    };
+
+    const connect = () => {
+      socket = new WebSocket(EVENTS_URL);
+
+      socket.onopen = () => {
+        reconnectDelay = 1000;
+        stopPolling();
+        // Resync anything missed while disconnected
+        fetchAllData();
+      };
+
+      socket.onmessage = (message) => {
+        try {
+          applyEvent(JSON.parse(message.data));
+        } catch (error) {
+          console.error('Error handling event:', error);
+        }
+      };
+
+      socket.onclose = () => {
+        if (closed) {
+          return;
+        }
+        // Poll until the event channel is back
+        startPolling();
+        reconnectTimer = setTimeout(connect, reconnectDelay);
+        reconnectDelay = Math.min(reconnectDelay * 2, 30000);
+      };
+    };
+
     fetchAllData();
-    // Refresh data every 10 seconds
-    const interval = setInterval(fetchAllData, 10000);
-    return () => clearInterval(interval);
-  }, [fetchAllData]);
+    connect();
+
+    return () => {
+      closed = true;
+      stopPolling();
+      clearTimeout(reconnectTimer);
+      if (socket) {
+        socket.close();
+      }
+    };
+  }, [fetchAllData, applyEvent]);
 
   const discoverSpeakers = async () => {
     try {
@@ -422,7 +520,8 @@ function App() {
                           </p>
                           <span className={`inline-block px-2 py-1 rounded text-xs ${
                             session.status === 'playing' ? 'bg-green-600' : 
-                            session.status === 'paused' ? 'bg-yellow-600' : 'bg-red-600'
+                            session.status === 'paused' ? 'bg-yellow-600' :
+                            session.status === 'preparing' ? 'bg-blue-600' : 'bg-red-600'
                           }`}>
                             {session.status}
                           </span>
@@ -792,7 +891,8 @@ function App() {
                       <div className="flex items-center space-x-2">
                         <span className={`px-2 py-1 rounded text-xs ${
                           session.status === 'playing' ? 'bg-green-600' : 
-                          session.status === 'paused' ? 'bg-yellow-600' : 'bg-red-600'
+                          session.status === 'paused' ? 'bg-yellow-600' :
+                          session.status === 'preparing' ? 'bg-blue-600' : 'bg-red-600'
                         }`}>
                           {session.status}
                         </span>
@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+"""
+Fleet-scale simulator for the Axis Audio Manager Pro API.
+
+Serves the endpoints AxisAudioClient calls for a configurable number of
+virtual targets, with injectable latency, errors, timeouts and slow-drip
+responses, so discovery, polling and fan-out can be measured at site scale
+without real hardware.
+
+Usage:
+    python simulator/axis_simulator.py --targets 10000 --latency lognormal:20:0.6 \\
+        --error-rate 0.01 --timeout-rate 0.001 --drip-rate 0.005
+
+Latency specs (milliseconds):
+    fixed:MS            always MS
+    uniform:LOW:HIGH    uniformly between LOW and HIGH
+    normal:MEAN:STDDEV  normal distribution, clamped at 0
+    lognormal:MEDIAN:SIGMA
+    exponential:MEAN
+
+Fault settings can be changed while running with PUT /_simulator/faults,
+and GET /_simulator/stats reports request counts per route and outcome.
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import time
+import uuid
+from dataclasses import asdict, dataclass, field
+from typing import Callable, Dict, List, Optional
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import Response, StreamingResponse
+
+
+def parse_latency(spec: str) -> Callable[[random.Random], float]:
+    """Turn a latency spec into a sampler returning seconds"""
+    kind, _, rest = spec.partition(':')
+    try:
+        params = [float(value) for value in rest.split(':')] if rest else []
+    except ValueError:
+        raise ValueError(f"Invalid latency spec: {spec}")
+
+    samplers = {
+        'fixed': (1, lambda rng, ms: ms),
+        'uniform': (2, lambda rng, low, high: rng.uniform(low, high)),
+        'normal': (2, lambda rng, mean, stddev: rng.gauss(mean, stddev)),
+        'lognormal': (2, lambda rng, median, sigma: rng.lognormvariate(math.log(max(median, 1e-6)), sigma)),
+        'exponential': (1, lambda rng, mean: rng.expovariate(1 / mean) if mean > 0 else 0),
+    }
+    if kind not in samplers or len(params) != samplers[kind][0]:
+        raise ValueError(f"Invalid latency spec: {spec}")
+    sampler = samplers[kind][1]
+    return lambda rng: max(0.0, sampler(rng, *params)) / 1000
+
+
+@dataclass
+class FaultConfig:
+    """Fault injection settings, applied to every simulated endpoint"""
+    latency: str = 'fixed:5'
+    error_rate: float = 0.0
+    error_statuses: List[int] = field(default_factory=lambda: [500, 502, 503])
+    timeout_rate: float = 0.0
+    timeout_seconds: float = 120.0
+    drip_rate: float = 0.0
+    drip_chunk_bytes: int = 64
+    drip_interval_ms: float = 200.0
+
+    def validate(self):
+        parse_latency(self.latency)
+        for name in ('error_rate', 'timeout_rate', 'drip_rate'):
+            value = getattr(self, name)
+            if not 0 <= value <= 1:
+                raise ValueError(f"{name} must be between 0 and 1")
+        if self.error_rate and not self.error_statuses:
+            raise ValueError("error_statuses cannot be empty when error_rate is set")
+        if self.drip_chunk_bytes < 1:
+            raise ValueError("drip_chunk_bytes must be at least 1")
+
+
+class Fleet:
+    """In-memory state of the virtual targets and sessions"""
+
+    def __init__(self, targets: int, offline_rate: float, rng: random.Random):
+        self.targets: Dict[str, Dict] = {}
+        for i in range(targets):
+            address = f"10.{i // 65536 % 256}.{i // 256 % 256}.{i % 256}"
+            self.targets[address] = {
+                'id': address,
+                'name': f"Speaker {i}",
+                'ip_address': address,
+                'model': 'AXIS C1004-E',
+                'firmware_version': '11.5.64',
+                'status': 'offline' if rng.random() < offline_rate else 'online',
+                'volume': 50,
+            }
+        # The backend addresses speakers by its own UUIDs rather than the
+        # ids listed here, so unknown ids get a target on first use; they
+        # stay out of the listing so discovery doesn't report them twice
+        self.adopted: Dict[str, Dict] = {}
+        self.sessions: Dict[str, Dict] = {}
+        self._listing: Optional[bytes] = None
+        self._offline_rate = offline_rate
+        self._rng = rng
+
+    def listing(self) -> bytes:
+        # Serializing 10k targets dominates discovery, so keep the bytes
+        # until a target changes
+        if self._listing is None:
+            self._listing = json.dumps({'targets': list(self.targets.values())}).encode()
+        return self._listing
+
+    def target(self, target_id: str) -> Dict:
+        target = self.targets.get(target_id) or self.adopted.get(target_id)
+        if target is None:
+            target = self.adopted[target_id] = {
+                'id': target_id,
+                'name': f"Speaker {target_id[:8]}",
+                'ip_address': None,
+                'model': 'AXIS C1004-E',
+                'firmware_version': '11.5.64',
+                'status': 'offline' if self._rng.random() < self._offline_rate else 'online',
+                'volume': 50,
+            }
+        return target
+
+    def set_volume(self, target_id: str, volume) -> Dict:
+        target = self.target(target_id)
+        target['volume'] = volume
+        if target_id in self.targets:
+            self._listing = None
+        return target
+
+
+class Simulator:
+    def __init__(self, fleet: Fleet, faults: FaultConfig, rng: random.Random):
+        self.fleet = fleet
+        self.rng = rng
+        self.stats: Dict[str, Dict[str, int]] = {}
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.started_at = time.time()
+        self.configure(faults)
+
+    def configure(self, faults: FaultConfig):
+        faults.validate()
+        self.faults = faults
+        self._latency = parse_latency(faults.latency)
+
+    def _count(self, route: str, outcome: str):
+        counts = self.stats.setdefault(route, {})
+        counts[outcome] = counts.get(outcome, 0) + 1
+
+    async def respond(self, route: str, payload: Dict = None, body: bytes = None, status_code: int = 200) -> Response:
+        """Answer `route` with `payload` after applying latency and faults"""
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            faults = self.faults
+            await asyncio.sleep(self._latency(self.rng))
+
+            roll = self.rng.random()
+            if roll < faults.timeout_rate:
+                self._count(route, 'timeout')
+                await asyncio.sleep(faults.timeout_seconds)
+                return Response(status_code=504)
+            roll -= faults.timeout_rate
+            if roll < faults.error_rate:
+                status = self.rng.choice(faults.error_statuses)
+                self._count(route, f'error_{status}')
+                return Response(json.dumps({'detail': 'Simulated failure'}), status_code=status,
+                                media_type='application/json')
+            roll -= faults.error_rate
+
+            if body is None:
+                body = json.dumps(payload).encode()
+            if roll < faults.drip_rate:
+                self._count(route, 'drip')
+                return StreamingResponse(self._drip(body), status_code=status_code, media_type='application/json')
+
+            self._count(route, 'ok')
+            return Response(body, status_code=status_code, media_type='application/json')
+        finally:
+            self.in_flight -= 1
+
+    async def _drip(self, body: bytes):
+        size = self.faults.drip_chunk_bytes
+        interval = self.faults.drip_interval_ms / 1000
+        for offset in range(0, len(body), size):
+            if offset:
+                await asyncio.sleep(interval)
+            yield body[offset:offset + size]
+
+    def snapshot(self) -> Dict:
+        return {
+            'uptime_seconds': round(time.time() - self.started_at, 1),
+            'targets': len(self.fleet.targets),
+            'sessions': len(self.fleet.sessions),
+            'in_flight': self.in_flight,
+            'max_in_flight': self.max_in_flight,
+            'requests': self.stats,
+            'faults': asdict(self.faults),
+        }
+
+
+def create_app(targets: int = 200, faults: FaultConfig = None, offline_rate: float = 0.0,
+               seed: Optional[int] = None) -> FastAPI:
+    rng = random.Random(seed)
+    simulator = Simulator(Fleet(targets, offline_rate, rng), faults or FaultConfig(), rng)
+    fleet = simulator.fleet
+    app = FastAPI(title="Axis Audio Manager Pro simulator")
+    app.state.simulator = simulator
+
+    @app.get("/api/targets")
+    async def list_targets():
+        return await simulator.respond('GET /api/targets', body=fleet.listing())
+
+    @app.get("/api/targets/{target_id}")
+    async def get_target(target_id: str):
+        return await simulator.respond('GET /api/targets/{id}', fleet.target(target_id))
+
+    @app.put("/api/targets/{target_id}/volume")
+    async def set_volume(target_id: str, body: dict):
+        target = fleet.set_volume(target_id, body.get('volume'))
+        return await simulator.respond('PUT /api/targets/{id}/volume', {'id': target_id, 'volume': target['volume']})
+
+    @app.post("/api/sessions")
+    async def start_session(body: dict):
+        session_id = str(uuid.uuid4())
+        fleet.sessions[session_id] = {
+            'session_id': session_id,
+            'targets': body.get('targets', []),
+            'audio_config': body.get('audio_config', {}),
+            'status': 'started',
+        }
+        return await simulator.respond('POST /api/sessions', {'session_id': session_id, 'status': 'started'})
+
+    @app.put("/api/sessions/{session_id}/control")
+    async def control_session(session_id: str, body: dict):
+        session = fleet.sessions.get(session_id)
+        if session is not None:
+            session['status'] = body.get('action', session['status'])
+            if session['status'] == 'stop':
+                fleet.sessions.pop(session_id, None)
+        # Sessions started before a restart are unknown here; accept them anyway
+        return await simulator.respond('PUT /api/sessions/{id}/control', {'session_id': session_id, 'status': 'success'})
+
+    @app.get("/_simulator/stats")
+    async def stats():
+        return simulator.snapshot()
+
+    @app.put("/_simulator/faults")
+    async def update_faults(request: Request):
+        settings = {**asdict(simulator.faults), **await request.json()}
+        try:
+            simulator.configure(FaultConfig(**settings))
+        except (TypeError, ValueError) as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return asdict(simulator.faults)
+
+    return app
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Axis Audio Manager Pro API simulator")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8443)
+    parser.add_argument('--targets', type=int, default=200, help="number of virtual targets")
+    parser.add_argument('--offline-rate', type=float, default=0.0, help="share of targets reported offline")
+    parser.add_argument('--latency', default='fixed:5', help="latency distribution, e.g. lognormal:20:0.6")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="share of requests answered with an error")
+    parser.add_argument('--error-statuses', default='500,502,503', help="comma separated error status codes")
+    parser.add_argument('--timeout-rate', type=float, default=0.0, help="share of requests left hanging")
+    parser.add_argument('--timeout-seconds', type=float, default=120.0, help="how long hanging requests hang")
+    parser.add_argument('--drip-rate', type=float, default=0.0, help="share of responses sent in slow chunks")
+    parser.add_argument('--drip-chunk-bytes', type=int, default=64)
+    parser.add_argument('--drip-interval-ms', type=float, default=200.0)
+    parser.add_argument('--seed', type=int, help="random seed, for reproducible runs")
+    parser.add_argument('--certfile', help="serve HTTPS with this certificate")
+    parser.add_argument('--keyfile', help="private key for --certfile")
+    args = parser.parse_args()
+
+    faults = FaultConfig(
+        latency=args.latency,
+        error_rate=args.error_rate,
+        error_statuses=[int(status) for status in args.error_statuses.split(',') if status.strip()],
+        timeout_rate=args.timeout_rate,
+        timeout_seconds=args.timeout_seconds,
+        drip_rate=args.drip_rate,
+        drip_chunk_bytes=args.drip_chunk_bytes,
+        drip_interval_ms=args.drip_interval_ms,
+    )
+    try:
+        faults.validate()
+    except ValueError as e:
+        parser.error(str(e))
+
+    app = create_app(args.targets, faults, args.offline_rate, args.seed)
+    uvicorn.run(app, host=args.host, port=args.port, log_level='warning',
+                ssl_certfile=args.certfile, ssl_keyfile=args.keyfile)
+
+
+if __name__ == '__main__':
+    main()
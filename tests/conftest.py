@@ -0,0 +1,54 @@
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+# The backend is a single module run from its own directory
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+# Read by server.py at import time; jobs are started by the tests that need them
+os.environ.setdefault("DB_NAME", "axis_audio_test")
+os.environ.setdefault("SPEAKER_POLL_ENABLED", "false")
+os.environ.setdefault("SCHEDULER_ENABLED", "false")
+os.environ.setdefault("CLUSTER_ENABLED", "false")
+
+import server  # noqa: E402
+
+
+@pytest.fixture
+def mongo():
+    """Point the backend at an empty in-memory MongoDB for one test"""
+    from mongomock_motor import AsyncMongoMockClient
+    previous = server.client, server.db
+    server.connect_mongo(AsyncMongoMockClient())
+    yield server.db
+    server.client, server.db = previous
+
+
+@pytest.fixture
+def axis_calls(monkeypatch):
+    """Answer every Axis API call from the test, recording (method, endpoint, data)"""
+    calls = []
+
+    async def request(self, method, endpoint, data=None, **kwargs):
+        calls.append((method, endpoint, data))
+        return {"session_id": "axis-session", "status": "ok"}
+    monkeypatch.setattr(server.AxisAudioClient, "_request", request)
+    return calls
+
+
+@pytest.fixture(scope="session")
+def app_client():
+    # The background jobs are module-level objects bound to the event loop
+    # that started them, so one app lifespan serves the whole session
+    from fastapi.testclient import TestClient
+    from mongomock_motor import AsyncMongoMockClient
+    with TestClient(server.create_app(AsyncMongoMockClient())) as client:
+        yield client
+
+
+@pytest.fixture
+def api(app_client, axis_calls):
+    """HTTP client for an app on an in-memory MongoDB, with its lifespan running"""
+    return app_client
@@ -0,0 +1,107 @@
+"""Container header parsing behind the source prober (no file or network access)"""
+import asyncio
+import struct
+
+import pytest
+
+from server import ProbeError, _parse_mp3, parse_audio_headers
+
+# MPEG-1 Layer III, 128 kbit/s, 44.1 kHz, stereo: 417-byte frames of 1152 samples
+MP3_FRAME_HEADER = b"\xff\xfb\x90\x00"
+MP3_FRAME_LENGTH = 417
+
+
+def mp3_frames(count: int) -> bytes:
+    return (MP3_FRAME_HEADER + bytes(MP3_FRAME_LENGTH - 4)) * count
+
+
+def id3_tag(payload_size: int) -> bytes:
+    size = bytes((payload_size >> shift) & 0x7F for shift in (21, 14, 7, 0))
+    return b"ID3\x04\x00\x00" + size + bytes(payload_size)
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+async def no_range(offset: int, length: int) -> bytes:
+    raise ProbeError("no range support")
+
+
+def reader(data: bytes):
+    reads = []
+
+    async def read(offset: int, length: int) -> bytes:
+        reads.append((offset, length))
+        return data[offset:offset + length]
+    return read, reads
+
+
+def test_cbr_mp3_duration_from_file_size():
+    data = mp3_frames(100)
+    result = _parse_mp3(data, 0, len(data))
+    assert result["codec"] == "mp3"
+    assert result["sample_rate"] == 44100
+    assert result["channels"] == 2
+    assert result["bitrate"] == 128000
+    assert result["duration"] == pytest.approx(len(data) * 8 / 128000)
+
+
+def test_xing_header_gives_vbr_duration():
+    first = bytearray(mp3_frames(1))
+    # Stereo MPEG-1 side info is 32 bytes; frames and bytes fields present
+    first[4 + 32:4 + 32 + 16] = b"Xing" + struct.pack(">III", 3, 1000, 500000)
+    data = bytes(first) + mp3_frames(20)
+    result = _parse_mp3(data, 0, len(data))
+    assert result["duration"] == pytest.approx(1000 * 1152 / 44100)
+    assert result["bitrate"] == int(500000 * 8 / result["duration"])
+
+
+def test_stray_sync_bytes_before_the_first_frame_are_skipped():
+    data = b"\xff\xfb\x00\x00junk" + mp3_frames(10)
+    assert _parse_mp3(data, 0, None)["bitrate"] == 128000
+
+
+def test_no_frame_raises_probe_error():
+    with pytest.raises(ProbeError):
+        _parse_mp3(bytes(4096), 0, None)
+
+
+def test_mp3_after_id3_tag_is_read_from_the_header_without_range_requests():
+    data = id3_tag(1000) + mp3_frames(50)
+    result = run(parse_audio_headers(data, no_range, len(data)))
+    assert result["codec"] == "mp3"
+    audio_bytes = len(data) - 1010
+    assert result["duration"] == pytest.approx(audio_bytes * 8 / 128000)
+
+
+def test_large_id3_tag_reads_the_audio_after_it():
+    data = id3_tag(100000) + mp3_frames(50)
+    read, reads = reader(data)
+    result = run(parse_audio_headers(data[:65536], read, len(data)))
+    assert result["codec"] == "mp3"
+    assert reads == [(100010, 65536)]
+
+
+def test_large_id3_tag_without_range_support_fails():
+    data = id3_tag(100000) + mp3_frames(50)
+    with pytest.raises(ProbeError):
+        run(parse_audio_headers(data[:65536], no_range, len(data)))
+
+
+def test_truncated_flac_streaminfo_raises_probe_error():
+    head = b"fLaC\x00\x00\x00\x22" + bytes(10)
+    with pytest.raises(ProbeError):
+        run(parse_audio_headers(head, no_range, len(head)))
+
+
+def test_wav_duration_from_data_chunk():
+    fmt = struct.pack("<HHIIHH", 1, 2, 44100, 44100 * 4, 4, 16)
+    data_size = 44100 * 4 * 3
+    head = (b"RIFF" + struct.pack("<I", 36 + data_size) + b"WAVE"
+            + b"fmt " + struct.pack("<I", 16) + fmt
+            + b"data" + struct.pack("<I", data_size))
+    result = run(parse_audio_headers(head, no_range, len(head) + data_size))
+    assert result["codec"] == "pcm"
+    assert result["bits_per_sample"] == 16
+    assert result["duration"] == pytest.approx(3)
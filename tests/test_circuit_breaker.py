@@ -0,0 +1,51 @@
+"""Circuit breaker guarding each Axis endpoint"""
+from server import CircuitBreaker
+
+
+def failed(breaker: CircuitBreaker, times: int):
+    for _ in range(times):
+        assert breaker.allow()
+        breaker.record_failure()
+
+
+def test_opens_after_consecutive_failures():
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=60)
+    failed(breaker, 2)
+    assert breaker.state == CircuitBreaker.CLOSED
+    failed(breaker, 1)
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+    assert breaker.rejected == 1
+
+
+def test_success_resets_the_failure_count():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+    failed(breaker, 1)
+    breaker.record_success()
+    failed(breaker, 1)
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_half_open_lets_one_probe_through():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+    failed(breaker, 1)
+    breaker.opened_at -= 60
+    assert breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert not breaker.allow()
+
+
+def test_probe_outcome_closes_or_reopens():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+    failed(breaker, 1)
+    breaker.opened_at -= 60
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+
+    breaker.opened_at -= 60
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.snapshot()["retry_in"] is None
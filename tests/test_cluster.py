@@ -0,0 +1,17 @@
+"""Startup checks for several API processes on one database"""
+import pytest
+from fastapi.testclient import TestClient
+from mongomock_motor import AsyncMongoMockClient
+
+import server
+
+
+def test_several_workers_without_cluster_mode_refuse_to_start(monkeypatch):
+    monkeypatch.setattr(server, "UVICORN_WORKERS", 4)
+    monkeypatch.setattr(server, "CLUSTER_ENABLED", False)
+    previous = server.client, server.db
+    with pytest.raises(RuntimeError, match="CLUSTER_ENABLED=true"):
+        with TestClient(server.create_app(AsyncMongoMockClient())):
+            pass
+    # Nothing was connected or started
+    assert (server.client, server.db) == previous
@@ -0,0 +1,90 @@
+"""Background delivery of Axis commands, coalesced per target"""
+import asyncio
+
+from server import AxisCommandQueue
+
+
+class Recorder:
+    def __init__(self, delay: float = 0):
+        self.delay = delay
+        self.sent = []
+        self.reports = []
+        self.running = 0
+        self.overlapped = False
+
+    def command(self, key, value, fail: bool = False):
+        async def send():
+            self.running += 1
+            self.overlapped |= self.running > 1
+            await asyncio.sleep(self.delay)
+            self.running -= 1
+            if fail:
+                raise RuntimeError("target unreachable")
+            self.sent.append((key, value))
+
+        async def report(error):
+            self.reports.append((key, value, error))
+        return key, send, report
+
+
+def test_waiting_commands_for_a_target_collapse_to_the_latest():
+    async def scenario():
+        queue, recorder = AxisCommandQueue(workers=2), Recorder()
+        for volume in range(5):
+            queue.submit(*recorder.command(("volume", "s1"), volume))
+        queue.submit(*recorder.command(("volume", "s2"), 30))
+        queue.start()
+        await queue.stop()
+        return queue.stats(), recorder
+
+    stats, recorder = asyncio.run(scenario())
+    assert sorted(recorder.sent) == [(("volume", "s1"), 4), (("volume", "s2"), 30)]
+    assert sorted(recorder.reports) == [(("volume", "s1"), 4, None), (("volume", "s2"), 30, None)]
+    assert stats == {"waiting": 0, "submitted": 6, "coalesced": 4, "delivered": 2, "failed": 0}
+
+
+def test_a_command_submitted_while_its_key_is_sending_follows_it():
+    async def scenario():
+        queue, recorder = AxisCommandQueue(workers=4), Recorder(delay=0.05)
+        queue.start()
+        queue.submit(*recorder.command(("volume", "s1"), 10))
+        await asyncio.sleep(0.01)
+        queue.submit(*recorder.command(("volume", "s1"), 20))
+        queue.submit(*recorder.command(("volume", "s1"), 30))
+        await queue.stop()
+        return recorder
+
+    recorder = asyncio.run(scenario())
+    assert recorder.sent == [(("volume", "s1"), 10), (("volume", "s1"), 30)]
+    assert not recorder.overlapped
+    # The first outcome is superseded by the command that followed it
+    assert recorder.reports == [(("volume", "s1"), 30, None)]
+
+
+def test_failure_is_reported_with_its_error():
+    async def scenario():
+        queue, recorder = AxisCommandQueue(workers=1), Recorder()
+        queue.submit(*recorder.command(("control", "session"), "pause", fail=True))
+        queue.start()
+        await queue.stop()
+        return queue.stats(), recorder
+
+    stats, recorder = asyncio.run(scenario())
+    assert recorder.reports == [(("control", "session"), "pause", "target unreachable")]
+    assert stats["failed"] == 1
+
+
+def test_discarded_command_hands_its_report_to_the_caller():
+    async def scenario():
+        queue, recorder = AxisCommandQueue(workers=1), Recorder()
+        queue.submit(*recorder.command(("volume", "s1"), 10))
+        report = queue.discard(("volume", "s1"))
+        assert queue.discard(("volume", "s1")) is None
+        queue.start()
+        await queue.stop()
+        await report(None)
+        return recorder
+
+    recorder = asyncio.run(scenario())
+    assert recorder.sent == []
+    assert recorder.reports == [(("volume", "s1"), 10, None)]
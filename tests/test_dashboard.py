@@ -0,0 +1,76 @@
+"""Dashboard snapshot revalidation and the change version shared by workers"""
+import asyncio
+
+import server
+from server import ClusterEvents
+
+
+def test_unchanged_dashboard_revalidates_without_mongo(api, monkeypatch):
+    response = api.get("/api/dashboard")
+    etag = response.headers["etag"]
+    assert response.status_code == 200
+    assert etag.startswith('W/"')
+
+    monkeypatch.setattr(server, "db", None)
+    response = api.get("/api/dashboard", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
+    assert response.content == b""
+
+
+def test_a_change_gives_a_new_etag_and_body(api):
+    etag = api.get("/api/dashboard").headers["etag"]
+    zone = api.post("/api/zones", json={"name": "Hall"}).json()
+
+    response = api.get("/api/dashboard", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    assert [z["id"] for z in response.json()["zones"]] == [zone["id"]]
+    assert api.get("/api/dashboard", headers={"If-None-Match": response.headers["etag"]}).status_code == 304
+
+
+def test_strong_form_of_the_etag_still_matches(api):
+    etag = api.get("/api/dashboard").headers["etag"]
+    assert api.get("/api/dashboard", headers={"If-None-Match": etag.removeprefix("W/")}).status_code == 304
+
+
+def test_cluster_dashboard_revalidates_from_the_version_in_memory(api, monkeypatch):
+    events = ClusterEvents()
+    events.version = 7
+    monkeypatch.setattr(server, "CLUSTER_ENABLED", True)
+    monkeypatch.setattr(server, "cluster_events", events)
+    etag = api.get("/api/dashboard").headers["etag"]
+    assert etag == 'W/"cluster-7"'
+
+    monkeypatch.setattr(server, "db", None)
+    assert api.get("/api/dashboard", headers={"If-None-Match": etag}).status_code == 304
+
+
+def test_cluster_version_follows_batches_written_and_tailed(mongo, monkeypatch):
+    async def no_capped_collection(self):
+        pass  # not supported by the in-memory MongoDB
+    monkeypatch.setattr(ClusterEvents, "setup", no_capped_collection)
+
+    async def scenario():
+        writer, reader = ClusterEvents(), ClusterEvents()
+        await writer.start()
+        await reader.start()
+        # Let the tails start before anything is published
+        await asyncio.sleep(0.05)
+        writer.forward("zone.created", {"id": "z1"}, "{}")
+        writer.forward("zone.updated", {"id": "z1"}, "{}")
+        # Answers once this worker's changes have their version
+        written = await writer.current_version()
+        for _ in range(50):
+            if reader.version == written:
+                break
+            await asyncio.sleep(0.05)
+        await writer.stop()
+        await reader.stop()
+        events = await mongo.cluster_events.find({}, {"_id": 0, "version": 1}).to_list(None)
+        return written, reader.version, events
+
+    written, tailed, events = asyncio.run(scenario())
+    assert written == 1
+    assert tailed == 1
+    assert events == [{"version": 1}, {"version": 1}]
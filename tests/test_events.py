@@ -0,0 +1,34 @@
+"""Change events fanned out to real-time subscribers"""
+import asyncio
+import json
+from datetime import datetime
+
+from server import EventBus
+
+
+def test_event_is_serialized_once_for_subscribers_and_other_workers():
+    async def scenario():
+        bus, forwarded = EventBus(queue_size=4), []
+        bus.forward = lambda event_type, data, message: forwarded.append(message)
+        first, second = bus.subscribe(), bus.subscribe()
+        bus.publish("zone.updated", {"id": "z1", "updated_at": datetime(2026, 1, 2, 3, 4, 5)})
+        return first.queue.get_nowait(), second.queue.get_nowait(), forwarded, bus.version
+
+    first, second, forwarded, version = asyncio.run(scenario())
+    assert first is second and forwarded == [first]
+    assert isinstance(first, str)
+    event = json.loads(first)
+    assert event["type"] == "zone.updated"
+    assert event["data"] == {"id": "z1", "updated_at": "2026-01-02T03:04:05"}
+    assert version == 1
+
+
+def test_full_subscriber_is_dropped_instead_of_blocking():
+    async def scenario():
+        bus = EventBus(queue_size=1)
+        slow = bus.subscribe()
+        bus.publish("zone.created", {"id": "z1"})
+        bus.publish("zone.created", {"id": "z2"})
+        return bus.subscriber_count, slow.dropped, slow.queue.get_nowait()
+
+    assert asyncio.run(scenario()) == (0, True, None)
@@ -0,0 +1,59 @@
+"""Local-file sources served through /sources/{id}/stream"""
+import pytest
+
+import server
+from server import parse_byte_range
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("bytes=0-99", (0, 99)),
+    ("bytes=100-", (100, 999)),
+    ("bytes=900-2000", (900, 999)),
+    ("bytes=-100", (900, 999)),
+    ("bytes=-5000", (0, 999)),
+    ("BYTES = 10-19", (10, 19)),
+])
+def test_satisfiable_ranges(header, expected):
+    assert parse_byte_range(header, 1000) == expected
+
+
+@pytest.mark.parametrize("header, size", [
+    ("bytes=1000-", 1000),
+    ("bytes=-0", 1000),
+    ("bytes=-10", 0),
+])
+def test_unsatisfiable_ranges(header, size):
+    assert parse_byte_range(header, size) is None
+
+
+@pytest.mark.parametrize("header", ["items=0-1", "bytes=0-1,5-6", "bytes=9-1", "bytes=a-b"])
+def test_ignored_ranges_raise(header):
+    with pytest.raises(ValueError):
+        parse_byte_range(header, 1000)
+
+
+def create_local_source(api, file_path: str):
+    return api.post("/api/sources", json={"name": "Bell", "type": "local_file", "file_path": file_path})
+
+
+def test_paths_read_by_axis_are_stored_as_given(api, monkeypatch):
+    monkeypatch.setattr(server, "AXIS_MEDIA_BASE_URL", "")
+    response = create_local_source(api, "/srv/axis/bell.mp3")
+    assert response.status_code == 200
+    assert response.json()["file_path"] == "/srv/axis/bell.mp3"
+
+
+def test_served_paths_must_be_inside_the_media_root(api, monkeypatch, tmp_path):
+    (tmp_path / "bell.mp3").write_bytes(b"\xff\xfb\x90\x00" + bytes(413))
+    monkeypatch.setattr(server, "AXIS_MEDIA_BASE_URL", "http://dashboard.local")
+    monkeypatch.setattr(server, "MEDIA_ROOT", str(tmp_path.resolve()))
+    assert create_local_source(api, "/srv/axis/bell.mp3").status_code == 400
+    assert create_local_source(api, "../bell.mp3").status_code == 400
+    assert create_local_source(api, "bell.mp3").status_code == 200
+
+
+def test_stream_refuses_files_outside_the_media_root(api, monkeypatch, tmp_path):
+    monkeypatch.setattr(server, "AXIS_MEDIA_BASE_URL", "")
+    monkeypatch.setattr(server, "MEDIA_ROOT", str(tmp_path.resolve()))
+    source = create_local_source(api, "/etc/hostname").json()
+    assert api.get(f"/api/sources/{source['id']}/stream").status_code == 404
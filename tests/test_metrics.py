@@ -0,0 +1,54 @@
+"""Request latency recorded by the metrics middleware"""
+import time
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from starlette.background import BackgroundTask
+from starlette.responses import Response
+
+from server import RequestMetricsMiddleware, http_request_duration, http_requests_in_flight
+
+
+def timed_app(in_flight: list) -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(RequestMetricsMiddleware)
+
+    def after_response():
+        in_flight.append(http_requests_in_flight._values.get((), 0))
+        time.sleep(0.3)
+
+    @app.post("/metrics-test/slow-background")
+    async def slow_background():
+        return Response(b"{}", media_type="application/json", background=BackgroundTask(after_response))
+
+    @app.get("/metrics-test/fails")
+    async def fails():
+        raise RuntimeError("boom")
+
+    return app
+
+
+def series(route: str, method: str, status: str):
+    sum_, count = http_request_duration._series.get((method, route, status), [0, 0])[-2:]
+    return sum_, count
+
+
+def test_background_tasks_are_not_request_latency():
+    in_flight = []
+    before = http_requests_in_flight._values.get((), 0)
+    with TestClient(timed_app(in_flight)) as client:
+        for _ in range(3):
+            assert client.post("/metrics-test/slow-background").status_code == 200
+
+    total, count = series("/metrics-test/slow-background", "POST", "200")
+    assert count == 3
+    assert total < 0.3
+    # Already out of flight while its background task runs
+    assert in_flight == [before] * 3
+    assert http_requests_in_flight._values.get((), 0) == before
+
+
+def test_failed_request_is_recorded_once_as_500():
+    with TestClient(timed_app([]), raise_server_exceptions=False) as client:
+        assert client.get("/metrics-test/fails").status_code == 500
+    assert series("/metrics-test/fails", "GET", "500")[1] == 1
@@ -0,0 +1,27 @@
+"""Ring buffer shared by the listeners of a stream relay"""
+from server import RingBuffer
+
+
+def test_ring_buffer_reads_back_what_was_written():
+    ring = RingBuffer(16)
+    ring.write(b"hello ")
+    ring.write(b"world")
+    assert (ring.start, ring.end) == (0, 11)
+    assert ring.read(0, 100) == b"hello world"
+    assert ring.read(6, 3) == b"wor"
+
+
+def test_ring_buffer_wraps_and_forgets_the_oldest_bytes():
+    ring = RingBuffer(8)
+    ring.write(b"abcdef")
+    ring.write(b"ghij")
+    assert (ring.start, ring.end) == (2, 10)
+    assert ring.read(ring.start, 100) == b"cdefghij"
+    assert ring.read(7, 2) == b"hi"
+
+
+def test_ring_buffer_write_larger_than_capacity_keeps_the_tail():
+    ring = RingBuffer(4)
+    ring.write(b"0123456789")
+    assert (ring.start, ring.end) == (6, 10)
+    assert ring.read(6, 4) == b"6789"
@@ -0,0 +1,134 @@
+"""Schedule fire times and the scheduler that claims and fires them"""
+import asyncio
+from datetime import datetime, timedelta
+
+from pymongo.errors import PyMongoError
+
+from server import PlaybackScheduler, Schedule, next_fire_time
+
+NOW = datetime(2026, 3, 2, 12, 0)  # a Monday
+
+
+
+def test_one_off_schedule_fires_once():
+    schedule = {"start_at": NOW}
+    assert next_fire_time(schedule, NOW - timedelta(seconds=1)) == NOW
+    assert next_fire_time(schedule, NOW) is None
+
+
+def test_repeating_schedule_fires_strictly_after():
+    schedule = {"start_at": NOW, "interval": 3600}
+    assert next_fire_time(schedule, NOW) == NOW + timedelta(hours=1)
+    assert next_fire_time(schedule, NOW + timedelta(minutes=90)) == NOW + timedelta(hours=2)
+    assert next_fire_time(schedule, NOW - timedelta(days=1)) == NOW
+
+
+def test_weekdays_skip_to_the_next_allowed_day():
+    schedule = {"start_at": NOW, "interval": 86400, "weekdays": [0, 1, 2, 3, 4]}
+    friday = NOW + timedelta(days=4)
+    assert next_fire_time(schedule, friday) == NOW + timedelta(days=7)
+
+
+def test_short_interval_with_weekdays_lands_at_the_first_fire_of_the_day():
+    schedule = {"start_at": NOW + timedelta(minutes=7), "interval": 60, "weekdays": [6]}
+    assert next_fire_time(schedule, NOW) == datetime(2026, 3, 8, 0, 0)
+
+
+def test_interval_that_never_reaches_an_allowed_day_ends():
+    schedule = {"start_at": NOW, "interval": 7 * 86400, "weekdays": [1]}
+    assert next_fire_time(schedule, NOW) is None
+
+
+def test_daily_schedule_keeps_its_local_time_across_dst():
+    # 08:00 in Paris: 07:00 UTC in winter, 06:00 UTC after the March change
+    schedule = {"start_at": datetime(2026, 3, 27, 7, 0), "interval": 86400, "timezone": "Europe/Paris"}
+    assert next_fire_time(schedule, datetime(2026, 3, 27, 8, 0)) == datetime(2026, 3, 28, 7, 0)
+    assert next_fire_time(schedule, datetime(2026, 3, 28, 8, 0)) == datetime(2026, 3, 29, 6, 0)
+    assert next_fire_time({**schedule, "timezone": None}, datetime(2026, 3, 28, 8, 0)) == datetime(2026, 3, 29, 7, 0)
+
+
+def soon(seconds: float) -> datetime:
+    # MongoDB keeps milliseconds
+    now = datetime.utcnow() + timedelta(seconds=seconds)
+    return now.replace(microsecond=now.microsecond // 1000 * 1000)
+
+
+async def add_bell(db, fire_at: datetime, speaker_ids=("s1", "s2")) -> Schedule:
+    await db.zones.insert_one({"id": "zone", "name": "Hall", "speaker_ids": list(speaker_ids)})
+    await db.audio_sources.insert_one({"id": "bell", "name": "Bell", "type": "local_file", "file_path": "/bell.mp3", "duration": 3})
+    schedule = Schedule(name="Bell", zone_id="zone", source_id="bell", start_at=fire_at, interval=3600, next_fire_at=fire_at)
+    await db.schedules.insert_one(schedule.dict())
+    return schedule
+
+
+def started(scheduler: PlaybackScheduler):
+    scheduler.RETRY_DELAY = 0.01
+    scheduler.start()
+    return scheduler
+
+
+async def stop(*schedulers: PlaybackScheduler):
+    for scheduler in schedulers:
+        await scheduler.stop()
+
+
+def test_a_fire_is_claimed_by_one_scheduler_only(mongo, axis_calls):
+    async def scenario():
+        fire_at = soon(0.2)
+        schedule = await add_bell(mongo, fire_at)
+        first, second = started(PlaybackScheduler()), started(PlaybackScheduler())
+        await asyncio.gather(first.load(), second.load())
+        await asyncio.sleep(0.5)
+        await stop(first, second)
+        stored = await mongo.schedules.find_one({"id": schedule.id})
+        sessions = await mongo.audio_sessions.find({"schedule_id": schedule.id}).to_list(None)
+        return fire_at, first.fired + second.fired, stored, sessions
+
+    fire_at, fired, stored, sessions = asyncio.run(scenario())
+    assert fired == 1
+    assert len(sessions) == 1
+    assert stored["last_fired_at"] == fire_at
+    assert stored["last_session_id"] == sessions[0]["id"]
+    assert stored["next_fire_at"] == fire_at + timedelta(hours=1)
+    assert [call[:2] for call in axis_calls].count(("POST", "/sessions")) == 1
+
+
+def test_connections_are_opened_through_the_zone_speakers_before_the_fire(mongo, axis_calls):
+    async def scenario():
+        await add_bell(mongo, soon(0.2))
+        scheduler = started(PlaybackScheduler())
+        await scheduler.load()
+        await asyncio.sleep(0.5)
+        await stop(scheduler)
+
+    asyncio.run(scenario())
+    calls = [call[:2] for call in axis_calls]
+    assert calls == [("GET", "/targets/s1"), ("GET", "/targets/s2"), ("POST", "/sessions")]
+
+
+def test_a_fire_that_failed_before_its_claim_is_retried(mongo, axis_calls, monkeypatch):
+    async def scenario():
+        fire_at = soon(0.2)
+        schedule = await add_bell(mongo, fire_at)
+        failures = []
+        prepare = PlaybackScheduler._prepare
+
+        async def flaky_prepare(self, *args):
+            if not failures:
+                failures.append(1)
+                raise PyMongoError("connection reset")
+            return await prepare(self, *args)
+        monkeypatch.setattr(PlaybackScheduler, "_prepare", flaky_prepare)
+
+        scheduler = started(PlaybackScheduler())
+        await scheduler.load()
+        await asyncio.sleep(0.6)
+        stats = scheduler.stats()
+        await stop(scheduler)
+        return fire_at, stats, await mongo.schedules.find_one({"id": schedule.id})
+
+    fire_at, stats, stored = asyncio.run(scenario())
+    assert (stats["failed"], stats["fired"], stats["retrying"]) == (1, 1, 0)
+    assert stats["tracked"] == 1
+    assert stored["last_fired_at"] == fire_at
+    assert stored["next_fire_at"] == fire_at + timedelta(hours=1)
@@ -0,0 +1,78 @@
+"""Session starts sent to Axis after the response, and starts that were lost"""
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+import server
+from server import AudioSessionStatus, DeliveryStatus, fail_stale_session_starts
+
+
+@pytest.fixture
+def zone_and_source(api, monkeypatch):
+    monkeypatch.setattr(server, "AXIS_MEDIA_BASE_URL", "")
+    zone = api.post("/api/zones", json={"name": "Hall"}).json()
+    source = api.post("/api/sources", json={"name": "Bell", "type": "local_file", "file_path": "/srv/bell.mp3"}).json()
+    return zone, source
+
+
+def start(api, zone, source):
+    return api.post("/api/sessions", json={"name": "Bell", "zone_id": zone["id"], "source_id": source["id"]})
+
+
+def test_session_is_answered_preparing_then_started_on_axis(api, axis_calls, zone_and_source):
+    zone, source = zone_and_source
+    response = start(api, zone, source)
+    assert response.status_code == 200
+    created = response.json()
+    assert created["status"] == AudioSessionStatus.PREPARING
+    assert created["delivery_status"] == DeliveryStatus.PENDING
+
+    started = api.get(f"/api/sessions/{created['id']}").json()
+    assert started["status"] == AudioSessionStatus.PLAYING
+    assert started["delivery_status"] == DeliveryStatus.DELIVERED
+    assert started["started_at"] is not None
+    method, endpoint, data = axis_calls[-1]
+    assert (method, endpoint, data["targets"]) == ("POST", "/sessions", [zone["id"]])
+    assert data["audio_config"]["source_url"] == "/srv/bell.mp3"
+
+
+def test_failed_start_moves_the_session_to_error(api, zone_and_source, monkeypatch):
+    async def unreachable(*args, **kwargs):
+        raise server.HTTPException(status_code=503, detail="Axis API unavailable")
+    monkeypatch.setattr(server.axis_client, "start_audio_session", unreachable)
+    zone, source = zone_and_source
+
+    created = start(api, zone, source).json()
+    failed = api.get(f"/api/sessions/{created['id']}").json()
+    assert failed["status"] == AudioSessionStatus.ERROR
+    assert failed["delivery_status"] == DeliveryStatus.FAILED
+    assert failed["delivery_error"] == "Axis API unavailable"
+
+
+def test_unknown_zone_is_refused_before_anything_is_stored(api, axis_calls, zone_and_source):
+    _, source = zone_and_source
+    assert start(api, {"id": "missing"}, source).status_code == 404
+    assert axis_calls == []
+
+
+def test_sessions_left_preparing_by_a_lost_start_fail(mongo, monkeypatch):
+    old = datetime.utcnow() - timedelta(minutes=10)
+    monkeypatch.setattr(server, "session_starts", {"in-flight"})
+
+    async def scenario():
+        await mongo.audio_sessions.insert_many([
+            {"id": "lost", "status": AudioSessionStatus.PREPARING, "created_at": old},
+            {"id": "in-flight", "status": AudioSessionStatus.PREPARING, "created_at": old},
+            {"id": "recent", "status": AudioSessionStatus.PREPARING, "created_at": datetime.utcnow()},
+        ])
+        failed = await fail_stale_session_starts(older_than=60)
+        sessions = await mongo.audio_sessions.find({}, {"_id": 0}).to_list(None)
+        return failed, {session["id"]: session for session in sessions}
+
+    failed, sessions = asyncio.run(scenario())
+    assert failed == 1
+    assert sessions["lost"]["status"] == AudioSessionStatus.ERROR
+    assert sessions["lost"]["delivery_status"] == DeliveryStatus.FAILED
+    assert sessions["in-flight"]["status"] == AudioSessionStatus.PREPARING
+    assert sessions["recent"]["status"] == AudioSessionStatus.PREPARING
@@ -0,0 +1,98 @@
+"""Computed session positions and the timeline that records track ends"""
+import asyncio
+from datetime import datetime, timedelta
+
+from server import AudioSessionStatus, SessionTimeline, live_position, with_live_position
+
+NOW = datetime(2026, 3, 2, 12, 0)
+
+
+def playing(**fields):
+    return {"status": AudioSessionStatus.PLAYING, "position": 10, "position_updated_at": NOW, **fields}
+
+
+def test_position_advances_from_its_anchor_while_playing():
+    assert live_position(playing(duration=300), NOW + timedelta(seconds=5)) == (15, False)
+
+
+def test_paused_session_keeps_its_position():
+    session = playing(status=AudioSessionStatus.PAUSED, duration=300)
+    assert live_position(session, NOW + timedelta(seconds=50)) == (10, False)
+
+
+def test_position_stops_at_the_end_of_the_track():
+    assert live_position(playing(duration=60), NOW + timedelta(seconds=100)) == (60, True)
+
+
+def test_looping_session_wraps_around():
+    assert live_position(playing(duration=60, loop=True), NOW + timedelta(seconds=100)) == (50, False)
+
+
+def test_session_without_duration_never_ends():
+    assert live_position(playing(), NOW + timedelta(days=1)) == (10 + 86400, False)
+
+
+def test_response_of_a_playing_session_is_anchored_at_now():
+    later = NOW + timedelta(seconds=5)
+    session = with_live_position(playing(duration=300), later)
+    assert session["status"] == AudioSessionStatus.PLAYING
+    assert (session["position"], session["position_updated_at"]) == (15, later)
+
+
+def test_response_of_an_ended_track_reports_when_it_ended():
+    session = with_live_position(playing(duration=60), NOW + timedelta(hours=1))
+    assert session["status"] == AudioSessionStatus.STOPPED
+    assert session["position"] == 60
+    assert session["ended_at"] == NOW + timedelta(seconds=50)
+    assert session["position_updated_at"] == session["ended_at"]
+
+
+def test_timeline_stops_tracks_that_ended(mongo):
+    anchor = datetime.utcnow().replace(microsecond=0) - timedelta(seconds=100)
+
+    async def scenario():
+        await mongo.audio_sessions.insert_many([
+            {"id": "ended", **playing(position=0, position_updated_at=anchor, duration=60)},
+            {"id": "looping", **playing(position=0, position_updated_at=anchor, duration=60, loop=True)},
+            {"id": "long", **playing(position=0, position_updated_at=anchor, duration=3600)},
+        ])
+        timeline = SessionTimeline()
+        timeline.start()
+        await timeline.load()
+        await asyncio.sleep(0.1)
+        stats = timeline.stats()
+        await timeline.stop()
+        sessions = await mongo.audio_sessions.find({}, {"_id": 0}).to_list(None)
+        return stats, {session["id"]: session for session in sessions}
+
+    stats, sessions = asyncio.run(scenario())
+    assert stats == {"tracked": 1, "finished": 1}
+    ended = sessions["ended"]
+    assert ended["status"] == AudioSessionStatus.STOPPED
+    assert ended["position"] == 60
+    assert ended["ended_at"] == anchor + timedelta(seconds=60)
+    assert sessions["looping"]["status"] == AudioSessionStatus.PLAYING
+    assert sessions["long"]["status"] == AudioSessionStatus.PLAYING
+
+
+def test_timeline_leaves_a_session_whose_anchor_moved(mongo):
+    anchor = datetime.utcnow().replace(microsecond=0) - timedelta(seconds=100)
+
+    async def scenario():
+        session = {"id": "paused", **playing(position=0, position_updated_at=anchor, duration=60)}
+        await mongo.audio_sessions.insert_one(dict(session))
+        timeline = SessionTimeline()
+        timeline.start()
+        # A pause recorded after the timeline picked up the session
+        await mongo.audio_sessions.update_one(
+            {"id": "paused"},
+            {"$set": {"status": AudioSessionStatus.PAUSED, "position_updated_at": anchor + timedelta(seconds=1)}}
+        )
+        timeline.track(session)
+        await asyncio.sleep(0.1)
+        await timeline.stop()
+        return await mongo.audio_sessions.find_one({"id": "paused"}, {"_id": 0})
+
+    session = asyncio.run(scenario())
+    assert session["status"] == AudioSessionStatus.PAUSED
+    assert "ended_at" not in session